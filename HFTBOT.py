@@ -7,20 +7,41 @@ No external config files needed - everything is hardcoded for simplicity
 INSTRUCTIONS:
 1. Edit the API_KEY and API_SECRET below with your Bybit credentials
 2. Adjust trading parameters if needed (or leave defaults)
-3. Run: python standalone_market_maker.py
+3. Run: python HFTBOT.py (from the repository root, next to dist/)
+
+Configuration lives in this file, but the bot code does not: the
+volatility, calibration, order, fill, rate-limit, account and latency
+components are imported from the shared modules in dist/, so this
+script and the config-driven bot run the same implementation. Copying
+HFTBOT.py on its own is not enough; install dist/requirements.txt and
+keep the dist/ folder beside it.
 """
 
 import ccxt
 import time
-import math
 import os
 import sys
 from datetime import datetime
 from collections import deque
-import statistics
 import logging
 from typing import Dict, Tuple, Optional, Any
 
+# Shared bot components live in dist/ next to this script
+DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist')
+sys.path.insert(0, DIST_DIR)
+
+try:
+    from account_state import AccountState
+    from calibration import FillIntensityEstimator, SpreadModel
+    from fill_ledger import FillLedger
+    from metrics import Metrics
+    from order_manager import QuoteManager, get_tick_size
+    from request_scheduler import RequestScheduler, ScheduledExchange
+    from volatility import VolatilityEstimator
+except ImportError as e:
+    sys.exit(f"HFTBOT.py needs the shared bot modules in {DIST_DIR} ({e}). "
+             f"Run it from the repository with dist/ next to it.")
+
 # ============================================================================
 # CONFIGURATION - EDIT THESE VALUES
 # ============================================================================
@@ -42,8 +63,40 @@ K = 5.0  # Market impact parameter (k) - For fill intensity modeling
 ALPHA = 0.001  # Inventory penalty parameter (α) - Separate from gamma
 TIME_HORIZON = 0.1  # Time horizon in hours (6 minutes) - rolling calculation
 SIGMA_LOOKBACK = 50  # Price history length for volatility (matches server)
+VOLATILITY_MODE = "window"  # "window" (rolling stdev) or "ewma" (exponentially weighted)
+VOLATILITY_EWMA_SPAN = SIGMA_LOOKBACK  # EWMA span in ticks (ewma mode only)
 UPDATE_FREQUENCY = 1.0  # Update quotes every 1 second (ultra aggressive)
 
+# Online Calibration (k from the public trade stream)
+CALIBRATE_K = False  # Replace K with the value fitted from trade distances to the mid
+CALIBRATION_INTERVAL = 5.0  # Seconds between public trade fetches
+CALIBRATION_HALF_LIFE = 600.0  # Seconds for old trades to count half as much
+CALIBRATION_MIN_TRADES = 50  # Trades needed before the first fit
+CALIBRATION_BUCKET_BPS = 1.0  # Depth bucket width in basis points (50 buckets)
+K_TOLERANCE = 0.01  # Relative change in k needed to recompute the spread term
+
+# Order Management
+REQUOTE_TOLERANCE_TICKS = 0  # Keep live orders when the new quote is within this many ticks
+REQUOTE_TOLERANCE_BPS = 0.0  # ...or within this many basis points (whichever is larger)
+USE_AMEND = True  # Amend orders in place when the exchange supports editOrder
+
+# Fill Tracking
+FILL_LEDGER_FILE = "fill_ledger.json"  # Persisted position, PnL and trade cursor
+FILL_POLL_INTERVAL = 0.0  # Seconds between fill polls (0 = every tick)
+FILL_PAGE_LIMIT = 100  # Trades per fetch_my_trades page
+
+# Request Scheduling (replaces ccxt's fixed per-call delay)
+RATE_LIMIT_PER_SECOND = None  # Sustained requests per second (None = the exchange's published limit)
+RATE_LIMIT_BURST = None  # Requests that may go back-to-back (None = a quarter second of the rate)
+RATE_LIMIT_COOLDOWN = 5.0  # Seconds to pause after the exchange reports rate limiting
+MAX_FILL_DEFERRAL = 5.0  # Seconds fill polls may wait while the request budget is tight
+
+# Account State
+BALANCE_REFRESH_INTERVAL = 10.0  # Seconds between background balance refreshes
+
+# Latency Metrics
+METRICS_SUMMARY_INTERVAL = 60.0  # Seconds between latency summary log lines (0 = off)
+
 # Risk Management (Server-tuned)
 MAX_INVENTORY_USD = 200.0  # Maximum inventory in USD
 
@@ -51,6 +104,8 @@ MAX_INVENTORY_USD = 200.0  # Maximum inventory in USD
 # BOT CODE - NO NEED TO EDIT BELOW THIS LINE
 # ============================================================================
 
+SECONDS_PER_HOUR = 3600.0
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -70,14 +125,32 @@ class StandaloneMarketMaker:
         self.exchange = None
         self.symbol = SYMBOL
         self.price_history = deque(maxlen=SIGMA_LOOKBACK)
+        self.volatility_estimator = VolatilityEstimator(SIGMA_LOOKBACK, VOLATILITY_MODE, VOLATILITY_EWMA_SPAN)
         self.inventory = 0
         self.pnl = 0
         self.trades_count = 0
         self.current_orders = {'bid': None, 'ask': None}
+        self.order_manager = None
+        self.fill_ledger = None
+        self.scheduler = None
+        self.account = None
+        self.latency = Metrics(METRICS_SUMMARY_INTERVAL)
         self.volatility = 0.01
         self.running = False
         self.last_trade_check = 0
         
+        # Spread liquidity term (2/γ)·ln(1 + γ/k) only changes with k
+        self.spread_model = SpreadModel(GAMMA, K, K_TOLERANCE)
+        self.intensity = None
+        if CALIBRATE_K:
+            self.intensity = FillIntensityEstimator(
+                bucket_width=CALIBRATION_BUCKET_BPS / 10000,
+                buckets=50,
+                half_life=CALIBRATION_HALF_LIFE,
+                min_trades=CALIBRATION_MIN_TRADES
+            )
+        self.last_calibration = 0
+        
         # Timing - use strategy start time instead of wall clock (matches server)
         self.start_time = time.time()
         
@@ -122,6 +195,16 @@ class StandaloneMarketMaker:
         except Exception as e:
             logger.error(f"Failed to connect to Bybit: {e}")
             raise
+        
+        # Prioritized request scheduling instead of ccxt's fixed per-call delay
+        # Default to the exchange's own published limit (ccxt rateLimit is ms per request)
+        rate_limit_ms = getattr(self.exchange, 'rateLimit', None)
+        default_rate = 1000.0 / rate_limit_ms if rate_limit_ms else 10.0
+        self.exchange.enableRateLimit = False
+        self.scheduler = RequestScheduler(RATE_LIMIT_PER_SECOND or default_rate, RATE_LIMIT_BURST,
+                                          cooldown=RATE_LIMIT_COOLDOWN, metrics=self.latency)
+        self.exchange = ScheduledExchange(self.exchange, self.scheduler)
+        logger.info(f"Request scheduler: {self.scheduler.rate:.1f} req/s, burst {self.scheduler.capacity:.0f}")
     
     def validate_symbol(self) -> None:
         """Validate and set the trading symbol"""
@@ -134,6 +217,21 @@ class StandaloneMarketMaker:
         logger.info(f"Trading symbol: {self.symbol}")
         logger.info(f"Min order size: {market['limits']['amount']['min']}")
         logger.info(f"Price precision: {market['precision']['price']}")
+        
+        # Order manager needs the price tick to diff quotes
+        self.order_manager = QuoteManager(
+            self.exchange, self.symbol, get_tick_size(market),
+            tolerance_ticks=REQUOTE_TOLERANCE_TICKS,
+            tolerance_bps=REQUOTE_TOLERANCE_BPS,
+            use_amend=USE_AMEND
+        )
+        self.current_orders = self.order_manager.orders
+        
+        # Fill ledger restores inventory and PnL from its persisted state
+        self.fill_ledger = FillLedger(self.symbol, FILL_LEDGER_FILE, page_limit=FILL_PAGE_LIMIT)
+        # Filled quotes must be requoted even when the desired price has not moved
+        self.fill_ledger.listeners.append(self.order_manager.on_fill)
+        self.sync_inventory()
     
     def set_leverage(self) -> None:
         """Set leverage for the trading pair"""
@@ -144,20 +242,34 @@ class StandaloneMarketMaker:
         except Exception as e:
             logger.warning(f"Could not set leverage: {e}")
     
+    def update_price(self, mid_price: float) -> None:
+        """Record a new mid price and update volatility once for this tick"""
+        now = time.time()
+        self.price_history.append(mid_price)
+        self.volatility = self.volatility_estimator.update(mid_price, now)
+        if self.intensity:
+            self.intensity.mark(now, mid_price)
+    
+    def update_calibration(self) -> None:
+        """Fetch public trades since the calibration cursor and refit k when due"""
+        current_time = time.time()
+        if not self.intensity or current_time - self.last_calibration < CALIBRATION_INTERVAL:
+            return
+        # Fills matter more than calibration when the rate budget is tight
+        if self.scheduler.congested:
+            return
+        self.last_calibration = current_time
+        try:
+            trades = self.exchange.fetch_trades(self.symbol, since=self.intensity.cursor or None)
+            if self.intensity.add_trades(trades):
+                fit = self.intensity.fit(current_time)
+                if fit is not None and self.spread_model.set_k(fit[1]):
+                    logger.info(f"Calibrated A={fit[0]:.3f}/s k={fit[1]:.1f}")
+        except Exception as e:
+            logger.error(f"Error updating calibration: {e}")
+    
     def calculate_volatility(self) -> float:
-        """Calculate realized volatility from price history"""
-        if len(self.price_history) < 2:
-            return self.volatility
-        
-        returns = []
-        for i in range(1, len(self.price_history)):
-            ret = math.log(self.price_history[i] / self.price_history[i-1])
-            returns.append(ret)
-        
-        if len(returns) > 1:
-            self.volatility = statistics.stdev(returns) * math.sqrt(3600)
-            self.volatility = max(self.volatility, 0.001)
-        
+        """Return realized volatility (maintained incrementally by update_price)"""
         return self.volatility
     
     def calculate_reservation_price(self, mid_price: float) -> float:
@@ -175,7 +287,7 @@ class StandaloneMarketMaker:
     def get_time_remaining(self) -> float:
         """Get time remaining in current strategy horizon (matches server)"""
         # Use rolling time horizon from strategy start, not wall clock
-        elapsed_hours = (time.time() - self.start_time) / 3600
+        elapsed_hours = (time.time() - self.start_time) / SECONDS_PER_HOUR
         cycle_position = elapsed_hours % TIME_HORIZON
         time_remaining = TIME_HORIZON - cycle_position
         return max(time_remaining, 0.01)  # Minimum time remaining
@@ -185,11 +297,8 @@ class StandaloneMarketMaker:
         sigma = self.calculate_volatility()
         time_remaining = self.get_time_remaining()
         
-        # Correct A-S optimal spread: δ* = γσ²T + (2/γ)ln(1 + γ/k)
-        risk_term = GAMMA * sigma**2 * time_remaining
-        market_impact_term = (2 / GAMMA) * math.log(1 + GAMMA / K)
-        
-        spread = risk_term + market_impact_term
+        # Correct A-S optimal spread: δ* = γσ²T + (2/γ)ln(1 + γ/k), second term cached
+        spread = self.spread_model.spread(sigma, time_remaining)
         
         # Server's constraints: minimum spread (wider than before)
         min_spread_bps = 2.0  # 2 basis points minimum
@@ -264,13 +373,10 @@ class StandaloneMarketMaker:
         return max(size, min_size)
     
     def get_available_balance(self) -> float:
-        """Get available balance in USDT"""
-        try:
-            balance = self.exchange.fetch_balance()
-            return balance.get('USDT', {}).get('free', 0)
-        except Exception as e:
-            logger.error(f"Error fetching balance: {e}")
-            return 0
+        """Cached available USDT balance (never blocks on the exchange)"""
+        if self.account is None:
+            return 0.0
+        return self.account.free('USDT')
     
     def cancel_all_orders(self) -> None:
         """Cancel all open orders"""
@@ -282,68 +388,45 @@ class StandaloneMarketMaker:
                 for order in open_orders:
                     self.exchange.cancel_order(order['id'], self.symbol)
             
-            self.current_orders = {'bid': None, 'ask': None}
+            if self.order_manager:
+                self.order_manager.forget()
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
     
     def place_orders(self, bid_price: float, ask_price: float, size: float) -> None:
-        """Place bid and ask orders"""
-        self.cancel_all_orders()
-        
-        try:
-            # Place bid order
-            bid_order = self.exchange.create_limit_order(
-                self.symbol, 'buy', size, bid_price
-            )
-            self.current_orders['bid'] = bid_order
-            logger.info(f"Bid placed: {size} @ {bid_price}")
-        except Exception as e:
-            logger.error(f"Error placing bid: {e}")
-        
-        try:
-            # Place ask order
-            ask_order = self.exchange.create_limit_order(
-                self.symbol, 'sell', size, ask_price
-            )
-            self.current_orders['ask'] = ask_order
-            logger.info(f"Ask placed: {size} @ {ask_price}")
-        except Exception as e:
-            logger.error(f"Error placing ask: {e}")
+        """Update bid and ask orders, touching only the sides that changed"""
+        self.order_manager.update_quotes(bid_price, ask_price, size)
     
     def update_inventory(self) -> None:
-        """Update inventory from recent trades"""
+        """Apply new fills since the ledger cursor"""
         try:
-            # Only check trades every 30 seconds to avoid rate limits
             current_time = time.time()
-            if current_time - self.last_trade_check < 30:
+            if current_time - self.last_trade_check < FILL_POLL_INTERVAL:
+                return
+            # Under rate-limit pressure fills can wait a few cycles; quotes cannot
+            if self.scheduler.congested and current_time - self.last_trade_check < MAX_FILL_DEFERRAL:
                 return
             
             self.last_trade_check = current_time
-            since = int((current_time - 300) * 1000)  # Last 5 minutes
-            trades = self.exchange.fetch_my_trades(self.symbol, since=since, limit=50)
-            
-            for trade in trades:
-                if trade['timestamp'] > since:
-                    if trade['side'] == 'buy':
-                        self.inventory += trade['amount']
-                    else:
-                        self.inventory -= trade['amount']
-                    
-                    self.trades_count += 1
-                    
-                    # Update PnL
-                    fee = trade.get('fee', {}).get('cost', 0)
-                    self.pnl -= fee
-                    
-                    logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+            if self.fill_ledger.poll(self.exchange):
+                # Fills change the balance - refresh it soon
+                self.account.request_refresh()
+            self.sync_inventory()
         except Exception as e:
             logger.error(f"Error updating inventory: {e}")
     
+    def sync_inventory(self) -> None:
+        """Mirror ledger position and PnL onto the strategy state"""
+        self.inventory = self.fill_ledger.position
+        self.pnl = self.fill_ledger.pnl
+        self.trades_count = self.fill_ledger.trades_count
+    
     def display_status(self, mid_price: float, bid_price: float, ask_price: float, size: float) -> None:
         """Display current bot status"""
         spread = ask_price - bid_price
         spread_bps = (spread / mid_price) * 10000
         balance = self.get_available_balance()
+        balance_age = self.account.snapshot.age if self.account else float('inf')
         inventory_value = self.inventory * mid_price
         
         # Use dynamic time remaining to match server
@@ -354,7 +437,11 @@ class StandaloneMarketMaker:
         print(f"Inventory: {self.inventory:.3f} ETH (${inventory_value:.2f}) | Target: 0")
         print(f"Quotes: ${bid_price:.2f} / ${ask_price:.2f} | Size: {size:.3f} ETH")
         print(f"Stats: {self.trades_count} trades | PnL: ${self.pnl:.2f}")
-        print(f"Balance: ${balance:.2f} USDT | k: {K:.2f} | γ: {GAMMA:.3f}")
+        print(f"Balance: ${balance:.2f} USDT ({balance_age:.0f}s old) | k: {self.spread_model.k:.2f} | γ: {GAMMA:.3f}")
+        if self.order_manager:
+            print(self.order_manager.summary())
+        if self.scheduler:
+            print(self.scheduler.summary())
         
         # Risk indicators
         inventory_percent = abs(inventory_value) / MAX_INVENTORY_USD * 100
@@ -374,7 +461,7 @@ class StandaloneMarketMaker:
         print(f"   Order Size: {ORDER_SIZE_FIXED} ETH (fixed)")
         print(f"   Max Inventory: ${MAX_INVENTORY_USD}")
         print(f"   Update Frequency: {UPDATE_FREQUENCY}s")
-        print(f"   Parameters: γ={GAMMA}, k={K}, T={TIME_HORIZON}h (rolling)")
+        print(f"   Parameters: γ={GAMMA}, k={K}{' (calibrated)' if CALIBRATE_K else ''}, T={TIME_HORIZON}h (rolling)")
         print(f"   Sandbox Mode: {SANDBOX_MODE}")
         
         # Initialize exchange
@@ -384,11 +471,17 @@ class StandaloneMarketMaker:
         
         self.running = True
         
+        # Prime the balance once, then refresh it in the background
+        self.account = AccountState(self.exchange, [self.symbol], refresh_interval=BALANCE_REFRESH_INTERVAL,
+                                    include_positions=False)
+        self.account.refresh()
+        self.account.start()
+        
         logger.info("Bot started successfully!")
         
         while self.running:
             try:
-                start_time = time.time()
+                start_time = time.perf_counter()
                 
                 # Fetch orderbook
                 orderbook = self.exchange.fetch_order_book(self.symbol)
@@ -396,17 +489,22 @@ class StandaloneMarketMaker:
                     logger.warning("Empty orderbook, retrying...")
                     time.sleep(1)
                     continue
+                tick_time = time.perf_counter()
+                self.latency.record('book', tick_time - start_time)
                 
                 # Calculate mid price
                 best_bid = orderbook['bids'][0][0]
                 best_ask = orderbook['asks'][0][0]
                 mid_price = (best_bid + best_ask) / 2
                 
-                # Update price history
-                self.price_history.append(mid_price)
+                # Update price history and volatility
+                self.update_price(mid_price)
                 
                 # Update inventory
                 self.update_inventory()
+                self.update_calibration()
+                stage_start = time.perf_counter()
+                self.latency.record('inventory', stage_start - tick_time)
                 
                 # Check risk limits
                 inventory_value = abs(self.inventory * mid_price)
@@ -420,16 +518,28 @@ class StandaloneMarketMaker:
                 # Calculate quotes
                 bid_price, ask_price = self.calculate_quote_prices(mid_price)
                 size = self.calculate_position_size(mid_price)
+                now = time.perf_counter()
+                self.latency.record('quote', now - stage_start)
+                stage_start = now
                 
                 # Display status
                 self.display_status(mid_price, bid_price, ask_price, size)
+                now = time.perf_counter()
+                self.latency.record('display', now - stage_start)
+                stage_start = now
                 
                 # Place orders
                 self.place_orders(bid_price, ask_price, size)
+                now = time.perf_counter()
+                self.latency.record('orders', now - stage_start)
+                self.latency.record('tick_to_quote', now - tick_time)
+                self.latency.maybe_log_summary()
                 
                 # Sleep until next update
-                elapsed = time.time() - start_time
+                elapsed = time.perf_counter() - start_time
                 sleep_time = max(0, UPDATE_FREQUENCY - elapsed)
+                # Back off while the exchange has us paused for rate limiting
+                sleep_time = max(sleep_time, self.scheduler.cooldown_remaining())
                 time.sleep(sleep_time)
                 
             except KeyboardInterrupt:
@@ -440,7 +550,10 @@ class StandaloneMarketMaker:
                 time.sleep(5)
         
         # Cleanup
+        self.running = False
+        self.account.stop()
         self.cancel_all_orders()
+        logger.info(self.latency.summary_line())
         logger.info("🛑 Bot stopped")
     
     def stop(self) -> None:
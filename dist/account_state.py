@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Account State Cache - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Balance, positions and margin refreshed off the quoting path
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AccountSnapshot:
+    """Immutable view of the account at one refresh
+
+    fetched_at is a time.monotonic() reading (0 when never fetched), so
+    age is immune to wall-clock adjustments.
+    """
+
+    def __init__(self, balance: Optional[Dict[str, Any]] = None,
+                 positions: Optional[Dict[str, Dict[str, Any]]] = None,
+                 fetched_at: float = 0.0, source: str = 'none'):
+        """Initialize a snapshot from a ccxt balance and positions by symbol"""
+        self.balance = balance or {}
+        self.positions = positions or {}
+        self.fetched_at = fetched_at
+        self.timestamp = int(time.time() * 1000) if fetched_at else None
+        self.source = source
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was fetched (inf if never)"""
+        return time.monotonic() - self.fetched_at if self.fetched_at else math.inf
+
+    def free(self, currency: str) -> float:
+        """Free balance of a currency"""
+        return self.balance.get(currency, {}).get('free') or 0.0
+
+    def used(self, currency: str) -> float:
+        """Balance locked as order or position margin"""
+        return self.balance.get(currency, {}).get('used') or 0.0
+
+    def total(self, currency: str) -> float:
+        """Total balance (equity for margin accounts)"""
+        return self.balance.get(currency, {}).get('total') or 0.0
+
+    def margin_ratio(self, currency: str) -> float:
+        """Share of the balance in use as margin (0..1)"""
+        total = self.total(currency)
+        return self.used(currency) / total if total > 0 else 0.0
+
+    def position(self, symbol: str) -> float:
+        """Signed position size in contracts as reported by the exchange"""
+        position = self.positions.get(symbol)
+        if not position:
+            return 0.0
+        contracts = float(position.get('contracts') or 0)
+        return -contracts if position.get('side') == 'short' else contracts
+
+
+class AccountState:
+    """Cached account state shared by sizing, display and risk checks
+
+    Readers take self.snapshot (an attribute read, O(1)) and never wait on
+    the exchange. A refresh builds a new AccountSnapshot and swaps the
+    reference, so readers always see a consistent state. Refreshes run on
+    a background thread (sync ccxt), as an asyncio task (async ccxt), or
+    are pushed from the private balance stream (ccxt.pro watch_balance).
+    request_refresh() wakes the thread or task early, e.g. after a fill.
+    """
+
+    def __init__(self, exchange: Any, symbols: Optional[List[str]] = None,
+                 refresh_interval: float = 10.0, max_age: Optional[float] = None,
+                 include_positions: bool = True, min_interval: float = 1.0):
+        """Initialize an empty cache"""
+        self.exchange = exchange
+        self.symbols = symbols
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age if max_age is not None else 3 * refresh_interval
+        self.min_interval = min_interval
+        self.include_positions = include_positions and bool(getattr(exchange, 'has', {}).get('fetchPositions'))
+        self.snapshot = AccountSnapshot()
+        self.refreshes = 0
+        self.errors = 0
+        self.listeners: List[Callable[[AccountSnapshot], None]] = []
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        # Created by run_async() on its event loop
+        self.async_wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def stale(self) -> bool:
+        """True when the snapshot is older than max_age"""
+        return self.snapshot.age > self.max_age
+
+    def free(self, currency: str) -> float:
+        """Free balance of a currency from the current snapshot"""
+        return self.snapshot.free(currency)
+
+    def _index_positions(self, positions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return {p['symbol']: p for p in positions if p.get('symbol')}
+
+    def _publish(self, balance: Dict[str, Any], positions: Dict[str, Dict[str, Any]], source: str) -> None:
+        """Swap in a new snapshot and notify listeners"""
+        self.snapshot = AccountSnapshot(balance, positions, time.monotonic(), source)
+        self.refreshes += 1
+        for listener in self.listeners:
+            listener(self.snapshot)
+
+    def apply(self, balance: Dict[str, Any], positions: Dict[str, Dict[str, Any]], source: str) -> None:
+        """Swap in account state fetched elsewhere (e.g. by a gateway process)"""
+        self._publish(balance, positions, source)
+
+    def refresh(self) -> bool:
+        """Fetch balance (and positions) once; keeps the old snapshot on error"""
+        try:
+            balance = self.exchange.fetch_balance()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error refreshing balance: {e}")
+            return False
+        positions = self.snapshot.positions
+        if self.include_positions:
+            try:
+                positions = self._index_positions(self.exchange.fetch_positions(self.symbols))
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Error refreshing positions: {e}")
+        self._publish(balance, positions, 'rest')
+        return True
+
+    async def refresh_async(self) -> bool:
+        """refresh() for ccxt.async_support exchanges"""
+        try:
+            balance = await self.exchange.fetch_balance()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error refreshing balance: {e}")
+            return False
+        positions = self.snapshot.positions
+        if self.include_positions:
+            try:
+                positions = self._index_positions(await self.exchange.fetch_positions(self.symbols))
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Error refreshing positions: {e}")
+        self._publish(balance, positions, 'rest')
+        return True
+
+    def request_refresh(self) -> None:
+        """Ask the background thread or task to refresh now (e.g. after a fill)"""
+        self.wakeup.set()
+        if self.async_wakeup is not None:
+            self.async_wakeup.set()
+
+    def _refresh_loop(self) -> None:
+        while self.running:
+            self.wakeup.wait(self.refresh_interval)
+            self.wakeup.clear()
+            # Coalesce bursts of wake-ups (e.g. several fills) into one refresh
+            delay = self.min_interval - self.snapshot.age
+            if delay > 0:
+                time.sleep(delay)
+            if self.running:
+                self.refresh()
+
+    def start(self) -> None:
+        """Start the background refresh thread (sync exchanges)
+
+        The caller primes the cache with refresh() first; the thread then
+        refreshes every refresh_interval or when woken.
+        """
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._refresh_loop, name='account-state', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    async def run_async(self) -> None:
+        """Background task refreshing on a schedule or when woken (async exchanges)"""
+        self.async_wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.async_wakeup.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.async_wakeup.clear()
+            delay = self.min_interval - self.snapshot.age
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.refresh_async()
+
+    async def watch(self, exchange: Any) -> None:
+        """Apply balance updates from the private stream (ccxt.pro watch_balance)"""
+        while True:
+            try:
+                balance = await exchange.watch_balance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Balance stream error: {e}")
+                await asyncio.sleep(1)
+                continue
+            self._publish(balance, self.snapshot.positions, 'stream')
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Async Market Making Engine - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Concurrent quoting on top of ccxt.async_support
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Optional, Tuple
+
+import ccxt.async_support as ccxt_async
+
+from market_maker_bot import UniversalMarketMaker, logger
+from order_book import BookSynchronizer, CcxtProFeed, LocalOrderBook, ccxtpro
+from order_manager import AsyncQuoteManager
+from quote_ladder import AsyncLadderManager
+from risk_engine import FLATTEN, HALTED
+
+
+class AsyncMarketMaker(UniversalMarketMaker):
+    """Universal market maker running on an asyncio event loop
+
+    Strategy math is inherited unchanged from UniversalMarketMaker. Only the
+    I/O is different: the order book and trade fetches overlap, bid and ask
+    updates are sent concurrently, and the balance is refreshed by a background
+    task so it never sits on the quoting path.
+
+    With market_data.source set to 'stream' the top of book comes from a
+    local L2 book fed by websocket depth updates, and the loop quotes as
+    soon as the book changes instead of sleeping a fixed interval. Any
+    async iterator of depth messages (e.g. order_book.ReplayFeed) can be
+    passed as feed to drive the book offline.
+    """
+
+    def __init__(self, config_path: str = 'config.json', feed: Any = None):
+        """Initialize the async market maker"""
+        super().__init__(config_path)
+        market_data = self.config.get('market_data', {})
+        self.market_data_source = 'stream' if feed is not None else market_data.get('source', 'rest')
+        self.book_depth = market_data.get('depth', 20)
+        self.min_quote_interval = market_data.get('min_quote_interval', 0.2)
+        self.feed = feed
+        self.book = None
+        self.book_sync = None
+        self.book_event = None
+        self.fills_source = self.config.get('fills', {}).get('source', 'poll')
+        self.background_tasks = []
+
+    async def initialize_exchange_async(self) -> None:
+        """Initialize the async exchange connection"""
+        exchange_name = self.config['exchange']['name'].lower()
+
+        if exchange_name not in self.SUPPORTED_EXCHANGES:
+            raise ValueError(f"Exchange {exchange_name} not supported. Supported exchanges: {list(self.SUPPORTED_EXCHANGES.keys())}")
+
+        module = ccxt_async
+        streaming = (self.market_data_source == 'stream' and self.feed is None) or self.fills_source == 'stream'
+        if streaming:
+            if ccxtpro is None:
+                raise ImportError("Streaming market data or fills require ccxt.pro (ccxt >= 4)")
+            module = ccxtpro
+        exchange_class = getattr(module, exchange_name)
+        self.exchange = exchange_class(self.build_exchange_config())
+
+        # Warm start: markets from the snapshot, refreshed by a background task
+        snapshot = self.markets_snapshot()
+        if snapshot and snapshot.apply(self.exchange):
+            logger.info(f"Successfully connected to {exchange_name} (async, markets from snapshot)")
+            delay = self.config.get('warm_start', {}).get('markets_refresh_delay', 30)
+            self.background_tasks.append(asyncio.ensure_future(self.refresh_markets_async(snapshot, delay)))
+            return
+
+        try:
+            await self.exchange.load_markets()
+            logger.info(f"Successfully connected to {exchange_name} (async)")
+        except Exception as e:
+            logger.error(f"Failed to connect to exchange: {e}")
+            await self.exchange.close()
+            raise
+        if snapshot:
+            snapshot.save(self.exchange)
+
+    async def refresh_markets_async(self, snapshot: Any, delay: float) -> None:
+        """Reload markets after delay seconds and rewrite the snapshot"""
+        await asyncio.sleep(delay)
+        previous = self.market_precisions(snapshot)
+        try:
+            await self.exchange.load_markets(True)
+        except Exception as e:
+            logger.warning(f"Background markets refresh failed: {e}")
+            return
+        self.markets_refreshed(snapshot, previous)
+
+    async def set_leverage_async(self) -> None:
+        """Set leverage for the trading pair"""
+        leverage = self.config['trading'].get('leverage', 1)
+
+        try:
+            if hasattr(self.exchange, 'set_leverage'):
+                await self.exchange.set_leverage(leverage, self.symbol)
+                logger.info(f"Leverage set to {leverage}x")
+        except Exception as e:
+            logger.warning(f"Could not set leverage: {e}")
+
+    async def create_account_state_async(self) -> None:
+        """Prime the account cache and keep it fresh with background tasks"""
+        self.account = self.build_account_state([self.symbol])
+        await self.account.refresh_async()
+        self.background_tasks.append(asyncio.ensure_future(self.account.run_async()))
+        if self.fills_source == 'stream' and self.exchange.has.get('watchBalance'):
+            self.background_tasks.append(asyncio.ensure_future(self.account.watch(self.exchange)))
+
+    async def market_data_loop(self) -> None:
+        """Background task feeding the local order book from the depth stream"""
+        while self.running:
+            try:
+                async for message in self.feed:
+                    changed = self.book_sync.process(message)
+                    if self.book_sync.needs_snapshot:
+                        snapshot = await self.exchange.fetch_order_book(self.symbol, self.book_depth)
+                        self.book_sync.on_snapshot(snapshot)
+                        changed = True
+                    if changed:
+                        self.book_event.set()
+                    if not self.running:
+                        return
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Market data stream error: {e}")
+                await asyncio.sleep(1)
+
+    async def fetch_top_of_book(self, timeout: float) -> Optional[Tuple[float, float]]:
+        """Best bid/ask from the local book (streaming) or a REST snapshot"""
+        if self.book is None:
+            orderbook = await self.exchange.fetch_order_book(self.symbol)
+            if not orderbook['bids'] or not orderbook['asks']:
+                return None
+            return orderbook['bids'][0][0], orderbook['asks'][0][0]
+
+        # Quote as soon as the book changes, or requote after timeout anyway
+        try:
+            await asyncio.wait_for(self.book_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.book_event.clear()
+
+        best_bid = self.book.best_bid()
+        best_ask = self.book.best_ask()
+        if best_bid is None or best_ask is None or not self.book.synced:
+            return None
+        return best_bid, best_ask
+
+    async def fills_loop(self) -> None:
+        """Background task applying fills from the private execution stream"""
+        while self.running:
+            try:
+                await self.fill_ledger.watch(self.exchange, self.sync_inventory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fill stream error: {e}")
+                await asyncio.sleep(1)
+
+    async def update_inventory_async(self) -> None:
+        """Apply new fills since the ledger cursor (no-op when streaming fills)"""
+        if self.fills_source == 'stream':
+            return
+
+        current_time = time.time()
+        if current_time - self.last_trade_check < self.config.get('fills', {}).get('poll_interval', 0):
+            return
+        max_deferral = self.config.get('rate_limit', {}).get('max_fill_deferral', 5.0)
+        if self.scheduler and self.scheduler.congested and current_time - self.last_trade_check < max_deferral:
+            return
+        self.last_trade_check = current_time
+
+        try:
+            await self.fill_ledger.poll_async(self.exchange)
+            self.sync_inventory()
+        except Exception as e:
+            logger.error(f"Error updating inventory: {e}")
+
+    async def update_calibration_async(self) -> None:
+        """Fetch public trades since the calibration cursor and refit (A, k) when due"""
+        if not self.calibration_due():
+            return
+        if self.scheduler and self.scheduler.congested:
+            return
+        self.last_calibration = time.time()
+        try:
+            since = self.intensity.cursor or None
+            trades = await self.exchange.fetch_trades(self.symbol, since=since)
+            self.apply_trades(trades)
+        except Exception as e:
+            logger.error(f"Error updating calibration: {e}")
+
+    async def cancel_all_orders_async(self) -> None:
+        """Cancel all open orders"""
+        try:
+            if hasattr(self.exchange, 'cancel_all_orders'):
+                await self.exchange.cancel_all_orders(self.symbol)
+            else:
+                open_orders = await self.exchange.fetch_open_orders(self.symbol)
+                await asyncio.gather(*[
+                    self.exchange.cancel_order(order['id'], self.symbol) for order in open_orders
+                ])
+            if self.order_manager:
+                self.order_manager.forget()
+        except Exception as e:
+            logger.error(f"Error cancelling orders: {e}")
+
+    async def place_orders_async(self, bid_price: float, ask_price: float, size: float) -> None:
+        """Update bid and ask concurrently, touching only the sides (or ladder levels) that changed"""
+        bids, asks = self.plan_quotes(bid_price, ask_price, size)
+        if isinstance(self.order_manager, AsyncLadderManager):
+            await self.order_manager.update_ladder(bids, asks)
+        else:
+            await self.order_manager.update_sides(bids[0] if bids else None, asks[0] if asks else None)
+
+    async def flatten_position_async(self) -> None:
+        """Cancel all quotes and close the position at market"""
+        await self.cancel_all_orders_async()
+        order = self.flatten_order()
+        if order is None:
+            return
+        side, amount, params = order
+        try:
+            await self.exchange.create_order(self.symbol, 'market', side, amount, None, params)
+            logger.warning(f"Position flattened: {side} {amount} at market")
+        except Exception as e:
+            logger.error(f"Error flattening position: {e}")
+
+    async def check_risk_async(self, mid_price: float) -> Optional[float]:
+        """check_risk() with an async flatten"""
+        level = self.risk.mark(mid_price)
+        if level == FLATTEN:
+            await self.flatten_position_async()
+        if level in (FLATTEN, HALTED):
+            return min(5.0, max(self.risk.halt_remaining(), 1.0))
+        return None
+
+    async def run_async(self) -> None:
+        """Main async bot loop"""
+        logger.info("Starting Universal Market Maker Bot (async mode)")
+        self.started_at = time.perf_counter()
+
+        # An exchange may be injected up front (e.g. sim_exchange.AsyncSimExchange)
+        if self.exchange is None:
+            await self.initialize_exchange_async()
+        self.start_metrics()
+        self.start_scheduler()
+        self.validate_symbol()
+        self.create_order_manager(AsyncQuoteManager, AsyncLadderManager)
+        self.create_fill_ledger()
+        self.create_risk_engine()
+        self.create_calibration()
+        self.create_checkpoint()
+        self.create_recorder()
+        await self.set_leverage_async()
+
+        self.running = True
+        update_frequency = self.config['strategy']['update_frequency']
+
+        await self.create_account_state_async()
+
+        if self.market_data_source == 'stream':
+            self.book = LocalOrderBook(self.symbol)
+            self.book_sync = BookSynchronizer(self.book)
+            self.book_event = asyncio.Event()
+            if self.feed is None:
+                self.feed = CcxtProFeed(self.exchange, self.symbol, self.book_depth)
+            self.background_tasks.append(asyncio.ensure_future(self.market_data_loop()))
+            logger.info(f"Streaming market data enabled (depth {self.book_depth})")
+
+        if self.fills_source == 'stream':
+            # Catch up once over REST, then apply fills as they are pushed
+            await self.fill_ledger.poll_async(self.exchange)
+            self.sync_inventory()
+            self.background_tasks.append(asyncio.ensure_future(self.fills_loop()))
+            logger.info("Streaming private fills enabled")
+
+        logger.info(f"Bot started - Update frequency: {update_frequency}s")
+
+        try:
+            while self.running:
+                try:
+                    start_time = time.monotonic()
+                    cycle_start = time.perf_counter()
+
+                    # Fetch top of book, fills and public trades concurrently
+                    top, _, _ = await asyncio.gather(
+                        self.fetch_top_of_book(update_frequency),
+                        self.update_inventory_async(),
+                        self.update_calibration_async()
+                    )
+                    if top is None:
+                        logger.warning("Empty orderbook, retrying...")
+                        await asyncio.sleep(1)
+                        continue
+                    # In streaming mode this includes waiting for the next book change
+                    tick_time = time.perf_counter()
+                    self.metrics.record('stage.book', tick_time - cycle_start)
+
+                    best_bid, best_ask = top
+                    mid_price = (best_bid + best_ask) / 2
+                    self.record_book(best_bid, best_ask)
+
+                    self.update_price(mid_price)
+
+                    # Check risk limits (in memory; per-order checks run in place_orders_async)
+                    backoff = await self.check_risk_async(mid_price)
+                    if backoff is not None:
+                        await asyncio.sleep(backoff)
+                        continue
+
+                    # Calculate quotes
+                    bid_price, ask_price = self.calculate_quote_prices(mid_price)
+                    size = self.calculate_position_size(mid_price)
+                    stage_start = time.perf_counter()
+                    self.metrics.record('stage.quote', stage_start - tick_time)
+
+                    self.display_status(mid_price, bid_price, ask_price, size)
+                    now = time.perf_counter()
+                    self.metrics.record('stage.display', now - stage_start)
+                    stage_start = now
+
+                    await self.place_orders_async(bid_price, ask_price, size)
+                    now = time.perf_counter()
+                    self.metrics.record('stage.orders', now - stage_start)
+                    self.metrics.record('tick_to_quote', now - tick_time)
+                    if self.started_at is not None:
+                        self.metrics.record('startup', now - self.started_at)
+                        logger.info(f"First quote {now - self.started_at:.3f}s after start")
+                        self.started_at = None
+                    self.record_quote(mid_price, bid_price, ask_price, size)
+                    self.metrics.maybe_log_summary()
+                    self.maybe_checkpoint()
+
+                    # Streaming mode waits on book changes instead of a fixed interval
+                    elapsed = time.monotonic() - start_time
+                    interval = self.min_quote_interval if self.book is not None else update_frequency
+                    delay = max(0, interval - elapsed)
+                    if self.scheduler:
+                        delay = max(delay, self.scheduler.cooldown_remaining())
+                    await asyncio.sleep(delay)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in main loop: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            self.running = False
+            for task in self.background_tasks:
+                task.cancel()
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+            self.background_tasks = []
+
+            await self.cancel_all_orders_async()
+            self.save_checkpoint()
+            await self.exchange.close()
+            if self.recorder:
+                self.recorder.close()
+            logger.info(self.metrics.summary_line())
+            self.metrics.close()
+            logger.info("Bot stopped")
+
+    def run(self) -> None:
+        """Run the async loop until interrupted"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Shutting down...")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Universal Market Making Bot (async)')
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config.json',
+        help='Path to configuration file (default: config.json)'
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        logger.info("Please copy config.example.json to config.json and update with your settings")
+        sys.exit(1)
+
+    bot = AsyncMarketMaker(args.config)
+
+    try:
+        bot.run()
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Backtest and Replay Engine - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Replays recorded top-of-book and trades through the Avellaneda-Stoikov quoting logic
+"""
+
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from calibration import SECONDS_PER_HOUR
+from fill_ledger import FillLedger
+from risk_engine import FLATTEN, HALTED, RiskEngine
+
+logger = logging.getLogger(__name__)
+
+
+class MarketData:
+    """Recorded top-of-book snapshots and public trades as NumPy arrays
+
+    Timestamps are milliseconds. Trade side is +1 for buyer-initiated and
+    -1 for seller-initiated prints.
+    """
+
+    def __init__(self, timestamp: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                 bid_size: Optional[np.ndarray] = None, ask_size: Optional[np.ndarray] = None,
+                 trade_timestamp: Optional[np.ndarray] = None, trade_price: Optional[np.ndarray] = None,
+                 trade_amount: Optional[np.ndarray] = None, trade_side: Optional[np.ndarray] = None):
+        """Initialize from arrays (trades are optional)"""
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.bid = np.asarray(bid, dtype=np.float64)
+        self.ask = np.asarray(ask, dtype=np.float64)
+        n = len(self.timestamp)
+        self.bid_size = np.asarray(bid_size, dtype=np.float64) if bid_size is not None else np.zeros(n)
+        self.ask_size = np.asarray(ask_size, dtype=np.float64) if ask_size is not None else np.zeros(n)
+        self.mid = (self.bid + self.ask) / 2
+
+        empty = np.zeros(0)
+        self.trade_timestamp = np.asarray(trade_timestamp if trade_timestamp is not None else empty, dtype=np.int64)
+        self.trade_price = np.asarray(trade_price if trade_price is not None else empty, dtype=np.float64)
+        self.trade_amount = np.asarray(trade_amount if trade_amount is not None else empty, dtype=np.float64)
+        self.trade_side = np.asarray(trade_side if trade_side is not None else empty, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def from_csv(cls, book_path: str, trades_path: Optional[str] = None) -> 'MarketData':
+        """Load CSV files
+
+        book: timestamp,bid,ask[,bid_size,ask_size]
+        trades: timestamp,price,amount,side (side is buy/sell)
+        """
+        with open(book_path, 'r') as f:
+            rows = list(csv.DictReader(f))
+        book = {
+            'timestamp': [int(float(r['timestamp'])) for r in rows],
+            'bid': [float(r['bid']) for r in rows],
+            'ask': [float(r['ask']) for r in rows],
+            'bid_size': [float(r.get('bid_size') or 0) for r in rows],
+            'ask_size': [float(r.get('ask_size') or 0) for r in rows]
+        }
+
+        trades = {}
+        if trades_path:
+            with open(trades_path, 'r') as f:
+                rows = list(csv.DictReader(f))
+            trades = {
+                'trade_timestamp': [int(float(r['timestamp'])) for r in rows],
+                'trade_price': [float(r['price']) for r in rows],
+                'trade_amount': [float(r['amount']) for r in rows],
+                'trade_side': [1 if r['side'] == 'buy' else -1 for r in rows]
+            }
+
+        return cls(**book, **trades)
+
+
+def strategy_params(config: Dict[str, Any], market: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Flatten a bot config into the parameters the backtest uses
+
+    Mirrors how UniversalMarketMaker reads its config. The reservation
+    price uses gamma for the inventory penalty, as SpreadModel does, so
+    there is no separate alpha.
+    """
+    strategy = config['strategy']
+    trading = config['trading']
+    risk = config['risk']
+    market = market or {}
+    return {
+        'gamma': strategy['gamma'],
+        'k': strategy['k'],
+        'time_horizon': strategy['time_horizon'],
+        'sigma_lookback': strategy['sigma_lookback'],
+        'min_spread': strategy['min_spread'],
+        'max_spread_percent': strategy['max_spread_percent'],
+        'max_quote_distance_percent': strategy['max_quote_distance_percent'],
+        'order_size_type': trading.get('order_size_type', 'fixed'),
+        'order_size': trading.get('order_size', 0.001),
+        'order_size_percent': trading.get('order_size_percent', 0.01),
+        'max_inventory_usd': risk['max_inventory_usd'],
+        'max_position_size_usd': risk.get('max_position_size_usd'),
+        'stop_loss_percent': risk.get('stop_loss_percent'),
+        'daily_loss_limit_usd': risk.get('daily_loss_limit_usd'),
+        'shrink_at': risk.get('shrink_at', 0.5),
+        'reduce_only_at': risk.get('reduce_only_at', 0.8),
+        'shrink_factor': risk.get('shrink_factor', 0.5),
+        'stop_loss_cooldown': risk.get('stop_loss_cooldown', 60),
+        'tick_size': market.get('tick_size', 0.01),
+        'lot_size': market.get('lot_size', 0.001),
+        'min_size': market.get('min_size', 0.001),
+        'initial_balance': market.get('initial_balance', 1000.0),
+        'maker_fee': market.get('maker_fee', 0.0),
+        'latency_ms': market.get('latency_ms', 0)
+    }
+
+
+def rolling_volatility(mid: np.ndarray, lookback: int, timestamp: Optional[np.ndarray] = None,
+                       time_unit: float = SECONDS_PER_HOUR, floor: float = 0.001,
+                       default: float = 0.01) -> np.ndarray:
+    """Sigma at every tick, identical to the bots' window VolatilityEstimator
+
+    With timestamps (ms) the per-tick variance is normalised by the mean
+    tick interval over the window; without them every tick is one second.
+    """
+    n = len(mid)
+    sigma = np.full(n, default)
+    if n < 3:
+        return sigma
+
+    returns = np.diff(np.log(mid))
+    window = max(lookback - 1, 2)
+    c1 = np.concatenate(([0.0], np.cumsum(returns)))
+    c2 = np.concatenate(([0.0], np.cumsum(returns * returns)))
+
+    # Tick i has returns[0:i] available; the window holds the last m of them
+    i = np.arange(2, n)
+    m = np.minimum(i, window)
+    total = c1[i] - c1[i - m]
+    total_sq = c2[i] - c2[i - m]
+    variance = np.maximum(total_sq - total * total / m, 0.0) / (m - 1)
+    if timestamp is None:
+        interval = np.ones(len(i))
+    else:
+        seconds = timestamp / 1000.0
+        interval = (seconds[i] - seconds[i - m]) / m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = np.maximum(np.sqrt(variance * time_unit / interval), floor)
+    sigma[2:] = np.where(interval > 0, scaled, default)
+    return sigma
+
+
+def time_remaining(timestamp: np.ndarray, horizon: float,
+                   horizon_start: Optional[float] = None) -> np.ndarray:
+    """Time left in the hourly horizon, as in UniversalMarketMaker.calculate_time_remaining
+
+    The horizon restarts every hour from horizon_start (seconds), which
+    defaults to the first timestamp - the bot starts its horizon when it
+    starts quoting.
+    """
+    seconds = timestamp / 1000.0
+    if horizon_start is None:
+        horizon_start = seconds[0] if len(seconds) else 0.0
+    elapsed = (seconds - horizon_start) % SECONDS_PER_HOUR
+    return np.maximum(horizon - elapsed / SECONDS_PER_HOUR, 0.01)
+
+
+def optimal_spread(mid: np.ndarray, sigma: np.ndarray, t_rem: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+    """Vectorized UniversalMarketMaker.calculate_optimal_spread"""
+    gamma = params['gamma']
+    spread = gamma * sigma ** 2 * t_rem + (2 / gamma) * math.log(1 + gamma / params['k'])
+    spread = np.maximum(spread, params['min_spread']) * mid
+    return np.minimum(spread, mid * params['max_spread_percent'])
+
+
+def round_to_tick(values: np.ndarray, tick: float) -> np.ndarray:
+    """Round prices to the exchange tick"""
+    return np.round(values / tick) * tick
+
+
+def compute_quotes(data: MarketData, params: Dict[str, Any],
+                   inventory: Any = 0.0) -> Dict[str, np.ndarray]:
+    """Quotes for the whole dataset in one vectorized pass
+
+    inventory may be a scalar or an array aligned with the book (e.g. the
+    recorded inventory path of a live session).
+    """
+    sigma = rolling_volatility(data.mid, params['sigma_lookback'], data.timestamp)
+    t_rem = time_remaining(data.timestamp, params['time_horizon'], params.get('horizon_start'))
+    spread = optimal_spread(data.mid, sigma, t_rem, params)
+
+    # SpreadModel.reservation_offset: q * gamma * sigma^2 * T
+    reservation = data.mid - inventory * params['gamma'] * sigma ** 2 * t_rem
+    distance = params['max_quote_distance_percent']
+    bid = np.minimum(reservation - spread / 2, data.mid * (1 - distance))
+    ask = np.maximum(reservation + spread / 2, data.mid * (1 + distance))
+
+    return {
+        'sigma': sigma,
+        'time_remaining': t_rem,
+        'spread': spread,
+        'reservation': reservation,
+        'bid': round_to_tick(bid, params['tick_size']),
+        'ask': round_to_tick(ask, params['tick_size'])
+    }
+
+
+def _interval_extremes(data: MarketData, starts: np.ndarray, ends: np.ndarray):
+    """Lowest seller-initiated and highest buyer-initiated print per quote interval"""
+    n = len(starts)
+    min_sell = np.full(n, np.inf)
+    max_buy = np.full(n, -np.inf)
+    if len(data.trade_price) == 0:
+        return min_sell, max_buy
+
+    sell_price = np.where(data.trade_side < 0, data.trade_price, np.inf)
+    buy_price = np.where(data.trade_side > 0, data.trade_price, -np.inf)
+    nonempty = ends > starts
+    if nonempty.any():
+        idx = starts[nonempty]
+        # reduceat needs in-range indices; empty intervals are masked out above
+        sell_red = np.minimum.reduceat(np.append(sell_price, np.inf), idx)
+        buy_red = np.maximum.reduceat(np.append(buy_price, -np.inf), idx)
+        # reduceat reduces up to the next start, so cap each segment at its own end
+        last = np.append(idx[1:], len(sell_price))
+        exact = last == ends[nonempty]
+        min_sell[np.flatnonzero(nonempty)[exact]] = sell_red[exact]
+        max_buy[np.flatnonzero(nonempty)[exact]] = buy_red[exact]
+        for j in np.flatnonzero(nonempty)[~exact]:
+            segment = slice(starts[j], ends[j])
+            min_sell[j] = sell_price[segment].min()
+            max_buy[j] = buy_price[segment].max()
+    return min_sell, max_buy
+
+
+def risk_engine(params: Dict[str, Any], ledger: FillLedger, clock: Any) -> RiskEngine:
+    """The bots' pre-trade RiskEngine over a backtest ledger, on the replayed clock"""
+    return RiskEngine(
+        ledger,
+        params['lot_size'],
+        params['min_size'],
+        params['max_inventory_usd'],
+        max_order_usd=params.get('max_position_size_usd'),
+        stop_loss_percent=params.get('stop_loss_percent'),
+        daily_loss_limit_usd=params.get('daily_loss_limit_usd'),
+        shrink_at=params.get('shrink_at', 0.5),
+        reduce_only_at=params.get('reduce_only_at', 0.8),
+        shrink_factor=params.get('shrink_factor', 0.5),
+        cooldown=params.get('stop_loss_cooldown', 60),
+        clock=clock
+    )
+
+
+def run_backtest(data: MarketData, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Simulate quoting and fills over the dataset
+
+    Inventory-independent terms (sigma, horizon, spread) are computed for
+    the whole dataset with NumPy; only the inventory-dependent reservation
+    shift, risk checks and fill bookkeeping run in a scalar pass.
+
+    Fill model: quotes placed at tick i rest until tick i+1 (shifted by
+    latency_ms). A bid fills when a seller-initiated print trades through
+    it or the next best ask crosses it; a print exactly at the bid fills
+    only once the volume traded there exceeds the queue ahead, which is
+    the displayed touch size when joining the best bid and zero when
+    improving it. Unchanged quotes keep their queue position across ticks.
+    Asks are symmetric.
+
+    Risk: every tick goes through the same RiskEngine as the bots, fed by
+    a FillLedger and the replayed clock. Orders are clipped to
+    max_position_size_usd and to the side's room under max_inventory_usd,
+    only the reducing side is quoted in reduce-only, and a stop loss or
+    daily loss flattens the position at the touch and pauses quoting.
+    """
+    n = len(data)
+    tick = params['tick_size']
+    lot = params['lot_size']
+    max_inventory = params['max_inventory_usd']
+    fee_rate = params['maker_fee']
+
+    quotes = compute_quotes(data, params)
+    # Reservation offset per unit of inventory, gamma * sigma^2 * T as in SpreadModel
+    skew = params['gamma'] * quotes['sigma'] ** 2 * quotes['time_remaining']
+    half_spread = quotes['spread'] / 2
+    distance = params['max_quote_distance_percent']
+
+    # Trade index ranges for each quote interval
+    latency = params['latency_ms']
+    bounds = np.append(data.timestamp[1:], np.iinfo(np.int64).max - latency) + latency
+    starts = np.searchsorted(data.trade_timestamp, data.timestamp + latency, side='right')
+    ends = np.searchsorted(data.trade_timestamp, bounds, side='right')
+    min_sell, max_buy = _interval_extremes(data, starts, ends)
+    next_ask = np.append(data.ask[1:], np.inf)
+    next_bid = np.append(data.bid[1:], -np.inf)
+
+    # Python floats for the scalar pass: arithmetic and round() on NumPy
+    # scalars are several times slower
+    mids, best_bids, best_asks = data.mid.tolist(), data.bid.tolist(), data.ask.tolist()
+    bid_sizes, ask_sizes = data.bid_size.tolist(), data.ask_size.tolist()
+    skew, half_spread = skew.tolist(), half_spread.tolist()
+    min_sell, max_buy = min_sell.tolist(), max_buy.tolist()
+    next_ask, next_bid = next_ask.tolist(), next_bid.tolist()
+    timestamps = data.timestamp.tolist()
+
+    ledger = FillLedger('backtest')
+    now = [0.0]
+    risk = risk_engine(params, ledger, lambda: now[0])
+
+    inventory = np.zeros(n)
+    cash = np.zeros(n)
+    bid_prices = np.full(n, np.nan)
+    ask_prices = np.full(n, np.nan)
+    q = 0.0
+    c = 0.0
+    fees = 0.0
+    bid_fills = ask_fills = 0
+    bid_quoted = ask_quoted = 0
+    last_bid = last_ask = None
+    bid_queue = ask_queue = 0.0
+
+    for i in range(n):
+        mid = mids[i]
+        now[0] = timestamps[i] / 1000.0
+        level = risk.mark(mid)
+
+        if level == FLATTEN and q:
+            # As flatten_position: cancel the quotes and close at market
+            price = best_bids[i] if q > 0 else best_asks[i]
+            c += price * q
+            fee = price * abs(q) * fee_rate
+            ledger.book('sell' if q > 0 else 'buy', abs(q), price, fee)
+            fees += fee
+            q = 0.0
+
+        if level in (FLATTEN, HALTED):
+            last_bid = last_ask = None
+        else:
+            reservation = mid - q * skew[i]
+            bid = min(reservation - half_spread[i], mid * (1 - distance))
+            ask = max(reservation + half_spread[i], mid * (1 + distance))
+            bid = round(bid / tick) * tick
+            ask = round(ask / tick) * tick
+
+            # Same sizing rules as calculate_position_size
+            if params['order_size_type'] == 'fixed':
+                base = params['order_size']
+            else:
+                base = params['initial_balance'] * params['order_size_percent'] / mid
+            value = abs(q * mid)
+            if value > max_inventory * 0.7:
+                base *= 0.5
+            elif value > max_inventory * 0.5:
+                base *= 0.75
+            size = max(round(base / lot) * lot, params['min_size'])
+            bids, asks = risk.check_quotes([(bid, size)], [(ask, size)])
+
+            bid_filled = ask_filled = False
+            if bids:
+                bid_size = bids[0][1]
+                # Queue position: kept when the price is unchanged, reset otherwise
+                if bid != last_bid:
+                    best = best_bids[i]
+                    bid_queue = bid_sizes[i] if abs(bid - best) < tick / 2 else (0.0 if bid > best else np.inf)
+                last_bid = bid
+                bid_prices[i] = bid
+                bid_quoted += 1
+
+                bid_filled = min_sell[i] < bid - tick / 2 or next_ask[i] <= bid
+                if not bid_filled and min_sell[i] <= bid + tick / 2:
+                    segment = slice(starts[i], ends[i])
+                    at_price = (data.trade_side[segment] < 0) & (np.abs(data.trade_price[segment] - bid) < tick / 2)
+                    bid_queue -= data.trade_amount[segment][at_price].sum()
+                    bid_filled = bid_queue < 0
+            else:
+                last_bid = None
+
+            if asks:
+                ask_size = asks[0][1]
+                if ask != last_ask:
+                    best = best_asks[i]
+                    ask_queue = ask_sizes[i] if abs(ask - best) < tick / 2 else (0.0 if ask < best else np.inf)
+                last_ask = ask
+                ask_prices[i] = ask
+                ask_quoted += 1
+
+                ask_filled = max_buy[i] > ask + tick / 2 or next_bid[i] >= ask
+                if not ask_filled and max_buy[i] >= ask - tick / 2:
+                    segment = slice(starts[i], ends[i])
+                    at_price = (data.trade_side[segment] > 0) & (np.abs(data.trade_price[segment] - ask) < tick / 2)
+                    ask_queue -= data.trade_amount[segment][at_price].sum()
+                    ask_filled = ask_queue < 0
+            else:
+                last_ask = None
+
+            if bid_filled:
+                q += bid_size
+                c -= bid * bid_size
+                fee = bid * bid_size * fee_rate
+                ledger.book('buy', bid_size, bid, fee)
+                fees += fee
+                bid_fills += 1
+                last_bid = None
+            if ask_filled:
+                q -= ask_size
+                c += ask * ask_size
+                fee = ask * ask_size * fee_rate
+                ledger.book('sell', ask_size, ask, fee)
+                fees += fee
+                ask_fills += 1
+                last_ask = None
+
+        inventory[i] = q
+        cash[i] = c - fees
+
+    equity = cash + inventory * data.mid
+    peak = np.maximum.accumulate(equity) if n else equity
+    quoted_spread = ask_prices - bid_prices
+
+    return {
+        'params': params,
+        'inventory': inventory,
+        'equity': equity,
+        'bid': bid_prices,
+        'ask': ask_prices,
+        'sigma': quotes['sigma'],
+        'summary': {
+            'pnl': float(equity[-1]) if n else 0.0,
+            'fees': fees,
+            'bid_fills': bid_fills,
+            'ask_fills': ask_fills,
+            'bid_fill_rate': bid_fills / bid_quoted if bid_quoted else 0.0,
+            'ask_fill_rate': ask_fills / ask_quoted if ask_quoted else 0.0,
+            'max_abs_inventory': float(np.abs(inventory).max()) if n else 0.0,
+            'final_inventory': q,
+            'max_drawdown': float((peak - equity).max()) if n else 0.0,
+            'avg_spread_bps': (float(np.nanmean(quoted_spread / data.mid) * 10000)
+                               if np.isfinite(quoted_spread).any() else 0.0),
+            'flattens': risk.stats['flattens'],
+            'risk_blocked': risk.stats['blocked']
+        }
+    }
+
+
+# Worker-process copy of the dataset, set once per process by the pool initializer
+_SWEEP_DATA = None
+
+
+def _init_sweep_worker(data: MarketData) -> None:
+    global _SWEEP_DATA
+    _SWEEP_DATA = data
+
+
+def _run_sweep_point(params: Dict[str, Any]) -> Dict[str, Any]:
+    result = run_backtest(_SWEEP_DATA, params)
+    summary = dict(result['summary'])
+    summary.update({key: params[key] for key in ('gamma', 'k')})
+    return summary
+
+
+def run_sweep(data: MarketData, base_params: Dict[str, Any], grid: Dict[str, List[float]],
+              workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Backtest every combination in grid across a process pool
+
+    grid maps parameter names (e.g. gamma, k) to lists of values.
+    The dataset is shipped to each worker once, not once per task.
+    Results are returned best PnL first.
+    """
+    keys = list(grid)
+    points = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        params = dict(base_params)
+        params.update(zip(keys, values))
+        points.append(params)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                             initargs=(data,)) as pool:
+        results = list(pool.map(_run_sweep_point, points, chunksize=max(1, len(points) // 64)))
+
+    return sorted(results, key=lambda r: r['pnl'], reverse=True)
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Avellaneda-Stoikov backtest and parameter sweep')
+    parser.add_argument('--book', required=True, help='Top-of-book CSV (timestamp,bid,ask,bid_size,ask_size)')
+    parser.add_argument('--trades', help='Public trades CSV (timestamp,price,amount,side)')
+    parser.add_argument('--config', default='config.json', help='Bot configuration file (default: config.json)')
+    parser.add_argument('--tick-size', type=float, default=0.01, help='Price tick size')
+    parser.add_argument('--lot-size', type=float, default=0.001, help='Amount lot size')
+    parser.add_argument('--maker-fee', type=float, default=0.0, help='Maker fee rate')
+    parser.add_argument('--latency-ms', type=int, default=0, help='Quote latency in milliseconds')
+    parser.add_argument('--sweep', nargs='*', metavar='NAME=V1,V2',
+                        help='Parameter grid, e.g. gamma=0.01,0.1 k=1,1.5,3 time_horizon=0.5,1')
+    parser.add_argument('--workers', type=int, help='Sweep worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=20, help='Sweep results to print')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        sys.exit(1)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    data = MarketData.from_csv(args.book, args.trades)
+    params = strategy_params(config, {
+        'tick_size': args.tick_size,
+        'lot_size': args.lot_size,
+        'min_size': args.lot_size,
+        'maker_fee': args.maker_fee,
+        'latency_ms': args.latency_ms
+    })
+    logger.info(f"Loaded {len(data)} book updates and {len(data.trade_price)} trades")
+
+    if args.sweep:
+        grid = {}
+        for item in args.sweep:
+            name, values = item.split('=', 1)
+            grid[name] = [float(v) for v in values.split(',')]
+        results = run_sweep(data, params, grid, args.workers)
+        for row in results[:args.top]:
+            print(json.dumps(row))
+    else:
+        print(json.dumps(run_backtest(data, params)['summary'], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Quoting Pipeline Benchmarks - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Per-tick CPU and allocation benchmarks with stored baselines and regression checks
+"""
+
+import contextlib
+import copy
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_VERSION = 1
+DEFAULT_LOOKBACKS = [100, 1000, 10000]
+
+# Realistic ccxt market metadata: one market in decimal-places precision mode
+# (ints, as returned by older ccxt/exchanges) and one in tick-size mode
+MARKETS = {
+    'int': {
+        'id': 'BTCUSDT', 'symbol': 'BTC/USDT:USDT', 'base': 'BTC', 'quote': 'USDT', 'settle': 'USDT',
+        'type': 'swap', 'spot': False, 'swap': True, 'contract': True, 'linear': True, 'inverse': False,
+        'contractSize': 1, 'active': True, 'maker': 0.0002, 'taker': 0.00055,
+        'precision': {'price': 1, 'amount': 3},
+        'limits': {'amount': {'min': 0.001, 'max': 100.0}, 'price': {'min': 0.1, 'max': 1000000.0},
+                   'cost': {'min': 5.0, 'max': None}, 'leverage': {'min': 1, 'max': 100}}
+    },
+    'tick': {
+        'id': 'ETHUSDT', 'symbol': 'ETH/USDT:USDT', 'base': 'ETH', 'quote': 'USDT', 'settle': 'USDT',
+        'type': 'swap', 'spot': False, 'swap': True, 'contract': True, 'linear': True, 'inverse': False,
+        'contractSize': 1, 'active': True, 'maker': 0.0002, 'taker': 0.00055,
+        'precision': {'price': 0.01, 'amount': 0.001},
+        'limits': {'amount': {'min': 0.001, 'max': 1500.0}, 'price': {'min': 0.01, 'max': 100000.0},
+                   'cost': {'min': 5.0, 'max': None}, 'leverage': {'min': 1, 'max': 100}}
+    }
+}
+INITIAL_PRICE = {'int': 65000.0, 'tick': 3000.0}
+
+
+class StubExchange:
+    """Synchronous ccxt stand-in answering instantly from precomputed data
+
+    Order books come from a seeded random walk (a ring of pre-built books,
+    so the stub itself costs next to nothing per call); order calls echo
+    an order dict. Only the bot's own CPU time is measured.
+    """
+
+    def __init__(self, market: Dict[str, Any], initial_price: float, books: int = 1024,
+                 depth: int = 20, seed: int = 7):
+        """Build the market and the order book ring"""
+        self.id = 'stub'
+        self.rateLimit = 1.0
+        self.enableRateLimit = False
+        self.has = {'editOrder': True, 'cancelAllOrders': True, 'fetchPositions': True,
+                    'createOrders': True, 'cancelOrders': True}
+        self.markets = {market['symbol']: market}
+        self.currencies = {}
+
+        precision = market['precision']['price']
+        tick = 10 ** -precision if isinstance(precision, int) else precision
+        rng = random.Random(seed)
+        price = initial_price
+        self.books = []
+        for _ in range(books):
+            price *= math.exp(rng.gauss(0, 0.0002))
+            bid = math.floor(price / tick) * tick
+            ask = bid + tick * rng.randint(1, 3)
+            self.books.append({
+                'symbol': market['symbol'],
+                'bids': [[bid - i * tick, round(rng.uniform(0.1, 5.0), 3)] for i in range(depth)],
+                'asks': [[ask + i * tick, round(rng.uniform(0.1, 5.0), 3)] for i in range(depth)],
+                'timestamp': None, 'datetime': None, 'nonce': None
+            })
+        self.book_index = 0
+        self.order_id = 0
+
+    def _order(self, symbol: str, side: str, amount: float, price: Optional[float]) -> Dict[str, Any]:
+        self.order_id += 1
+        return {'id': str(self.order_id), 'symbol': symbol, 'side': side, 'amount': amount,
+                'price': price, 'status': 'open'}
+
+    def load_markets(self, reload: bool = False) -> Dict[str, Any]:
+        return self.markets
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        self.book_index = (self.book_index + 1) % len(self.books)
+        return self.books[self.book_index]
+
+    def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                        limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return []
+
+    def fetch_balance(self) -> Dict[str, Any]:
+        return {'USDT': {'free': 10000.0, 'used': 0.0, 'total': 10000.0}}
+
+    def fetch_positions(self, symbols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return []
+
+    def set_leverage(self, leverage: int, symbol: Optional[str] = None) -> Dict[str, Any]:
+        return {}
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float,
+                     price: Optional[float] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        return self._order(symbol, side, amount, price)
+
+    def create_limit_order(self, symbol: str, side: str, amount: float, price: float) -> Dict[str, Any]:
+        return self._order(symbol, side, amount, price)
+
+    def create_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self._order(o['symbol'], o['side'], o['amount'], o.get('price')) for o in orders]
+
+    def edit_order(self, id: str, symbol: str, type: str, side: str, amount: Optional[float] = None,
+                   price: Optional[float] = None) -> Dict[str, Any]:
+        return self._order(symbol, side, amount, price)
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        return {'id': id, 'status': 'canceled'}
+
+    def cancel_orders(self, ids: List[str], symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [{'id': id, 'status': 'canceled'} for id in ids]
+
+    def cancel_all_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return []
+
+    def fetch_open_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return []
+
+
+def benchmark_config(base: Dict[str, Any], symbol: str, lookback: int) -> Dict[str, Any]:
+    """Bot config for a benchmark run: no files, no background refreshes, no rate limit"""
+    config = copy.deepcopy(base)
+    config['trading']['symbol'] = symbol
+    config['strategy']['sigma_lookback'] = lookback
+    config['fills'] = dict(config.get('fills', {}), state_file='', poll_interval=0)
+    config['recording'] = {'enabled': False}
+    config['warm_start'] = {'enabled': False}
+    config['metrics'] = {'summary_interval': 0, 'http_port': 0}
+    config['account'] = dict(config.get('account', {}), refresh_interval=3600)
+    config['rate_limit'] = dict(config.get('rate_limit', {}), requests_per_second=1e9, burst=1e9)
+    return config
+
+
+def create_bot(base_config: Dict[str, Any], kind: str, lookback: int) -> Any:
+    """UniversalMarketMaker on a StubExchange, warmed up to steady state"""
+    from market_maker_bot import UniversalMarketMaker
+
+    market = MARKETS[kind]
+    bot = UniversalMarketMaker(config=benchmark_config(base_config, market['symbol'], lookback))
+    bot.exchange = StubExchange(market, INITIAL_PRICE[kind])
+    bot.start_metrics()
+    bot.start_scheduler()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bot.setup_symbol()
+        # Fill the volatility window so every update is a steady-state add/remove
+        for book in bot.exchange.books * (lookback // len(bot.exchange.books) + 2):
+            bot.update_price((book['bids'][0][0] + book['asks'][0][0]) / 2)
+        bot.run_iteration()
+    return bot
+
+
+REFERENCE_VALUES = [float(i) for i in range(64)]
+
+
+def reference_work(values: List[float] = REFERENCE_VALUES) -> Any:
+    """Fixed pure-Python workload (float math, dict and list ops), the unit of CPU speed"""
+    total = 0.0
+    book = {}
+    for i, value in enumerate(values):
+        total += math.sqrt(value * value + 1.0)
+        book[i & 7] = total
+    return [total, book]
+
+
+def _batch_ns(op: Callable[[], Any], number: int) -> float:
+    start = time.thread_time_ns()
+    for _ in range(number):
+        op()
+    return (time.thread_time_ns() - start) / number
+
+
+def measure(op: Callable[[], Any], number: int, repeat: int) -> Dict[str, float]:
+    """Per-op thread CPU time, peak traced memory and retained blocks
+
+    CPU time comes from time.thread_time_ns(), so the account thread and
+    other processes do not count. Shared and frequency-scaled machines
+    drift by 2x between runs, so each batch is interleaved in slices with
+    reference_work() and the op is scored in reference units (cpu_ref,
+    the median ratio); that is the number compared against baselines.
+    cpu_us is the fastest raw batch, for reading. Memory is measured in a
+    separate pass under tracemalloc: peak_kb is the highest traced
+    allocation during one batch, blocks_per_op the allocated blocks still
+    alive afterwards.
+    """
+    for _ in range(max(1, number // 10)):
+        op()
+
+    samples = []
+    ratios = []
+    gc.disable()
+    try:
+        slices = 10
+        for _ in range(repeat):
+            sample = reference = 0.0
+            for _ in range(slices):
+                reference += _batch_ns(reference_work, 20)
+                sample += _batch_ns(op, max(1, number // slices))
+            samples.append(sample / slices)
+            ratios.append(sample / reference)
+    finally:
+        gc.enable()
+    samples.sort()
+    ratios.sort()
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for _ in range(number):
+        op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    blocks_after = sys.getallocatedblocks()
+
+    return {
+        'cpu_ref': ratios[len(ratios) // 2],
+        'cpu_us': samples[0] / 1000,
+        'peak_kb': peak / 1024,
+        'blocks_per_op': (blocks_after - blocks_before) / number
+    }
+
+
+def run_suite(base_config: Dict[str, Any], lookbacks: List[int], quick: bool = False) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark; returns results keyed by benchmark name"""
+    scale = 0.1 if quick else 1.0
+    fast_number = max(100, int(5000 * scale))
+    cycle_number = max(20, int(500 * scale))
+    repeat = 3 if quick else 7
+    results = {}
+
+    for kind in MARKETS:
+        for lookback in lookbacks:
+            bot = create_bot(base_config, kind, lookback)
+            books = bot.exchange.books
+            mids = [(book['bids'][0][0] + book['asks'][0][0]) / 2 for book in books]
+            position = [0]
+
+            def next_mid():
+                # A fresh float per tick, like a mid computed from a new book
+                position[0] = (position[0] + 1) % len(mids)
+                return mids[position[0]] + 0.0
+
+            mid = mids[0]
+            benchmarks = {
+                'update_price': (lambda: bot.update_price(next_mid()), fast_number),
+                'calculate_volatility': (bot.calculate_volatility, fast_number),
+                'calculate_reservation_price': (lambda: bot.calculate_reservation_price(mid), fast_number),
+                'calculate_optimal_spread': (lambda: bot.calculate_optimal_spread(mid), fast_number),
+                'calculate_quote_prices': (lambda: bot.calculate_quote_prices(mid), fast_number),
+                'calculate_position_size': (lambda: bot.calculate_position_size(mid), fast_number),
+                'run_iteration': (bot.run_iteration, cycle_number)
+            }
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                for name, (op, number) in benchmarks.items():
+                    key = f"{kind}/lookback={lookback}/{name}"
+                    results[key] = measure(op, number, repeat)
+            bot.account.stop()
+            bot.metrics.close()
+            print(f"  {kind} market, sigma_lookback {lookback}: "
+                  f"run_iteration {results[f'{kind}/lookback={lookback}/run_iteration']['cpu_us']:.1f}us CPU",
+                  file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            cpu_threshold: float, alloc_threshold: float, cpu_floor_us: float = 0.5) -> List[str]:
+    """Regressions of results against a baseline, as readable lines
+
+    CPU regresses when cpu_ref is more than cpu_threshold (relative) and
+    the equivalent of cpu_floor_us (absolute, to ignore timer noise on
+    sub-microsecond ops) above the baseline. Allocations regress when the batch peak grows
+    by more than alloc_threshold plus 1 KB, or when an op starts retaining
+    memory (half a block per op or more beyond the baseline).
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        # Microseconds per reference unit on the baseline machine
+        unit_us = base['cpu_us'] / base['cpu_ref']
+        if (current['cpu_ref'] > base['cpu_ref'] * (1 + cpu_threshold)
+                and (current['cpu_ref'] - base['cpu_ref']) * unit_us > cpu_floor_us):
+            regressions.append(f"{name}: CPU {base['cpu_ref']:.3f} -> {current['cpu_ref']:.3f} reference units "
+                               f"(+{(current['cpu_ref'] / base['cpu_ref'] - 1) * 100:.0f}%)")
+        if current['peak_kb'] > base['peak_kb'] * (1 + alloc_threshold) + 1.0:
+            regressions.append(f"{name}: peak memory {base['peak_kb']:.1f}KB -> {current['peak_kb']:.1f}KB")
+        if current['blocks_per_op'] - base['blocks_per_op'] >= 0.5:
+            regressions.append(f"{name}: retained blocks/op {base['blocks_per_op']:.2f} -> {current['blocks_per_op']:.2f}")
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    """Interpreter and machine the numbers were taken on"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system()
+    }
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the quoting pipeline against stored baselines')
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('--config', default=os.path.join(here, 'config.example.json'),
+                        help='Bot configuration to benchmark (default: config.example.json)')
+    parser.add_argument('--baseline', default=os.path.join(here, 'benchmark_baseline.json'),
+                        help='Baseline file (default: benchmark_baseline.json next to this script)')
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    parser.add_argument('--lookbacks', default=','.join(str(n) for n in DEFAULT_LOOKBACKS),
+                        help='Comma-separated sigma_lookback sizes (default: 100,1000,10000)')
+    parser.add_argument('--cpu-threshold', type=float, default=0.25, help='Allowed relative CPU regression (default: 0.25)')
+    parser.add_argument('--alloc-threshold', type=float, default=0.25, help='Allowed relative peak memory regression (default: 0.25)')
+    parser.add_argument('--quick', action='store_true', help='Fewer iterations (smoke run, noisier numbers)')
+
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        base_config = json.load(f)
+
+    # The bot logs every order at INFO; keep log I/O out of the measurements
+    import market_maker_bot  # noqa: F401 - configures logging on import
+    logging.disable(logging.INFO)
+
+    lookbacks = [int(n) for n in args.lookbacks.split(',')]
+    print(f"Benchmarking (lookbacks {lookbacks}{', quick' if args.quick else ''})...", file=sys.stderr)
+    results = run_suite(base_config, lookbacks, args.quick)
+
+    print(f"\n{'benchmark':<58} {'cpu us':>10} {'cpu ref':>10} {'peak KB':>9} {'blocks/op':>10}")
+    for name, result in results.items():
+        print(f"{name:<58} {result['cpu_us']:>10.2f} {result['cpu_ref']:>10.3f} "
+              f"{result['peak_kb']:>9.1f} {result['blocks_per_op']:>10.2f}")
+
+    document = {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'environment': environment(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        sys.exit(2)
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        print(f"\nBaseline {args.baseline} has version {baseline.get('version')}, expected {BASELINE_VERSION}")
+        sys.exit(2)
+    if baseline.get('environment') != environment():
+        print(f"\nWarning: baseline was recorded on {baseline.get('environment')}")
+
+    regressions = compare(results, baseline['results'], args.cpu_threshold, args.alloc_threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Online Calibration - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Fill-intensity (A, k) estimation from the trade stream and cached spread terms
+"""
+
+import bisect
+import logging
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_HOUR = 3600.0
+
+# Rescale the decay weights before exp() gets anywhere near overflow
+MAX_EXPONENT = 30.0
+
+
+class SpreadModel:
+    """Avellaneda-Stoikov spread terms with the parameter-only parts cached
+
+    The optimal spread is gamma * sigma^2 * T + (2 / gamma) * ln(1 + gamma / k).
+    The liquidity term only depends on gamma and k, so it is computed once
+    and again only when set_k() moves k by more than tolerance (relative).
+    gamma * sigma^2 is cached per sigma value, which changes at most once
+    per tick.
+    """
+
+    def __init__(self, gamma: float, k: float, tolerance: float = 0.01):
+        """Initialize with the configured gamma and starting k"""
+        if gamma <= 0 or k <= 0:
+            raise ValueError(f"gamma and k must be positive (gamma={gamma}, k={k})")
+
+        self.gamma = gamma
+        self.tolerance = tolerance
+        self.k = k
+        self.liquidity_term = self._liquidity_term(k)
+        self.recomputes = 1
+
+        self._sigma = None
+        self._risk_rate = 0.0
+
+    def _liquidity_term(self, k: float) -> float:
+        return (2.0 / self.gamma) * math.log(1.0 + self.gamma / k)
+
+    def set_k(self, k: float) -> bool:
+        """Adopt a new k; returns True when the cached term was recomputed"""
+        if k <= 0 or abs(k - self.k) <= self.tolerance * self.k:
+            return False
+        self.k = k
+        self.liquidity_term = self._liquidity_term(k)
+        self.recomputes += 1
+        return True
+
+    def risk_rate(self, sigma: float) -> float:
+        """gamma * sigma^2, cached for the last sigma"""
+        if sigma != self._sigma:
+            self._sigma = sigma
+            self._risk_rate = self.gamma * sigma * sigma
+        return self._risk_rate
+
+    def reservation_offset(self, inventory: float, sigma: float, time_remaining: float) -> float:
+        """Inventory skew q * gamma * sigma^2 * T subtracted from the mid"""
+        return inventory * self.risk_rate(sigma) * time_remaining
+
+    def spread(self, sigma: float, time_remaining: float) -> float:
+        """Optimal spread before the min/max clamps"""
+        return self.risk_rate(sigma) * time_remaining + self.liquidity_term
+
+
+class FillIntensityEstimator:
+    """Online estimate of the order-arrival intensity lambda(d) = A * exp(-k * d)
+
+    d is the distance of a trade from the mid at the time it printed, as a
+    fraction of the mid (the same unit the spread is expressed in). Every
+    trade increments one of a fixed number of depth buckets; counts decay
+    exponentially with half_life seconds, so memory is bounded by the
+    bucket count and each trade is an O(1) update (plus an O(log n) lookup
+    of the mid in the bounded mid history).
+
+    A trade at depth d would have filled a quote resting at any depth up to
+    d, so the arrival rate of fills at quote depth d is the cumulative count
+    of trades at depth >= d divided by the decayed observation time. fit()
+    regresses log(rate) on depth: k = -slope and A = exp(intercept).
+
+    Fitting walks the buckets once, so its cost only depends on the bucket
+    count; callers run it once per trade fetch, not per tick.
+    """
+
+    def __init__(self, bucket_width: float = 0.0001, buckets: int = 50,
+                 half_life: float = 600.0, min_trades: int = 50, marks: int = 2048):
+        """Initialize the estimator
+
+        bucket_width is the depth resolution as a fraction of the mid
+        (0.0001 is one basis point); trades deeper than buckets * bucket_width
+        land in the last bucket.
+        """
+        self.bucket_width = bucket_width
+        self.tau = half_life / math.log(2)
+        self.min_trades = min_trades
+        self.counts = [0.0] * max(buckets, 3)
+
+        # Mid history for matching trades to the quote they would have hit
+        self.mark_times = deque(maxlen=marks)
+        self.mark_mids = deque(maxlen=marks)
+
+        # Decay weights are exp((t - origin) / tau) relative to a moving origin
+        self.origin = None
+        self.started = None
+        self.trades = 0.0
+
+        # Trade cursor for deduplicating overlapping fetches
+        self.cursor = 0
+        self.cursor_ids = set()
+
+        self.A = None
+        self.k = None
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def mark(self, timestamp: float, mid: float) -> None:
+        """Record the mid at timestamp seconds"""
+        if self.mark_times and timestamp < self.mark_times[-1]:
+            return
+        self.mark_times.append(timestamp)
+        self.mark_mids.append(mid)
+        if self.started is None:
+            self.started = timestamp
+            self.origin = timestamp
+
+    def _mid_at(self, timestamp: float) -> Optional[float]:
+        """Last recorded mid at or before timestamp"""
+        i = bisect.bisect_right(self.mark_times, timestamp)
+        if i == 0:
+            return None
+        return self.mark_mids[i - 1]
+
+    def _weight(self, timestamp: float) -> float:
+        exponent = (timestamp - self.origin) / self.tau
+        if exponent > MAX_EXPONENT:
+            # Move the origin forward and rescale the accumulated counts
+            factor = math.exp(-exponent)
+            self.counts = [c * factor for c in self.counts]
+            self.trades *= factor
+            self.origin = timestamp
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def add_trade(self, timestamp: float, price: float) -> bool:
+        """Bucket one trade printed at timestamp seconds; False if it cannot be placed"""
+        mid = self._mid_at(timestamp)
+        if mid is None or mid <= 0 or price <= 0:
+            return False
+        depth = abs(price - mid) / mid
+        index = min(int(depth / self.bucket_width), len(self.counts) - 1)
+        weight = self._weight(timestamp)
+        self.counts[index] += weight
+        self.trades += weight
+        return True
+
+    def add_trades(self, trades: Iterable[Dict[str, Any]], on_trade: Any = None) -> int:
+        """Bucket ccxt trades not seen before; returns the number added
+
+        on_trade, when given, is called with every trade not seen before
+        (for recording), including ones that cannot be placed yet.
+        """
+        added = 0
+        for trade in trades:
+            ts = trade.get('timestamp')
+            if ts is None or ts < self.cursor:
+                continue
+            trade_id = trade.get('id')
+            if ts == self.cursor and trade_id in self.cursor_ids:
+                continue
+            if ts > self.cursor:
+                self.cursor = ts
+                self.cursor_ids = set()
+            self.cursor_ids.add(trade_id)
+            if on_trade:
+                on_trade(trade)
+            if self.add_trade(ts / 1000.0, float(trade.get('price') or 0)):
+                added += 1
+        return added
+
+    # ------------------------------------------------------------------
+    # Fitting
+    # ------------------------------------------------------------------
+
+    def exposure(self, now: float) -> float:
+        """Decayed observation time, in origin-weighted seconds"""
+        if self.started is None or now <= self.started:
+            return 0.0
+        decayed = self.tau * (1.0 - math.exp(-(now - self.started) / self.tau))
+        return decayed * math.exp((now - self.origin) / self.tau)
+
+    def effective_trades(self, now: float) -> float:
+        """Decayed trade count as of now"""
+        if self.origin is None:
+            return 0.0
+        return self.trades * math.exp(-(now - self.origin) / self.tau)
+
+    def fit(self, now: float) -> Optional[Tuple[float, float]]:
+        """Refit (A, k) from the decayed counts; None while there is too little data
+
+        A is in fills per second at zero depth, k per unit of relative depth.
+        """
+        if self.origin is not None:
+            # Long quiet spells would otherwise overflow the weights
+            self._weight(now)
+        exposure = self.exposure(now)
+        if exposure <= 0 or self.effective_trades(now) < self.min_trades:
+            return None
+
+        # Cumulative counts from the deepest bucket in; the last bucket is
+        # open-ended so it only feeds the cumulative sums
+        points = []
+        cumulative = 0.0
+        for index in range(len(self.counts) - 1, -1, -1):
+            cumulative += self.counts[index]
+            if index < len(self.counts) - 1 and cumulative > 0:
+                points.append((index * self.bucket_width, math.log(cumulative / exposure), cumulative))
+        if len(points) < 3:
+            return None
+
+        # Weighted least squares, weights are the counts behind each point
+        sw = sx = sy = sxx = sxy = 0.0
+        for x, y, w in points:
+            sw += w
+            sx += w * x
+            sy += w * y
+            sxx += w * x * x
+            sxy += w * x * y
+        denominator = sw * sxx - sx * sx
+        if denominator <= 0:
+            return None
+        slope = (sw * sxy - sx * sy) / denominator
+        if slope >= 0:
+            return None
+        intercept = (sy - slope * sx) / sw
+
+        self.k = -slope
+        self.A = math.exp(intercept)
+        return self.A, self.k
+
+    # ------------------------------------------------------------------
+    # Reporting and persistence
+    # ------------------------------------------------------------------
+
+    def summary(self) -> str:
+        """One-line calibration state"""
+        if self.k is None:
+            return "Calibration: collecting trades"
+        return f"Calibration: A={self.A:.3f}/s k={self.k:.1f}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decayed counts and fit for a checkpoint"""
+        return {
+            'bucket_width': self.bucket_width,
+            'counts': list(self.counts),
+            'trades': self.trades,
+            'origin': self.origin,
+            'started': self.started,
+            'cursor': self.cursor,
+            'cursor_ids': list(self.cursor_ids),
+            'A': self.A,
+            'k': self.k
+        }
+
+    def from_dict(self, state: Dict[str, Any]) -> None:
+        """Restore state produced by to_dict() when the bucket layout matches"""
+        counts = state.get('counts') or []
+        if state.get('bucket_width') != self.bucket_width or len(counts) != len(self.counts):
+            return
+        self.counts = [float(c) for c in counts]
+        self.trades = state.get('trades', 0.0)
+        self.origin = state.get('origin')
+        self.started = state.get('started')
+        self.cursor = state.get('cursor', 0)
+        self.cursor_ids = set(state.get('cursor_ids', []))
+        self.A = state.get('A')
+        self.k = state.get('k')
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Fill Ledger - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Trade-id deduplicated fills with a persisted cursor
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FillLedger:
+    """Applies each fill exactly once to position, average entry and PnL
+
+    Fills are keyed by trade id. The ledger keeps a 'since' cursor (the
+    newest fill timestamp seen) and polls forward from it page by page, so
+    bursts larger than one page are not lost and old fills are never
+    re-applied. from_id_param names the exchange's trade-id paging
+    parameter (e.g. 'fromId' on Binance) for bursts of more than a page of
+    fills on one millisecond. State is persisted to a small JSON file so a restart
+    resumes from the same cursor and position.
+    """
+
+    def __init__(self, symbol: str, state_path: Optional[str] = None,
+                 page_limit: int = 100, max_pages: int = 10, max_seen: int = 5000,
+                 from_id_param: Optional[str] = None):
+        """Initialize an empty ledger, restoring persisted state if present"""
+        self.symbol = symbol
+        self.state_path = state_path
+        self.page_limit = page_limit
+        self.max_pages = max_pages
+        self.from_id_param = from_id_param
+
+        self.position = 0.0
+        self.avg_entry = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.trades_count = 0
+        self.cursor = int(time.time() * 1000)
+        self.listeners = []
+        self.restored = False
+
+        # Bounded memory of applied ids - only fills near the cursor can repeat
+        self.seen_ids = set()
+        self.seen_order = deque()
+        self.max_seen = max_seen
+
+        if state_path:
+            self.load()
+
+    @property
+    def pnl(self) -> float:
+        """Realized PnL net of fees"""
+        return self.realized_pnl - self.fees
+
+    def unrealized_pnl(self, mark_price: float) -> float:
+        """Mark-to-market PnL of the open position"""
+        return (mark_price - self.avg_entry) * self.position
+
+    @staticmethod
+    def trade_key(trade: Dict[str, Any]) -> str:
+        """Unique key for a fill (trade id, or a composite when missing)"""
+        if trade.get('id') is not None:
+            return str(trade['id'])
+        return f"{trade.get('order')}:{trade.get('timestamp')}:{trade.get('price')}:{trade.get('amount')}"
+
+    def _remember(self, key: str) -> None:
+        self.seen_ids.add(key)
+        self.seen_order.append(key)
+        if len(self.seen_order) > self.max_seen:
+            self.seen_ids.discard(self.seen_order.popleft())
+
+    def apply(self, trade: Dict[str, Any]) -> bool:
+        """Apply one fill in O(1); returns False for duplicates"""
+        if trade.get('symbol') not in (None, self.symbol):
+            return False
+
+        key = self.trade_key(trade)
+        if key in self.seen_ids:
+            return False
+        self._remember(key)
+
+        amount = float(trade['amount'])
+        price = float(trade['price'])
+        fee = trade.get('fee') or {}
+        self.book(trade['side'], amount, price, float(fee.get('cost') or 0))
+
+        timestamp = trade.get('timestamp')
+        if timestamp is not None and timestamp > self.cursor:
+            self.cursor = timestamp
+
+        logger.info(f"Trade: {trade['side']} {amount} @ {price} | Position: {self.position:.4f}")
+        for listener in self.listeners:
+            listener(trade)
+        return True
+
+    def book(self, side: str, amount: float, price: float, fee: float = 0.0) -> None:
+        """Update position, average entry and PnL for one fill (no dedup, cursor or listeners)"""
+        signed = amount if side == 'buy' else -amount
+
+        if self.position == 0 or (self.position > 0) == (signed > 0):
+            # Opening or adding: volume-weighted average entry
+            new_position = self.position + signed
+            self.avg_entry = (self.avg_entry * abs(self.position) + price * amount) / abs(new_position)
+            self.position = new_position
+        else:
+            # Reducing, closing or flipping
+            closed = min(abs(signed), abs(self.position))
+            direction = 1 if self.position > 0 else -1
+            self.realized_pnl += (price - self.avg_entry) * closed * direction
+            self.position += signed
+            if abs(self.position) < 1e-12:
+                self.position = 0.0
+                self.avg_entry = 0.0
+            elif (self.position > 0) != (direction > 0):
+                self.avg_entry = price
+
+        self.fees += fee
+        self.trades_count += 1
+
+    def apply_all(self, trades: Iterable[Dict[str, Any]]) -> int:
+        """Apply fills in timestamp order, returning how many were new"""
+        ordered = sorted(trades, key=lambda t: t.get('timestamp') or 0)
+        return sum(1 for trade in ordered if self.apply(trade))
+
+    def _next_request(self, trades: list, request: Dict[str, Any], cursor_before: int,
+                      previous: int) -> Optional[Dict[str, Any]]:
+        """fetch_my_trades arguments for the next page, or None when caught up
+
+        A full page that does not move the cursor holds a page or more of
+        fills on the cursor's millisecond (a batch or ladder sweep). The next
+        page then starts at the last trade id when from_id_param is set, or
+        re-requests the same millisecond with twice the limit. Once a page
+        comes back short, every fill on that millisecond is in hand and the
+        cursor steps past it. Overlapping pages are harmless: fills are
+        deduplicated by id.
+        """
+        limit = request['limit']
+        if self.cursor != cursor_before:
+            if len(trades) < limit:
+                return None
+            return {'since': self.cursor, 'limit': self.page_limit}
+
+        if len(trades) >= limit:
+            if self.from_id_param and trades[-1].get('id') is not None:
+                return {'since': None, 'limit': self.page_limit,
+                        'params': {self.from_id_param: trades[-1]['id']}}
+            return {'since': cursor_before, 'limit': limit * 2}
+
+        paging_by_id = 'params' in request
+        if not paging_by_id and limit == self.page_limit:
+            return None
+        if not paging_by_id and len(trades) <= previous:
+            # The larger page came back no bigger: the exchange caps its page size
+            logger.warning(f"{self.symbol}: exchange returns at most {len(trades)} fills per page and "
+                           f"{cursor_before} has that many; later fills on that millisecond cannot be "
+                           f"paged by time (set fills.from_id_param to page by trade id)")
+        self.cursor = cursor_before + 1
+        return {'since': self.cursor, 'limit': self.page_limit}
+
+    def poll(self, exchange: Any) -> int:
+        """Fetch fills forward from the cursor, paginating until caught up"""
+        new_fills = 0
+        cursor_start = self.cursor
+        request = {'since': self.cursor, 'limit': self.page_limit}
+        previous = 0
+        for _ in range(self.max_pages):
+            cursor_before = self.cursor
+            trades = exchange.fetch_my_trades(self.symbol, **request)
+            new_fills += self.apply_all(trades)
+            request = self._next_request(trades, request, cursor_before, previous)
+            if request is None:
+                break
+            previous = len(trades)
+        if new_fills or self.cursor != cursor_start:
+            self.save()
+        return new_fills
+
+    async def poll_async(self, exchange: Any) -> int:
+        """poll() for ccxt.async_support exchanges"""
+        new_fills = 0
+        cursor_start = self.cursor
+        request = {'since': self.cursor, 'limit': self.page_limit}
+        previous = 0
+        for _ in range(self.max_pages):
+            cursor_before = self.cursor
+            trades = await exchange.fetch_my_trades(self.symbol, **request)
+            new_fills += self.apply_all(trades)
+            request = self._next_request(trades, request, cursor_before, previous)
+            if request is None:
+                break
+            previous = len(trades)
+        if new_fills or self.cursor != cursor_start:
+            self.save()
+        return new_fills
+
+    async def watch(self, exchange: Any, on_fill: Any = None) -> None:
+        """Apply fills from the private execution stream (ccxt.pro watch_my_trades)
+
+        Stream errors are logged and the stream is resubscribed; fills
+        missed while it was down are caught up over REST first.
+        """
+        while True:
+            try:
+                trades = await exchange.watch_my_trades(self.symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fill stream error: {e}")
+                await asyncio.sleep(1)
+                try:
+                    if await self.poll_async(exchange) and on_fill:
+                        on_fill()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error catching up fills: {e}")
+                continue
+            if self.apply_all(trades):
+                self.save()
+                if on_fill:
+                    on_fill()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable ledger state"""
+        return {
+            'symbol': self.symbol,
+            'position': self.position,
+            'avg_entry': self.avg_entry,
+            'realized_pnl': self.realized_pnl,
+            'fees': self.fees,
+            'trades_count': self.trades_count,
+            'cursor': self.cursor,
+            'recent_ids': list(self.seen_order)[-500:]
+        }
+
+    def from_dict(self, state: Dict[str, Any]) -> None:
+        """Restore ledger state produced by to_dict()"""
+        self.position = state.get('position', 0.0)
+        self.avg_entry = state.get('avg_entry', 0.0)
+        self.realized_pnl = state.get('realized_pnl', 0.0)
+        self.fees = state.get('fees', 0.0)
+        self.trades_count = state.get('trades_count', 0)
+        self.cursor = state.get('cursor', self.cursor)
+        for key in state.get('recent_ids', []):
+            self._remember(key)
+
+    def save(self) -> None:
+        """Persist state atomically"""
+        if not self.state_path:
+            return
+        try:
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"Error saving fill ledger: {e}")
+
+    def load(self) -> None:
+        """Restore persisted state when it exists for this symbol"""
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('symbol') != self.symbol:
+                logger.warning(f"Fill ledger {self.state_path} is for {state.get('symbol')}, ignoring")
+                return
+            self.from_dict(state)
+            self.restored = True
+            logger.info(f"Fill ledger restored: position {self.position}, cursor {self.cursor}")
+        except Exception as e:
+            logger.error(f"Error loading fill ledger: {e}")
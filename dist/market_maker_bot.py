@@ -8,16 +8,27 @@ Website: https://roboquant.ai
 
 import ccxt
 import time
-import math
 import json
 import os
 import sys
 from datetime import datetime
 from collections import deque
-import statistics
 import logging
+import threading
 from typing import Dict, Tuple, Optional, Any
 
+from account_state import AccountState
+from calibration import SECONDS_PER_HOUR, FillIntensityEstimator, SpreadModel
+from fill_ledger import FillLedger
+from metrics import InstrumentedExchange, Metrics
+from order_manager import QuoteManager, get_tick_size
+from quote_ladder import LadderManager, build_ladder, get_lot_size
+from request_scheduler import PRIORITY_NAMES, RequestScheduler, ScheduledExchange
+from risk_engine import FLATTEN, HALTED, RiskEngine
+from tick_recorder import TickRecorder
+from volatility import VolatilityEstimator
+from warm_start import MarketsSnapshot, StrategyCheckpoint
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -46,16 +57,51 @@ class UniversalMarketMaker:
         'kraken': ccxt.kraken
     }
     
-    def __init__(self, config_path: str = 'config.json'):
-        """Initialize the market maker with configuration"""
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path: str = 'config.json', config: Optional[Dict[str, Any]] = None):
+        """Initialize the market maker with configuration
+        
+        A ready config dict can be passed instead of a path (used by the
+        portfolio runner for per-symbol configs).
+        """
+        self.config = config if config is not None else self.load_config(config_path)
         self.exchange = None
         self.symbol = None
         self.price_history = deque(maxlen=self.config['strategy']['sigma_lookback'])
+        self.volatility_estimator = VolatilityEstimator(
+            self.config['strategy']['sigma_lookback'],
+            mode=self.config['strategy'].get('volatility_mode', 'window'),
+            ewma_span=self.config['strategy'].get('volatility_ewma_span')
+        )
+        self.spread_model = SpreadModel(
+            self.config['strategy']['gamma'],
+            self.config['strategy']['k'],
+            tolerance=self.config.get('calibration', {}).get('k_tolerance', 0.01)
+        )
+        self.intensity = None
         self.inventory = 0
         self.pnl = 0
         self.trades_count = 0
         self.current_orders = {'bid': None, 'ask': None}
+        self.order_manager = None
+        self.fill_ledger = None
+        self.recorder = None
+        self.account = None
+        self.scheduler = None
+        self.quote_currency = None
+        self.checkpoint = None
+        self.risk = None
+        # Symbols the markets snapshot must contain (the portfolio runner sets all of its own)
+        self.market_symbols = [self.config['trading']['symbol']]
+        # The time horizon restarts every hour from here; restored on a warm start
+        self.horizon_start = time.time()
+        self.started_at = None
+        # (snapshot, exchange) loaded by the background markets refresh, swapped in by the main loop
+        self.fresh_markets = None
+        self.metrics = Metrics(self.config.get('metrics', {}).get('summary_interval', 60))
+        self.last_reservation = None
+        self.last_spread = None
+        self.last_trade_check = 0
+        self.last_calibration = 0
         self.volatility = 0.01
         self.running = False
         
@@ -70,15 +116,10 @@ class UniversalMarketMaker:
             logger.error(f"Failed to load config: {e}")
             sys.exit(1)
     
-    def initialize_exchange(self) -> None:
-        """Initialize the exchange connection"""
+    def build_exchange_config(self) -> Dict[str, Any]:
+        """Build the ccxt constructor parameters from the configuration"""
         exchange_name = self.config['exchange']['name'].lower()
         
-        if exchange_name not in self.SUPPORTED_EXCHANGES:
-            raise ValueError(f"Exchange {exchange_name} not supported. Supported exchanges: {list(self.SUPPORTED_EXCHANGES.keys())}")
-        
-        exchange_class = self.SUPPORTED_EXCHANGES[exchange_name]
-        
         # Build exchange config
         exchange_config = {
             'enableRateLimit': True,
@@ -102,8 +143,26 @@ class UniversalMarketMaker:
         if self.config['exchange'].get('testnet', False):
             exchange_config['sandbox'] = True
         
+        return exchange_config
+    
+    def initialize_exchange(self) -> None:
+        """Initialize the exchange connection"""
+        exchange_name = self.config['exchange']['name'].lower()
+        
+        if exchange_name not in self.SUPPORTED_EXCHANGES:
+            raise ValueError(f"Exchange {exchange_name} not supported. Supported exchanges: {list(self.SUPPORTED_EXCHANGES.keys())}")
+        
+        exchange_class = self.SUPPORTED_EXCHANGES[exchange_name]
+        
         # Initialize exchange
-        self.exchange = exchange_class(exchange_config)
+        self.exchange = exchange_class(self.build_exchange_config())
+        
+        # Warm start: markets from the snapshot, refreshed in the background
+        snapshot = self.markets_snapshot()
+        if snapshot and snapshot.apply(self.exchange):
+            logger.info(f"Successfully connected to {exchange_name} (markets from snapshot)")
+            self.start_markets_refresh(snapshot, exchange_class)
+            return
         
         # Load markets
         try:
@@ -112,6 +171,65 @@ class UniversalMarketMaker:
         except Exception as e:
             logger.error(f"Failed to connect to exchange: {e}")
             raise
+        if snapshot:
+            snapshot.save(self.exchange)
+    
+    def markets_snapshot(self) -> Optional[MarketsSnapshot]:
+        """Markets snapshot for the traded symbols, or None when warm start is disabled"""
+        warm_config = self.config.get('warm_start', {})
+        if not warm_config.get('enabled', True):
+            return None
+        return MarketsSnapshot(
+            warm_config.get('markets_file', 'markets_snapshot.json'),
+            self.config['exchange']['name'].lower(),
+            self.market_symbols,
+            max_age=warm_config.get('markets_max_age', 86400)
+        )
+    
+    def market_precisions(self, snapshot: MarketsSnapshot) -> Dict[str, Any]:
+        """Precision of each snapshot symbol, to detect changes on refresh"""
+        return {symbol: self.exchange.markets[symbol].get('precision') for symbol in snapshot.symbols}
+    
+    def refresh_markets(self, snapshot: MarketsSnapshot, exchange_class: Any) -> None:
+        """Load markets on a separate exchange instance for the main loop to swap in
+        
+        ccxt's sync exchanges are not thread-safe, so the instance the bot
+        trades on is never touched from the refresh thread.
+        """
+        try:
+            exchange = exchange_class(self.build_exchange_config())
+            exchange.load_markets()
+        except Exception as e:
+            logger.warning(f"Background markets refresh failed: {e}")
+            return
+        self.fresh_markets = (snapshot, exchange)
+    
+    def apply_fresh_markets(self) -> None:
+        """Swap in markets loaded by the background refresh (main loop only)"""
+        if self.fresh_markets is None:
+            return
+        snapshot, exchange = self.fresh_markets
+        self.fresh_markets = None
+        previous = self.market_precisions(snapshot)
+        self.exchange.set_markets(exchange.markets, exchange.currencies)
+        self.markets_refreshed(snapshot, previous)
+    
+    def markets_refreshed(self, snapshot: MarketsSnapshot, previous: Dict[str, Any]) -> None:
+        """Warn about precision changes and rewrite the snapshot after a reload"""
+        for symbol, precision in previous.items():
+            current = self.exchange.markets.get(symbol, {}).get('precision')
+            if current != precision:
+                logger.warning(f"{symbol} precision changed from {precision} to {current} since the snapshot")
+        snapshot.save(self.exchange)
+        logger.info("Markets refreshed in the background")
+    
+    def start_markets_refresh(self, snapshot: MarketsSnapshot, exchange_class: Any) -> None:
+        """Refresh the snapshot off the startup path, once quoting is under way"""
+        delay = self.config.get('warm_start', {}).get('markets_refresh_delay', 30)
+        timer = threading.Timer(delay, self.refresh_markets, args=(snapshot, exchange_class))
+        timer.name = 'markets-refresh'
+        timer.daemon = True
+        timer.start()
     
     def validate_symbol(self) -> None:
         """Validate and set the trading symbol"""
@@ -123,10 +241,183 @@ class UniversalMarketMaker:
             raise ValueError(f"Invalid symbol: {self.symbol}")
         
         market = self.exchange.markets[self.symbol]
+        self.quote_currency = self.symbol.split('/')[1].split(':')[0]
         logger.info(f"Trading symbol: {self.symbol}")
         logger.info(f"Min order size: {market['limits']['amount']['min']}")
         logger.info(f"Price precision: {market['precision']['price']}")
     
+    def create_order_manager(self, manager_class: type = QuoteManager,
+                             ladder_class: type = LadderManager) -> None:
+        """Create the quote order manager (single level or ladder) for the validated symbol"""
+        orders_config = self.config.get('orders', {})
+        ladder_config = self.config.get('ladder', {})
+        options = {
+            'tolerance_ticks': orders_config.get('requote_tolerance_ticks', 0),
+            'tolerance_bps': orders_config.get('requote_tolerance_bps', 0.0),
+            'use_amend': orders_config.get('use_amend', True)
+        }
+        tick_size = get_tick_size(self.exchange.markets[self.symbol])
+        if ladder_config.get('enabled', False):
+            self.order_manager = ladder_class(
+                self.exchange, self.symbol, tick_size,
+                levels=ladder_config.get('levels', 3),
+                batch_size=ladder_config.get('batch_size', 10),
+                **options
+            )
+            logger.info(f"Ladder mode: {self.order_manager.levels} levels per side")
+        else:
+            self.order_manager = manager_class(self.exchange, self.symbol, tick_size, **options)
+        self.current_orders = self.order_manager.orders
+    
+    def create_fill_ledger(self) -> None:
+        """Create the fill ledger, restoring inventory from its persisted state"""
+        fills_config = self.config.get('fills', {})
+        self.fill_ledger = FillLedger(
+            self.symbol,
+            state_path=fills_config.get('state_file', 'fill_ledger.json'),
+            page_limit=fills_config.get('page_limit', 100),
+            from_id_param=fills_config.get('from_id_param')
+        )
+        # Filled quotes must be requoted even when the desired price has not moved
+        self.fill_ledger.listeners.append(self.order_manager.on_fill)
+        self.sync_inventory()
+    
+    def create_risk_engine(self) -> None:
+        """Create the pre-trade risk engine from the config 'risk' section"""
+        risk_config = self.config['risk']
+        market = self.exchange.markets[self.symbol]
+        self.risk = RiskEngine(
+            self.fill_ledger,
+            get_lot_size(market),
+            market['limits']['amount']['min'] or 0.0,
+            risk_config['max_inventory_usd'],
+            max_order_usd=risk_config.get('max_position_size_usd'),
+            stop_loss_percent=risk_config.get('stop_loss_percent'),
+            daily_loss_limit_usd=risk_config.get('daily_loss_limit_usd'),
+            shrink_at=risk_config.get('shrink_at', 0.5),
+            reduce_only_at=risk_config.get('reduce_only_at', 0.8),
+            shrink_factor=risk_config.get('shrink_factor', 0.5),
+            cooldown=risk_config.get('stop_loss_cooldown', 60)
+        )
+    
+    def create_calibration(self) -> None:
+        """Create the fill-intensity estimator from the config 'calibration' section"""
+        calibration = self.config.get('calibration', {})
+        if not calibration.get('enabled', False):
+            return
+        self.intensity = FillIntensityEstimator(
+            bucket_width=calibration.get('bucket_bps', 1.0) / 10000,
+            buckets=calibration.get('buckets', 50),
+            half_life=calibration.get('half_life', 600),
+            min_trades=calibration.get('min_trades', 50)
+        )
+        logger.info(f"Calibrating k from the trade stream (starting at k={self.spread_model.k})")
+    
+    def create_checkpoint(self) -> None:
+        """Create the strategy checkpoint and restore persisted state from it"""
+        warm_config = self.config.get('warm_start', {})
+        if not warm_config.get('enabled', True):
+            return
+        self.checkpoint = StrategyCheckpoint(
+            warm_config.get('checkpoint_file', 'checkpoint.json'),
+            self.symbol,
+            interval=warm_config.get('checkpoint_interval', 10),
+            max_age=warm_config.get('checkpoint_max_age', 300)
+        )
+        state = self.checkpoint.load()
+        if state is not None:
+            self.restore_state(state)
+    
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Strategy state persisted by the checkpoint"""
+        return {
+            'horizon_start': self.horizon_start,
+            'price_history': list(self.price_history),
+            'volatility': self.volatility_estimator.to_dict(),
+            'ledger': self.fill_ledger.to_dict(),
+            'risk': self.risk.to_dict() if self.risk else {},
+            'intensity': self.intensity.to_dict() if self.intensity else {}
+        }
+    
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """Apply a checkpoint; price history and volatility only when it is recent"""
+        self.horizon_start = state.get('horizon_start', self.horizon_start)
+        if not self.fill_ledger.restored and state.get('ledger'):
+            # The ledger file is normally newer; fall back to the checkpoint copy
+            self.fill_ledger.from_dict(state['ledger'])
+            self.fill_ledger.save()
+            self.sync_inventory()
+        if self.risk and state.get('risk'):
+            self.risk.from_dict(state['risk'])
+        if self.intensity and state.get('intensity'):
+            # Counts decay on their own, so older checkpoints are still usable
+            self.intensity.from_dict(state['intensity'])
+            if self.intensity.k:
+                self.spread_model.set_k(self.intensity.k)
+        if state.get('fresh'):
+            self.price_history.extend(state.get('price_history', []))
+            self.volatility_estimator.from_dict(state.get('volatility', {}))
+            self.volatility = self.volatility_estimator.value
+            logger.info(f"Strategy state restored: {len(self.price_history)} prices, volatility {self.volatility:.4f}")
+        else:
+            logger.info("Checkpoint too old for price history, starting volatility cold")
+    
+    def save_checkpoint(self) -> None:
+        """Write the checkpoint now"""
+        if self.checkpoint:
+            self.checkpoint.save(self.checkpoint_state())
+    
+    def maybe_checkpoint(self) -> None:
+        """Write the checkpoint when its interval has elapsed"""
+        if self.checkpoint and self.checkpoint.due():
+            self.save_checkpoint()
+    
+    def build_account_state(self, symbols: list, refresh_interval: Optional[float] = None) -> AccountState:
+        """Account cache for the given symbols from the config 'account' section"""
+        account_config = self.config.get('account', {})
+        if refresh_interval is None:
+            refresh_interval = account_config.get('refresh_interval', 10)
+        return AccountState(
+            self.exchange,
+            symbols,
+            refresh_interval=refresh_interval,
+            max_age=account_config.get('max_age'),
+            # Positions only exist for derivatives
+            include_positions=account_config.get('positions', True) and any(
+                self.exchange.markets[symbol].get('contract') for symbol in symbols),
+            min_interval=account_config.get('min_interval', 1.0)
+        )
+    
+    def create_account_state(self) -> None:
+        """Prime the account cache and refresh it on a background thread"""
+        self.account = self.build_account_state([self.symbol])
+        self.account.refresh()
+        self.account.start()
+        # Fills change balance and margin - refresh soon after one
+        self.fill_ledger.listeners.append(lambda trade: self.account.request_refresh())
+    
+    def create_recorder(self) -> None:
+        """Start the binary tick recorder when recording is enabled"""
+        recording = self.config.get('recording', {})
+        if not recording.get('enabled', False):
+            return
+        self.recorder = TickRecorder(recording.get('directory', 'recordings'), self.symbol)
+        self.fill_ledger.listeners.append(self.recorder.record_fill)
+        logger.info(f"Recording ticks to {recording.get('directory', 'recordings')}")
+    
+    def record_book(self, best_bid: float, best_ask: float, bid_size: float = 0.0, ask_size: float = 0.0) -> None:
+        """Record the observed top of book"""
+        if self.recorder:
+            self.recorder.record_book(int(time.time() * 1000), best_bid, best_ask, bid_size, ask_size)
+    
+    def record_quote(self, mid_price: float, bid_price: float, ask_price: float, size: float) -> None:
+        """Record our quote together with the model values behind it"""
+        if self.recorder:
+            self.recorder.record_quote(
+                int(time.time() * 1000), bid_price, ask_price, size, mid_price,
+                self.volatility, self.last_reservation, self.last_spread, self.inventory
+            )
+    
     def set_leverage(self) -> None:
         """Set leverage for the trading pair"""
         leverage = self.config['trading'].get('leverage', 1)
@@ -138,45 +429,71 @@ class UniversalMarketMaker:
         except Exception as e:
             logger.warning(f"Could not set leverage: {e}")
     
+    def update_price(self, mid_price: float, timestamp: Optional[float] = None) -> None:
+        """Record a new mid price and update volatility once for this tick"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.price_history.append(mid_price)
+        self.volatility = self.volatility_estimator.update(mid_price, timestamp)
+        if self.intensity:
+            self.intensity.mark(timestamp, mid_price)
+    
+    def calibration_due(self) -> bool:
+        """Whether the trade stream should be fetched this cycle"""
+        if not self.intensity:
+            return False
+        interval = self.config.get('calibration', {}).get('trades_interval', 5)
+        return time.time() - self.last_calibration >= interval
+    
+    def apply_trades(self, trades: list) -> None:
+        """Feed public trades to the intensity estimator (and recorder) and adopt a refitted k"""
+        on_trade = self.recorder.record_trade if self.recorder else None
+        if not self.intensity.add_trades(trades, on_trade):
+            return
+        fit = self.intensity.fit(time.time())
+        if fit is not None and self.spread_model.set_k(fit[1]):
+            logger.info(f"Calibrated A={fit[0]:.3f}/s k={fit[1]:.1f}")
+    
+    def update_calibration(self) -> None:
+        """Fetch public trades since the calibration cursor and refit (A, k) when due"""
+        if not self.calibration_due():
+            return
+        # Fills matter more than calibration when the rate budget is tight
+        if self.scheduler and self.scheduler.congested:
+            return
+        self.last_calibration = time.time()
+        try:
+            since = self.intensity.cursor or None
+            trades = self.exchange.fetch_trades(self.symbol, since=since)
+            self.apply_trades(trades)
+        except Exception as e:
+            logger.error(f"Error updating calibration: {e}")
+    
     def calculate_volatility(self) -> float:
-        """Calculate realized volatility from price history"""
-        if len(self.price_history) < 2:
-            return self.volatility
-        
-        returns = []
-        for i in range(1, len(self.price_history)):
-            ret = math.log(self.price_history[i] / self.price_history[i-1])
-            returns.append(ret)
-        
-        if len(returns) > 1:
-            self.volatility = statistics.stdev(returns) * math.sqrt(3600)
-            self.volatility = max(self.volatility, 0.001)
-        
+        """Return realized volatility (maintained incrementally by update_price)"""
         return self.volatility
     
+    def calculate_time_remaining(self) -> float:
+        """Time left in the current horizon (the horizon restarts every hour from horizon_start)"""
+        T = self.config['strategy']['time_horizon']
+        elapsed = (time.time() - self.horizon_start) % SECONDS_PER_HOUR
+        time_remaining = T - elapsed / SECONDS_PER_HOUR
+        return max(time_remaining, 0.01)
+    
     def calculate_reservation_price(self, mid_price: float) -> float:
         """Calculate reservation price based on inventory"""
-        gamma = self.config['strategy']['gamma']
-        T = self.config['strategy']['time_horizon']
-        
         sigma = self.calculate_volatility()
-        time_remaining = T - (time.time() % 3600) / 3600
-        time_remaining = max(time_remaining, 0.01)
+        time_remaining = self.calculate_time_remaining()
         
-        reservation_price = mid_price - (self.inventory * gamma * sigma**2 * time_remaining)
+        reservation_price = mid_price - self.spread_model.reservation_offset(self.inventory, sigma, time_remaining)
         return reservation_price
     
     def calculate_optimal_spread(self, mid_price: float) -> float:
-        """Calculate optimal bid-ask spread"""
-        gamma = self.config['strategy']['gamma']
-        k = self.config['strategy']['k']
-        T = self.config['strategy']['time_horizon']
-        
+        """Calculate optimal bid-ask spread (the k term is cached in the spread model)"""
         sigma = self.calculate_volatility()
-        time_remaining = T - (time.time() % 3600) / 3600
-        time_remaining = max(time_remaining, 0.01)
+        time_remaining = self.calculate_time_remaining()
         
-        spread = gamma * sigma**2 * time_remaining + (2/gamma) * math.log(1 + gamma/k)
+        spread = self.spread_model.spread(sigma, time_remaining)
         
         min_spread = self.config['strategy']['min_spread']
         spread = max(spread, min_spread)
@@ -191,6 +508,8 @@ class UniversalMarketMaker:
         """Calculate optimal bid and ask prices"""
         reservation_price = self.calculate_reservation_price(mid_price)
         spread = self.calculate_optimal_spread(mid_price)
+        self.last_reservation = reservation_price
+        self.last_spread = spread
         
         bid_price = reservation_price - spread/2
         ask_price = reservation_price + spread/2
@@ -253,14 +572,10 @@ class UniversalMarketMaker:
         return max(size, min_size)
     
     def get_available_balance(self) -> float:
-        """Get available balance in quote currency"""
-        try:
-            balance = self.exchange.fetch_balance()
-            quote_currency = self.symbol.split('/')[1].split(':')[0]
-            return balance.get(quote_currency, {}).get('free', 0)
-        except Exception as e:
-            logger.error(f"Error fetching balance: {e}")
-            return 0
+        """Free quote-currency balance from the account cache (never blocks)"""
+        if self.account is None:
+            return 0.0
+        return self.account.free(self.quote_currency)
     
     def cancel_all_orders(self) -> None:
         """Cancel all open orders"""
@@ -271,79 +586,254 @@ class UniversalMarketMaker:
                 open_orders = self.exchange.fetch_open_orders(self.symbol)
                 for order in open_orders:
                     self.exchange.cancel_order(order['id'], self.symbol)
+            if self.order_manager:
+                self.order_manager.forget()
             logger.info("All orders cancelled")
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
     
+    def calculate_ladder(self, bid_price: float, ask_price: float, size: float) -> Tuple[list, list]:
+        """Bid and ask ladders of (price, size) built out from the top-level quotes"""
+        ladder_config = self.config.get('ladder', {})
+        market = self.exchange.markets[self.symbol]
+        tick_size = get_tick_size(market)
+        mid_price = (bid_price + ask_price) / 2
+        step = max(ladder_config.get('spacing_ticks', 1) * tick_size,
+                   ladder_config.get('spacing_bps', 5.0) / 10000 * mid_price)
+        inventory_ratio = self.inventory * mid_price / self.config['risk']['max_inventory_usd']
+        return build_ladder(
+            bid_price, ask_price, size, self.order_manager.levels, step, tick_size,
+            get_lot_size(market), market['limits']['amount']['min'] or 0.0,
+            size_decay=ladder_config.get('size_decay', 0.8),
+            inventory_ratio=inventory_ratio,
+            inventory_skew=ladder_config.get('inventory_skew', 0.5)
+        )
+    
+    def plan_quotes(self, bid_price: float, ask_price: float, size: float) -> Tuple[list, list]:
+        """Bid and ask levels (one each, or the ladder) after the pre-trade risk checks"""
+        if isinstance(self.order_manager, LadderManager):
+            bids, asks = self.calculate_ladder(bid_price, ask_price, size)
+        else:
+            bids, asks = [(bid_price, size)], [(ask_price, size)]
+        if self.risk:
+            bids, asks = self.risk.check_quotes(bids, asks)
+        return bids, asks
+    
     def place_orders(self, bid_price: float, ask_price: float, size: float) -> None:
-        """Place bid and ask orders"""
+        """Update bid and ask orders, touching only the sides (or ladder levels) that changed"""
+        bids, asks = self.plan_quotes(bid_price, ask_price, size)
+        if isinstance(self.order_manager, LadderManager):
+            self.order_manager.update_ladder(bids, asks)
+        else:
+            self.order_manager.update_sides(bids[0] if bids else None, asks[0] if asks else None)
+    
+    def flatten_order(self) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        """Side, amount and params of the market order closing the position (None if flat)"""
+        market = self.exchange.markets[self.symbol]
+        lot_size = get_lot_size(market)
+        amount = round(round(abs(self.inventory) / lot_size) * lot_size, 12)
+        if amount <= 0 or amount < (market['limits']['amount']['min'] or 0.0):
+            return None
+        side = 'sell' if self.inventory > 0 else 'buy'
+        params = {'reduceOnly': True} if market.get('contract') else {}
+        return side, amount, params
+    
+    def flatten_position(self) -> None:
+        """Cancel all quotes and close the position at market"""
         self.cancel_all_orders()
-        
-        try:
-            # Place bid order
-            bid_order = self.exchange.create_limit_order(
-                self.symbol, 'buy', size, bid_price
-            )
-            self.current_orders['bid'] = bid_order
-            logger.info(f"Bid placed: {size} @ {bid_price}")
-        except Exception as e:
-            logger.error(f"Error placing bid: {e}")
-        
+        order = self.flatten_order()
+        if order is None:
+            return
+        side, amount, params = order
         try:
-            # Place ask order
-            ask_order = self.exchange.create_limit_order(
-                self.symbol, 'sell', size, ask_price
-            )
-            self.current_orders['ask'] = ask_order
-            logger.info(f"Ask placed: {size} @ {ask_price}")
+            self.exchange.create_order(self.symbol, 'market', side, amount, None, params)
+            logger.warning(f"Position flattened: {side} {amount} at market")
         except Exception as e:
-            logger.error(f"Error placing ask: {e}")
+            logger.error(f"Error flattening position: {e}")
+    
+    def check_risk(self, mid_price: float) -> Optional[float]:
+        """Mark the risk engine; returns a back-off delay when quoting must stop"""
+        level = self.risk.mark(mid_price)
+        if level == FLATTEN:
+            self.flatten_position()
+        if level in (FLATTEN, HALTED):
+            return min(5.0, max(self.risk.halt_remaining(), 1.0))
+        return None
     
     def update_inventory(self) -> None:
-        """Update inventory from recent trades"""
+        """Apply new fills since the ledger cursor"""
         try:
-            since = int((time.time() - 300) * 1000)  # Last 5 minutes
-            trades = self.exchange.fetch_my_trades(self.symbol, since=since, limit=50)
+            current_time = time.time()
+            if current_time - self.last_trade_check < self.config.get('fills', {}).get('poll_interval', 0):
+                return
+            # Under rate-limit pressure fills can wait a few cycles; quotes cannot
+            max_deferral = self.config.get('rate_limit', {}).get('max_fill_deferral', 5.0)
+            if self.scheduler and self.scheduler.congested and current_time - self.last_trade_check < max_deferral:
+                return
+            self.last_trade_check = current_time
             
-            for trade in trades:
-                if trade['timestamp'] > since:
-                    if trade['side'] == 'buy':
-                        self.inventory += trade['amount']
-                    else:
-                        self.inventory -= trade['amount']
-                    
-                    self.trades_count += 1
-                    
-                    # Update PnL
-                    fee = trade.get('fee', {}).get('cost', 0)
-                    self.pnl -= fee
-                    
-                    logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+            self.fill_ledger.poll(self.exchange)
+            self.sync_inventory()
         except Exception as e:
             logger.error(f"Error updating inventory: {e}")
     
+    def sync_inventory(self) -> None:
+        """Mirror ledger position and PnL onto the strategy state"""
+        self.inventory = self.fill_ledger.position
+        self.pnl = self.fill_ledger.pnl
+        self.trades_count = self.fill_ledger.trades_count
+    
     def display_status(self, mid_price: float, bid_price: float, ask_price: float, size: float) -> None:
         """Display current bot status"""
         spread = ask_price - bid_price
         spread_bps = (spread / mid_price) * 10000
         balance = self.get_available_balance()
+        account_age = self.account.snapshot.age if self.account else float('inf')
         
         print(f"\n{'='*60}")
         print(f"Exchange: {self.config['exchange']['name']} | Symbol: {self.symbol}")
         print(f"Mid Price: ${mid_price:.4f} | Spread: {spread_bps:.1f}bps")
-        print(f"Volatility: {self.volatility:.3f} | Inventory: {self.inventory:.4f}")
+        print(f"Volatility: {self.volatility:.3f} | Inventory: {self.inventory:.4f} | k: {self.spread_model.k:.2f}")
         print(f"Bid: ${bid_price:.4f} | Ask: ${ask_price:.4f} | Size: {size:.4f}")
         print(f"Trades: {self.trades_count} | PnL: ${self.pnl:.2f}")
-        print(f"Balance: ${balance:.2f}")
+        print(f"Balance: ${balance:.2f} ({account_age:.0f}s old)")
+        if self.account and self.account.stale:
+            print(f"⚠️  Account state is stale ({account_age:.0f}s > {self.account.max_age:.0f}s)")
+        if self.order_manager:
+            print(self.order_manager.summary())
+        if self.risk:
+            print(self.risk.summary())
+        if self.intensity:
+            print(self.intensity.summary())
+        if self.scheduler:
+            print(self.scheduler.summary())
+    
+    def start_metrics(self) -> None:
+        """Time every exchange call per endpoint and start the metrics endpoint if configured"""
+        if not isinstance(self.exchange, InstrumentedExchange):
+            self.exchange = InstrumentedExchange(self.exchange, self.metrics)
+        
+        metrics_config = self.config.get('metrics', {})
+        port = metrics_config.get('http_port', 0)
+        if port and self.metrics.server is None:
+            try:
+                self.metrics.serve(port, metrics_config.get('http_host', '127.0.0.1'))
+            except OSError as e:
+                logger.warning(f"Could not start metrics endpoint on port {port}: {e}")
+    
+    def start_scheduler(self) -> None:
+        """Route every exchange call through the weighted priority scheduler"""
+        rate_config = self.config.get('rate_limit', {})
+        if not rate_config.get('enabled', True) or isinstance(self.exchange, ScheduledExchange):
+            return
+        
+        # Default to the exchange's own published limit (ccxt rateLimit is ms per request)
+        rate_limit_ms = getattr(self.exchange, 'rateLimit', None)
+        default_rate = 1000.0 / rate_limit_ms if rate_limit_ms else 10.0
+        priorities = {name: priority for priority, name in PRIORITY_NAMES.items()}
+        self.scheduler = RequestScheduler(
+            rate_config.get('requests_per_second', default_rate),
+            burst=rate_config.get('burst'),
+            weights=rate_config.get('weights'),
+            reserve={priorities[name]: value for name, value in rate_config.get('reserve', {}).items()},
+            cooldown=rate_config.get('cooldown', 5.0),
+            metrics=self.metrics
+        )
+        # The scheduler replaces ccxt's fixed per-call delay
+        self.exchange.enableRateLimit = False
+        self.exchange = ScheduledExchange(self.exchange, self.scheduler)
+        logger.info(f"Request scheduler: {self.scheduler.rate:.1f} req/s, burst {self.scheduler.capacity:.0f}")
+    
+    def setup_symbol(self) -> None:
+        """Validate the symbol and create per-symbol state on a connected exchange"""
+        self.validate_symbol()
+        self.create_order_manager()
+        self.create_fill_ledger()
+        self.create_risk_engine()
+        self.create_calibration()
+        self.create_checkpoint()
+        self.create_account_state()
+        self.create_recorder()
+        self.set_leverage()
+    
+    def run_iteration(self) -> Optional[float]:
+        """Run one quoting cycle
+        
+        Returns None after a normal cycle, or a back-off delay in seconds
+        when the cycle was skipped (empty book, inventory limit).
+        """
+        # Stage timings use perf_counter (monotonic, high resolution)
+        metrics = self.metrics
+        cycle_start = time.perf_counter()
+        
+        # Fetch orderbook
+        orderbook = self.exchange.fetch_order_book(self.symbol)
+        if not orderbook['bids'] or not orderbook['asks']:
+            logger.warning("Empty orderbook, retrying...")
+            return 1
+        
+        # Calculate mid price
+        best_bid = orderbook['bids'][0][0]
+        best_ask = orderbook['asks'][0][0]
+        mid_price = (best_bid + best_ask) / 2
+        self.record_book(best_bid, best_ask, orderbook['bids'][0][1], orderbook['asks'][0][1])
+        tick_time = time.perf_counter()
+        metrics.record('stage.book', tick_time - cycle_start)
+        
+        # Update price history and volatility
+        self.update_price(mid_price)
+        
+        # Update inventory
+        self.update_inventory()
+        self.update_calibration()
+        stage_start = time.perf_counter()
+        metrics.record('stage.inventory', stage_start - tick_time)
+        
+        # Check risk limits (in memory; per-order checks run in place_orders)
+        backoff = self.check_risk(mid_price)
+        if backoff is not None:
+            return backoff
+        
+        # Calculate quotes
+        bid_price, ask_price = self.calculate_quote_prices(mid_price)
+        size = self.calculate_position_size(mid_price)
+        now = time.perf_counter()
+        metrics.record('stage.quote', now - stage_start)
+        stage_start = now
+        
+        # Display status
+        self.display_status(mid_price, bid_price, ask_price, size)
+        now = time.perf_counter()
+        metrics.record('stage.display', now - stage_start)
+        stage_start = now
+        
+        # Place orders
+        self.place_orders(bid_price, ask_price, size)
+        now = time.perf_counter()
+        metrics.record('stage.orders', now - stage_start)
+        metrics.record('tick_to_quote', now - tick_time)
+        metrics.record('cycle', now - cycle_start)
+        if self.started_at is not None:
+            metrics.record('startup', now - self.started_at)
+            logger.info(f"First quote {now - self.started_at:.3f}s after start")
+            self.started_at = None
+        
+        self.record_quote(mid_price, bid_price, ask_price, size)
+        metrics.maybe_log_summary()
+        self.maybe_checkpoint()
+        return None
     
     def run(self) -> None:
         """Main bot loop"""
         logger.info("Starting Universal Market Maker Bot")
+        self.started_at = time.perf_counter()
         
-        # Initialize exchange
-        self.initialize_exchange()
-        self.validate_symbol()
-        self.set_leverage()
+        # Initialize exchange (unless one was injected, e.g. sim_exchange.SimExchange)
+        if self.exchange is None:
+            self.initialize_exchange()
+        self.start_metrics()
+        self.start_scheduler()
+        self.setup_symbol()
         
         self.running = True
         update_frequency = self.config['strategy']['update_frequency']
@@ -352,49 +842,20 @@ class UniversalMarketMaker:
         
         while self.running:
             try:
-                start_time = time.time()
+                start_time = time.monotonic()
+                self.apply_fresh_markets()
                 
-                # Fetch orderbook
-                orderbook = self.exchange.fetch_order_book(self.symbol)
-                if not orderbook['bids'] or not orderbook['asks']:
-                    logger.warning("Empty orderbook, retrying...")
-                    time.sleep(1)
+                backoff = self.run_iteration()
+                if backoff is not None:
+                    time.sleep(backoff)
                     continue
                 
-                # Calculate mid price
-                best_bid = orderbook['bids'][0][0]
-                best_ask = orderbook['asks'][0][0]
-                mid_price = (best_bid + best_ask) / 2
-                
-                # Update price history
-                self.price_history.append(mid_price)
-                
-                # Update inventory
-                self.update_inventory()
-                
-                # Check risk limits
-                inventory_value = abs(self.inventory * mid_price)
-                max_inventory = self.config['risk']['max_inventory_usd']
-                
-                if inventory_value > max_inventory:
-                    logger.warning(f"Inventory limit reached: ${inventory_value:.2f} > ${max_inventory}")
-                    self.cancel_all_orders()
-                    time.sleep(10)
-                    continue
-                
-                # Calculate quotes
-                bid_price, ask_price = self.calculate_quote_prices(mid_price)
-                size = self.calculate_position_size(mid_price)
-                
-                # Display status
-                self.display_status(mid_price, bid_price, ask_price, size)
-                
-                # Place orders
-                self.place_orders(bid_price, ask_price, size)
-                
                 # Sleep until next update
-                elapsed = time.time() - start_time
+                elapsed = time.monotonic() - start_time
                 sleep_time = max(0, update_frequency - elapsed)
+                if self.scheduler:
+                    # Back off while the exchange has us paused for rate limiting
+                    sleep_time = max(sleep_time, self.scheduler.cooldown_remaining())
                 time.sleep(sleep_time)
                 
             except KeyboardInterrupt:
@@ -406,6 +867,13 @@ class UniversalMarketMaker:
         
         # Cleanup
         self.cancel_all_orders()
+        self.save_checkpoint()
+        if self.account:
+            self.account.stop()
+        if self.recorder:
+            self.recorder.close()
+        logger.info(self.metrics.summary_line())
+        self.metrics.close()
         logger.info("Bot stopped")
     
     def stop(self) -> None:
@@ -424,6 +892,12 @@ def main():
         default='config.json',
         help='Path to configuration file (default: config.json)'
     )
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Run the asyncio engine (concurrent order placement and fetches)'
+    )
     
     args = parser.parse_args()
     
@@ -434,7 +908,11 @@ def main():
         sys.exit(1)
     
     # Create and run bot
-    bot = UniversalMarketMaker(args.config)
+    if args.use_async:
+        from async_market_maker import AsyncMarketMaker
+        bot = AsyncMarketMaker(args.config)
+    else:
+        bot = UniversalMarketMaker(args.config)
     
     try:
         bot.run()
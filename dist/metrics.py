@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Latency Metrics - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Per-stage and per-endpoint latency histograms with a local HTTP endpoint
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Exchange methods timed by InstrumentedExchange
+EXCHANGE_ENDPOINTS = {
+    'load_markets', 'fetch_order_book', 'fetch_trades', 'fetch_my_trades', 'fetch_balance', 'fetch_open_orders',
+    'create_order', 'create_limit_order', 'create_orders', 'edit_order', 'cancel_order',
+    'cancel_orders', 'cancel_all_orders', 'set_leverage', 'fetch_positions'
+}
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with O(1) recording
+
+    Buckets are ~5% wide from 1 microsecond up, so p50/p99 are reported
+    within a few percent without storing individual samples.
+    """
+
+    RESOLUTION = 20  # buckets per e-fold, ~5% relative width
+    MAX_BUCKET = 20 * 19  # ~1.8e8 us (3 minutes)
+
+    def __init__(self):
+        """Initialize an empty histogram"""
+        self.buckets = [0] * (self.MAX_BUCKET + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one sample (in seconds)"""
+        micros = seconds * 1e6
+        index = int(math.log(micros) * self.RESOLUTION) if micros > 1 else 0
+        self.buckets[min(index, self.MAX_BUCKET)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile in seconds (q in 0..100)"""
+        if self.count == 0:
+            return 0.0
+        target = q / 100 * self.count
+        running = 0
+        for index, bucket in enumerate(self.buckets):
+            running += bucket
+            if running >= target and bucket:
+                # Geometric midpoint of the bucket, capped at the observed max
+                return min(math.exp((index + 0.5) / self.RESOLUTION) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        """Summary statistics in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000
+        }
+
+
+class Metrics:
+    """Registry of latency histograms
+
+    Every sample goes to a cumulative histogram (served over HTTP) and to
+    a window histogram that is reset each time the periodic summary line
+    is logged. Samples arrive from the quoting loop, the account refresh
+    thread and scheduled exchange calls at once, so every update and read
+    holds the lock.
+    """
+
+    def __init__(self, summary_interval: float = 60.0):
+        """Initialize the registry"""
+        self.cumulative: Dict[str, LatencyHistogram] = {}
+        self.window: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.summary_interval = summary_interval
+        self.last_summary = time.monotonic()
+        self.lock = threading.Lock()
+        self.server = None
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a duration for a stage or endpoint"""
+        with self.lock:
+            histogram = self.cumulative.get(name)
+            if histogram is None:
+                histogram = self.cumulative[name] = LatencyHistogram()
+            histogram.record(seconds)
+            window = self.window.get(name)
+            if window is None:
+                window = self.window[name] = LatencyHistogram()
+            window.record(seconds)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Bump a plain counter (errors, requests, ...)"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count(self, prefix: str = '') -> int:
+        """Samples recorded so far in the histograms whose names start with prefix"""
+        with self.lock:
+            return sum(histogram.count for name, histogram in self.cumulative.items() if name.startswith(prefix))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative statistics for every histogram and counter"""
+        with self.lock:
+            return {
+                'latency': {name: self.cumulative[name].snapshot() for name in sorted(self.cumulative)},
+                'counters': dict(self.counters)
+            }
+
+    def summary_line(self) -> str:
+        """One line of window p50/p99/max per histogram, resetting the window"""
+        with self.lock:
+            window = self.window
+            self.window = {name: LatencyHistogram() for name in window}
+        parts = []
+        for name in sorted(window):
+            histogram = window[name]
+            if histogram.count:
+                parts.append(f"{name} {histogram.percentile(50) * 1000:.1f}/"
+                             f"{histogram.percentile(99) * 1000:.1f}/{histogram.max * 1000:.1f}")
+        return "Latency ms p50/p99/max | " + " | ".join(parts)
+
+    def maybe_log_summary(self) -> None:
+        """Log the summary line when the interval has elapsed"""
+        if self.summary_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self.last_summary >= self.summary_interval:
+            self.last_summary = now
+            logger.info(self.summary_line())
+
+    def prometheus(self) -> str:
+        """Cumulative metrics in Prometheus text exposition format"""
+        lines = ['# TYPE roboquant_latency_seconds summary']
+        with self.lock:
+            for name, histogram in sorted(self.cumulative.items()):
+                label = name.replace('"', '')
+                for q in (0.5, 0.99):
+                    lines.append(f'roboquant_latency_seconds{{name="{label}",quantile="{q}"}} {histogram.percentile(q * 100):.9f}')
+                lines.append(f'roboquant_latency_seconds_sum{{name="{label}"}} {histogram.total:.9f}')
+                lines.append(f'roboquant_latency_seconds_count{{name="{label}"}} {histogram.count}')
+                lines.append(f'roboquant_latency_max_seconds{{name="{label}"}} {histogram.max:.9f}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'roboquant_{name.replace(".", "_")}_total {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> None:
+        """Serve /metrics (Prometheus) and /metrics.json on a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body = json.dumps(metrics.snapshot()).encode()
+                    content_type = 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body = metrics.prometheus().encode()
+                    content_type = 'text/plain; version=0.0.4'
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+        thread.start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+
+    def close(self) -> None:
+        """Stop the HTTP server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class InstrumentedExchange:
+    """Transparent ccxt proxy timing every exchange call per endpoint
+
+    Works for both sync and ccxt.async_support exchanges; attributes such
+    as markets and has pass straight through.
+    """
+
+    def __init__(self, exchange: Any, metrics: Metrics):
+        """Wrap an exchange instance"""
+        object.__setattr__(self, '_exchange', exchange)
+        object.__setattr__(self, '_metrics', metrics)
+        object.__setattr__(self, '_wrapped', {})
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._exchange, name)
+        if name not in EXCHANGE_ENDPOINTS or not callable(attribute):
+            return attribute
+
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+
+        metrics = self._metrics
+        key = f"api.{name}"
+
+        if asyncio.iscoroutinefunction(attribute):
+            @functools.wraps(attribute)
+            async def wrapped(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await attribute(*args, **kwargs)
+                except Exception:
+                    metrics.increment(f"errors.{name}")
+                    raise
+                finally:
+                    metrics.record(key, time.perf_counter() - start)
+        else:
+            @functools.wraps(attribute)
+            def wrapped(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return attribute(*args, **kwargs)
+                except Exception:
+                    metrics.increment(f"errors.{name}")
+                    raise
+                finally:
+                    metrics.record(key, time.perf_counter() - start)
+
+        self._wrapped[name] = wrapped
+        return wrapped
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._exchange, name, value)
+
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Local L2 Order Book - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Snapshot + incremental depth updates with sequence-gap detection
+"""
+
+import asyncio
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import ccxt
+
+try:
+    import ccxt.pro as ccxtpro
+except ImportError:  # ccxt.pro ships with ccxt >= 4 but may be missing on old installs
+    ccxtpro = None
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceGapError(Exception):
+    """Raised when an incremental update does not follow the book sequence"""
+
+
+class BookSide:
+    """One side of an L2 book stored as a sorted array of price levels
+
+    Keys are kept in ascending order with the best level at the end of the
+    array, so best price lookup is O(1) and removing the best level (the
+    common case when the touch trades away) does not shift the array.
+    Bids use the price as key, asks use the negated price.
+    """
+
+    def __init__(self, is_bid: bool):
+        """Initialize an empty side"""
+        self.is_bid = is_bid
+        self.keys: List[float] = []
+        self.sizes: Dict[float, float] = {}
+
+    def _key(self, price: float) -> float:
+        return price if self.is_bid else -price
+
+    def _price(self, key: float) -> float:
+        return key if self.is_bid else -key
+
+    def clear(self) -> None:
+        """Remove every level"""
+        self.keys = []
+        self.sizes = {}
+
+    def set_level(self, price: float, size: float) -> None:
+        """Insert, update or (size == 0) delete a price level"""
+        key = self._key(price)
+        if size <= 0:
+            if key in self.sizes:
+                del self.sizes[key]
+                index = bisect_left(self.keys, key)
+                del self.keys[index]
+            return
+
+        if key not in self.sizes:
+            index = bisect_left(self.keys, key)
+            self.keys.insert(index, key)
+        self.sizes[key] = size
+
+    def load(self, levels: Iterable[Iterable[float]]) -> None:
+        """Replace the side with a full snapshot"""
+        self.sizes = {}
+        for level in levels:
+            price, size = float(level[0]), float(level[1])
+            if size > 0:
+                self.sizes[self._key(price)] = size
+        self.keys = sorted(self.sizes)
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        """Best (price, size) or None when empty"""
+        if not self.keys:
+            return None
+        key = self.keys[-1]
+        return self._price(key), self.sizes[key]
+
+    def top(self, depth: int) -> List[List[float]]:
+        """Top N levels as [[price, size], ...], best first"""
+        keys = self.keys[-depth:] if depth > 0 else []
+        return [[self._price(key), self.sizes[key]] for key in reversed(keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class LocalOrderBook:
+    """L2 order book maintained from a snapshot plus incremental diffs"""
+
+    def __init__(self, symbol: str):
+        """Initialize an empty, unsynced book"""
+        self.symbol = symbol
+        self.bids = BookSide(True)
+        self.asks = BookSide(False)
+        self.sequence: Optional[int] = None
+        self.timestamp: Optional[int] = None
+        self.synced = False
+        self.updates = 0
+
+    def apply_snapshot(self, bids: Iterable, asks: Iterable,
+                       sequence: Optional[int] = None, timestamp: Optional[int] = None) -> None:
+        """Load a full depth snapshot and mark the book as synced"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.synced = True
+        self.updates += 1
+
+    def apply_delta(self, bids: Iterable, asks: Iterable, sequence: Optional[int] = None,
+                    prev_sequence: Optional[int] = None, timestamp: Optional[int] = None) -> bool:
+        """Apply an incremental update
+
+        Returns False for stale updates that are already reflected in the
+        book and raises SequenceGapError when an update is missing.
+        """
+        if not self.synced:
+            raise SequenceGapError(f"{self.symbol}: book is not synced")
+
+        if sequence is not None and self.sequence is not None:
+            if sequence <= self.sequence:
+                return False
+            expected = prev_sequence if prev_sequence is not None else sequence - 1
+            if expected != self.sequence:
+                self.synced = False
+                raise SequenceGapError(
+                    f"{self.symbol}: expected update after {self.sequence}, got {expected}"
+                )
+
+        # Levels may carry extra fields (e.g. [price, size, count])
+        for level in bids:
+            self.bids.set_level(float(level[0]), float(level[1]))
+        for level in asks:
+            self.asks.set_level(float(level[0]), float(level[1]))
+
+        if sequence is not None:
+            self.sequence = sequence
+        self.timestamp = timestamp
+        self.updates += 1
+        return True
+
+    def best_bid(self) -> Optional[float]:
+        """Best bid price"""
+        best = self.bids.best()
+        return best[0] if best else None
+
+    def best_ask(self) -> Optional[float]:
+        """Best ask price"""
+        best = self.asks.best()
+        return best[0] if best else None
+
+    def mid(self) -> Optional[float]:
+        """Mid price of the touch"""
+        bid = self.bids.best()
+        ask = self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def microprice(self) -> Optional[float]:
+        """Size-weighted mid: leans toward the side with less resting size"""
+        bid = self.bids.best()
+        ask = self.asks.best()
+        if bid is None or ask is None:
+            return None
+        total = bid[1] + ask[1]
+        if total <= 0:
+            return (bid[0] + ask[0]) / 2
+        return (bid[0] * ask[1] + ask[0] * bid[1]) / total
+
+    def depth(self, levels: int = 5) -> Dict[str, List[List[float]]]:
+        """Top N levels per side in ccxt order book layout"""
+        return {
+            'bids': self.bids.top(levels),
+            'asks': self.asks.top(levels),
+            'nonce': self.sequence,
+            'timestamp': self.timestamp
+        }
+
+
+class BookSynchronizer:
+    """Drives a LocalOrderBook from a stream of snapshot/delta messages
+
+    Messages are dicts with keys 'type' ('snapshot' or 'delta'), 'bids',
+    'asks', 'sequence' and optionally 'prev_sequence' and 'timestamp'.
+    A feed that knows it lost updates without seeing their sequence numbers
+    sends {'type': 'gap'}, which unsyncs the book like a sequence gap.
+    Deltas that arrive while the book is unsynced are buffered; when a
+    snapshot arrives (from the stream or from a REST fetch after a gap)
+    buffered deltas newer than the snapshot are replayed on top of it.
+    """
+
+    def __init__(self, book: LocalOrderBook, max_buffer: int = 10000):
+        """Initialize the synchronizer"""
+        self.book = book
+        self.buffer = deque(maxlen=max_buffer)
+        self.gaps = 0
+        self.resyncs = 0
+
+    @property
+    def needs_snapshot(self) -> bool:
+        """True when the book must be resynced from a snapshot"""
+        return not self.book.synced
+
+    def process(self, message: Dict[str, Any]) -> bool:
+        """Apply one message, returning True when the book changed"""
+        if message.get('type') == 'snapshot':
+            self.on_snapshot(message)
+            return True
+
+        if message.get('type') == 'gap':
+            self.gaps += 1
+            self.book.synced = False
+            self.buffer.clear()
+            logger.warning(f"Order book feed lost updates, resyncing: {message.get('reason')}")
+            return False
+
+        if not self.book.synced:
+            self.buffer.append(message)
+            return False
+
+        try:
+            return self.book.apply_delta(
+                message.get('bids', []), message.get('asks', []),
+                message.get('sequence'), message.get('prev_sequence'),
+                message.get('timestamp')
+            )
+        except SequenceGapError as e:
+            self.gaps += 1
+            logger.warning(f"Order book gap detected, resyncing: {e}")
+            self.buffer.clear()
+            self.buffer.append(message)
+            return False
+
+    def on_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Apply a snapshot (stream message or ccxt order book) and replay buffered deltas"""
+        sequence = snapshot.get('sequence', snapshot.get('nonce'))
+        self.book.apply_snapshot(
+            snapshot.get('bids', []), snapshot.get('asks', []),
+            sequence, snapshot.get('timestamp')
+        )
+        self.resyncs += 1
+
+        pending = list(self.buffer)
+        self.buffer.clear()
+        for message in pending:
+            if sequence is not None and message.get('sequence') is not None \
+                    and message['sequence'] <= sequence:
+                continue
+            self.process(message)
+
+
+class ReplayFeed:
+    """Replays recorded depth messages, for offline runs and tests
+
+    Works both as a plain iterator and as an async iterator. With speed > 0
+    the async iterator sleeps to reproduce the recorded message timing
+    (speed 2.0 replays twice as fast); with speed 0 it yields as fast as
+    the consumer reads.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]], speed: float = 0.0):
+        """Initialize the feed from an iterable of messages"""
+        self.messages = list(messages)
+        self.speed = speed
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 0.0) -> 'ReplayFeed':
+        """Load messages from a JSON-lines file"""
+        with open(path, 'r') as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        return cls(messages, speed)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    async def __aiter__(self):
+        start_wall = time.monotonic()
+        start_ts = None
+        for message in self.messages:
+            timestamp = message.get('timestamp')
+            if self.speed > 0 and timestamp is not None:
+                if start_ts is None:
+                    start_ts = timestamp
+                target = (timestamp - start_ts) / 1000 / self.speed
+                delay = target - (time.monotonic() - start_wall)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
+            yield message
+
+
+class CcxtProFeed:
+    """Live depth feed from ccxt.pro watch_order_book
+
+    ccxt.pro already merges the venue's diffs internally, so each update
+    is forwarded as a top-N snapshot message carrying the exchange nonce.
+    When ccxt.pro finds a gap in those diffs (InvalidNonce, ChecksumError)
+    or the socket drops, the updates in between are lost: the feed sends a
+    gap message so the book is unsynced and resynced from a REST snapshot
+    instead of quoting from stale levels until the stream recovers.
+    """
+
+    def __init__(self, exchange: Any, symbol: str, depth: int = 20, retry_delay: float = 1.0):
+        """Initialize the feed around a ccxt.pro exchange instance"""
+        if ccxtpro is None:
+            raise ImportError("ccxt.pro is not available - upgrade ccxt to use streaming market data")
+        self.exchange = exchange
+        self.symbol = symbol
+        self.depth = depth
+        self.retry_delay = retry_delay
+
+    async def __aiter__(self):
+        while True:
+            try:
+                orderbook = await self.exchange.watch_order_book(self.symbol, self.depth)
+            except ccxt.NetworkError as e:
+                # InvalidNonce and ChecksumError are NetworkErrors too
+                yield {'type': 'gap', 'reason': f"{type(e).__name__}: {e}"}
+                await asyncio.sleep(self.retry_delay)
+                continue
+            yield {
+                'type': 'snapshot',
+                'bids': orderbook['bids'][:self.depth],
+                'asks': orderbook['asks'][:self.depth],
+                'sequence': orderbook.get('nonce'),
+                'timestamp': orderbook.get('timestamp')
+            }
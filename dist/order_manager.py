@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Quote Order Manager - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Diffs desired quotes against live orders and only touches what changed
+"""
+
+import asyncio
+import logging
+
+import ccxt
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SIDES = {'bid': 'buy', 'ask': 'sell'}
+
+
+def get_tick_size(market: Dict[str, Any]) -> float:
+    """Price tick from ccxt market precision (decimal places or tick size)"""
+    price_precision = market['precision']['price']
+    if isinstance(price_precision, int):
+        return 10 ** -price_precision
+    return float(price_precision)
+
+
+class QuoteManager:
+    """Tracks live bid/ask orders and requotes only when a quote changes
+
+    The old behaviour cancelled everything and placed two fresh orders on
+    every tick (3 requests). Here each side is compared with the live
+    order: unchanged quotes are left alone (keeping queue priority),
+    changed quotes are amended with edit_order where the exchange supports
+    it, and otherwise only that side is cancelled and replaced.
+
+    Fills must be fed to on_fill() (the bots register it as a fill ledger
+    listener), or to reconcile() as an open-orders snapshot where fill
+    order ids are not available: a filled side is cleared so the next
+    update recreates it, and a partly filled side is replaced with a
+    fresh full-size order.
+    """
+
+    BASELINE_REQUESTS_PER_TICK = 3  # cancel_all + bid + ask
+
+    def __init__(self, exchange: Any, symbol: str, tick_size: float,
+                 tolerance_ticks: float = 0, tolerance_bps: float = 0.0,
+                 use_amend: bool = True):
+        """Initialize the manager"""
+        self.exchange = exchange
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.tolerance_ticks = tolerance_ticks
+        self.tolerance_bps = tolerance_bps
+        self.use_amend = use_amend
+        self.orders: Dict[str, Optional[Dict[str, Any]]] = {'bid': None, 'ask': None}
+        self.stats = {
+            'ticks': 0,
+            'requests': 0,
+            'creates': 0,
+            'amends': 0,
+            'cancels': 0,
+            'kept': 0,
+            'filled': 0,
+            'errors': 0
+        }
+
+    @property
+    def can_amend(self) -> bool:
+        """True when edit_order should be used for price/size changes"""
+        has = getattr(self.exchange, 'has', {}) or {}
+        return self.use_amend and bool(has.get('editOrder'))
+
+    @property
+    def requests_avoided(self) -> int:
+        """Requests saved compared with cancel-all-and-replace every tick"""
+        return self.stats['ticks'] * self.BASELINE_REQUESTS_PER_TICK - self.stats['requests']
+
+    def needs_update(self, key: str, price: float, size: float) -> bool:
+        """True when the live order on this side differs beyond tolerance"""
+        order = self.orders[key]
+        if order is None:
+            return True
+        if abs(order['amount'] - size) > 1e-12:
+            return True
+        tolerance = max(self.tolerance_ticks * self.tick_size,
+                        self.tolerance_bps / 10000 * price)
+        # Half a tick of slack absorbs float noise from tick rounding
+        return abs(order['price'] - price) > max(tolerance, self.tick_size / 2)
+
+    def plan(self, key: str, price: float, size: float) -> str:
+        """Decide the action for one side: keep, create, amend or replace"""
+        if not self.needs_update(key, price, size):
+            return 'keep'
+        order = self.orders[key]
+        if order is None:
+            return 'create'
+        # Amend sizes are totals including what already filled, so top up with a new order
+        if order.get('filled'):
+            return 'replace'
+        return 'amend' if self.can_amend else 'replace'
+
+    def on_fill(self, trade: Dict[str, Any]) -> None:
+        """Account a fill against the tracked order it belongs to
+
+        A fully filled order is dropped so the next update recreates it; a
+        partial fill reduces the tracked amount so the side is topped up.
+        """
+        order_id = trade.get('order')
+        if order_id is None:
+            return
+        for key, order in self.orders.items():
+            if order is None or order.get('id') != order_id:
+                continue
+            amount = float(trade.get('amount') or 0)
+            order['amount'] -= amount
+            order['filled'] = order.get('filled', 0.0) + amount
+            if order['amount'] <= 1e-12:
+                self.orders[key] = None
+                self.stats['filled'] += 1
+                logger.info(f"{key.capitalize()} filled")
+            return
+
+    def reconcile(self, open_orders: List[Dict[str, Any]]) -> int:
+        """Account fills from an open-orders snapshot where fill order ids are not available
+
+        A tracked order missing from the snapshot has filled (or was
+        cancelled elsewhere) and is dropped; one with less remaining than
+        tracked is treated as partly filled. Returns the sides changed.
+        """
+        remaining = {order.get('id'): order.get('remaining') for order in open_orders}
+        changed = 0
+        for key, order in self.orders.items():
+            if order is None or order.get('id') is None:
+                continue
+            if order['id'] not in remaining:
+                self.orders[key] = None
+                self.stats['filled'] += 1
+                logger.info(f"{key.capitalize()} filled")
+                changed += 1
+                continue
+            left = remaining[order['id']]
+            if left is not None and float(left) < order['amount'] - 1e-12:
+                order['filled'] = order.get('filled', 0.0) + order['amount'] - float(left)
+                order['amount'] = float(left)
+                changed += 1
+        return changed
+
+    def _record(self, key: str, order: Optional[Dict[str, Any]], price: float, size: float) -> None:
+        """Store the live order state for one side"""
+        if order is None:
+            self.orders[key] = None
+            return
+        self.orders[key] = {
+            'id': order.get('id'),
+            'price': price,
+            'amount': size,
+            'side': SIDES[key]
+        }
+
+    def update_quotes(self, bid_price: float, ask_price: float, size: float) -> None:
+        """Bring live orders in line with the desired quotes"""
+        self.update_sides((bid_price, size), (ask_price, size))
+
+    def update_sides(self, bid: Optional[Tuple[float, float]], ask: Optional[Tuple[float, float]]) -> None:
+        """Bring each side in line with a (price, size) quote, cancelling sides given as None"""
+        self.stats['ticks'] += 1
+        for key, quote in (('bid', bid), ('ask', ask)):
+            if quote is None:
+                self.cancel_side(key)
+            else:
+                self.update_side(key, *quote)
+
+    def update_side(self, key: str, price: float, size: float) -> None:
+        """Apply the planned action for one side"""
+        action = self.plan(key, price, size)
+        if action == 'keep':
+            self.stats['kept'] += 1
+            return
+
+        side = SIDES[key]
+        if action == 'amend':
+            try:
+                self.stats['requests'] += 1
+                order = self.exchange.edit_order(
+                    self.orders[key]['id'], self.symbol, 'limit', side, size, price
+                )
+                self.stats['amends'] += 1
+                self._record(key, order, price, size)
+                logger.info(f"{key.capitalize()} amended: {size} @ {price}")
+                return
+            except Exception as e:
+                # Order may have filled or been rejected for amend - fall back to replace
+                logger.warning(f"Amend {key} failed, replacing: {e}")
+                self.stats['errors'] += 1
+            action = 'replace'
+
+        # A side whose cancel failed may still be live; never rest a second order next to it
+        if action == 'replace' and not self.cancel_side(key):
+            return
+
+        try:
+            self.stats['requests'] += 1
+            order = self.exchange.create_limit_order(self.symbol, side, size, price)
+            self.stats['creates'] += 1
+            self._record(key, order, price, size)
+            logger.info(f"{key.capitalize()} placed: {size} @ {price}")
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.orders[key] = None
+            logger.error(f"Error placing {key}: {e}")
+
+    def cancel_side(self, key: str) -> bool:
+        """Cancel the live order on one side, if any; False when it may still be live
+
+        The order stays tracked until the exchange confirms the cancel or
+        reports it unknown (already filled or cancelled), so a failed
+        cancel is retried on the next update instead of being forgotten.
+        """
+        order = self.orders[key]
+        if order is None or order.get('id') is None:
+            self.orders[key] = None
+            return True
+        try:
+            self.stats['requests'] += 1
+            self.exchange.cancel_order(order['id'], self.symbol)
+            self.stats['cancels'] += 1
+        except ccxt.OrderNotFound:
+            pass
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Error cancelling {key}, still tracking it: {e}")
+            return False
+        self.orders[key] = None
+        return True
+
+    def forget(self) -> None:
+        """Drop tracked orders after an external cancel-all"""
+        self.orders['bid'] = None
+        self.orders['ask'] = None
+
+    def summary(self) -> str:
+        """One-line counter summary"""
+        return (f"Orders: {self.stats['creates']} new, {self.stats['amends']} amended, "
+                f"{self.stats['cancels']} cancelled, {self.stats['filled']} filled, {self.stats['kept']} kept | "
+                f"{self.requests_avoided} requests avoided")
+
+
+class AsyncQuoteManager(QuoteManager):
+    """QuoteManager for ccxt.async_support exchanges, updating both sides concurrently"""
+
+    async def update_quotes(self, bid_price: float, ask_price: float, size: float) -> None:
+        """Bring live orders in line with the desired quotes"""
+        await self.update_sides((bid_price, size), (ask_price, size))
+
+    async def update_sides(self, bid: Optional[Tuple[float, float]], ask: Optional[Tuple[float, float]]) -> None:
+        """Bring each side in line with a (price, size) quote, cancelling sides given as None"""
+        self.stats['ticks'] += 1
+        await asyncio.gather(*(
+            self.cancel_side(key) if quote is None else self.update_side(key, *quote)
+            for key, quote in (('bid', bid), ('ask', ask))
+        ))
+
+    async def update_side(self, key: str, price: float, size: float) -> None:
+        """Apply the planned action for one side"""
+        action = self.plan(key, price, size)
+        if action == 'keep':
+            self.stats['kept'] += 1
+            return
+
+        side = SIDES[key]
+        if action == 'amend':
+            try:
+                self.stats['requests'] += 1
+                order = await self.exchange.edit_order(
+                    self.orders[key]['id'], self.symbol, 'limit', side, size, price
+                )
+                self.stats['amends'] += 1
+                self._record(key, order, price, size)
+                logger.info(f"{key.capitalize()} amended: {size} @ {price}")
+                return
+            except Exception as e:
+                logger.warning(f"Amend {key} failed, replacing: {e}")
+                self.stats['errors'] += 1
+            action = 'replace'
+
+        if action == 'replace' and not await self.cancel_side(key):
+            return
+
+        try:
+            self.stats['requests'] += 1
+            order = await self.exchange.create_limit_order(self.symbol, side, size, price)
+            self.stats['creates'] += 1
+            self._record(key, order, price, size)
+            logger.info(f"{key.capitalize()} placed: {size} @ {price}")
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.orders[key] = None
+            logger.error(f"Error placing {key}: {e}")
+
+    async def cancel_side(self, key: str) -> bool:
+        """Cancel the live order on one side, if any; False when it may still be live"""
+        order = self.orders[key]
+        if order is None or order.get('id') is None:
+            self.orders[key] = None
+            return True
+        try:
+            self.stats['requests'] += 1
+            await self.exchange.cancel_order(order['id'], self.symbol)
+            self.stats['cancels'] += 1
+        except ccxt.OrderNotFound:
+            pass
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Error cancelling {key}, still tracking it: {e}")
+            return False
+        self.orders[key] = None
+        return True
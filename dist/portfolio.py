@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Portfolio Market Making Runner - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Quotes many symbols over one shared exchange session
+"""
+
+import copy
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from market_maker_bot import UniversalMarketMaker, logger
+
+
+def build_symbol_config(base: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a portfolio.symbols entry over the base config sections"""
+    config = copy.deepcopy(base)
+    config.pop('portfolio', None)
+
+    for section, overrides in entry.items():
+        if isinstance(overrides, dict):
+            config.setdefault(section, {}).update(overrides)
+
+    symbol = entry['symbol']
+    config['trading']['symbol'] = symbol
+
+    # Each symbol keeps its own fill ledger and checkpoint files (an empty state_file keeps none)
+    safe_symbol = symbol.replace('/', '_').replace(':', '_')
+    config.setdefault('fills', {})
+    if 'state_file' not in entry.get('fills', {}) and config['fills'].get('state_file', True):
+        config['fills']['state_file'] = f"fill_ledger_{safe_symbol}.json"
+    config.setdefault('warm_start', {})
+    if 'checkpoint_file' not in entry.get('warm_start', {}):
+        config['warm_start']['checkpoint_file'] = f"checkpoint_{safe_symbol}.json"
+    return config
+
+
+class FairScheduler:
+    """Token-bucket request budget shared fairly across symbols
+
+    Each symbol becomes due every update interval. When several are due the
+    one served longest ago goes first, and it only runs if the bucket holds
+    enough tokens for its expected cost, so a busy symbol cannot starve the
+    others and the session never exceeds requests_per_second on average.
+
+    With a limiter (the session's RequestScheduler) there is only one
+    bucket: symbols are admitted against the limiter's headroom, which
+    already paid for every request as it went out, so charge() and spend()
+    only update due times and cost estimates. Without one the scheduler
+    keeps its own bucket at requests_per_second.
+    """
+
+    def __init__(self, requests_per_second: float, burst: Optional[float] = None, limiter: Any = None):
+        """Initialize the scheduler"""
+        self.limiter = limiter
+        if limiter is not None:
+            requests_per_second, burst = limiter.rate, limiter.capacity
+        self.rate = requests_per_second
+        self.capacity = burst if burst is not None else max(requests_per_second, 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.next_due: Dict[str, float] = {}
+        self.last_served: Dict[str, float] = {}
+        self.expected_cost: Dict[str, float] = {}
+
+    def add(self, key: str, expected_cost: float = 3.0) -> None:
+        """Register a symbol, due immediately"""
+        now = time.monotonic()
+        self.next_due[key] = now
+        self.last_served[key] = 0.0
+        self.expected_cost[key] = expected_cost
+
+    def refill(self) -> None:
+        """Add tokens for the time elapsed since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def available(self) -> float:
+        """Tokens in the bucket now (the limiter's when there is one)"""
+        if self.limiter is not None:
+            return self.limiter.headroom * self.limiter.capacity
+        self.refill()
+        return self.tokens
+
+    def next_symbol(self) -> Optional[str]:
+        """The stalest due symbol that fits in the current budget, if any"""
+        now = time.monotonic()
+        due = [key for key, when in self.next_due.items() if when <= now]
+        if not due:
+            return None
+        key = min(due, key=lambda k: self.last_served[k])
+        if self.available() < min(self.expected_cost[key], self.capacity):
+            return None
+        return key
+
+    def charge(self, key: str, cost: float, interval: float) -> None:
+        """Record a served symbol, its actual request cost and its next due time"""
+        now = time.monotonic()
+        self.spend(cost)
+        self.last_served[key] = now
+        self.next_due[key] = now + interval
+        self.expected_cost[key] = 0.8 * self.expected_cost[key] + 0.2 * cost
+
+    def spend(self, cost: float) -> None:
+        """Charge requests that are not tied to a symbol (balance refresh)"""
+        if self.limiter is None:
+            self.tokens -= cost
+
+    def wait_time(self) -> float:
+        """Seconds until a symbol is due or enough tokens have accumulated"""
+        now = time.monotonic()
+        until_due = max(0.0, min(self.next_due.values()) - now) if self.next_due else 1.0
+        until_tokens = max(0.0, (1.0 - self.available()) / self.rate) if self.rate > 0 else 1.0
+        return min(max(until_due, until_tokens), 1.0)
+
+
+class PortfolioSymbolMaker(UniversalMarketMaker):
+    """Per-symbol strategy state bound to a shared portfolio session"""
+
+    def __init__(self, config: Dict[str, Any], portfolio: 'PortfolioRunner'):
+        """Initialize the per-symbol strategy"""
+        super().__init__(config=config)
+        self.portfolio = portfolio
+
+    def create_account_state(self) -> None:
+        """Use the portfolio's shared account cache instead of a private one"""
+        self.account = self.portfolio.account
+        self.fill_ledger.listeners.append(lambda trade: self.account.request_refresh())
+
+
+class PortfolioRunner:
+    """Runs one strategy state per symbol over a single exchange client
+
+    Markets are loaded once, the balance is fetched once per refresh
+    interval for the whole portfolio, and a FairScheduler spreads the
+    session's request budget (the RequestScheduler's bucket when rate
+    limiting is enabled) across symbols.
+    """
+
+    def __init__(self, config_path: str = 'config.json'):
+        """Initialize the runner from a config with a portfolio section"""
+        self.connector = UniversalMarketMaker(config_path)
+        self.config = self.connector.config
+        portfolio_config = self.config.get('portfolio', {})
+
+        entries = portfolio_config.get('symbols') or [{'symbol': self.config['trading']['symbol']}]
+        self.strategies: Dict[str, PortfolioSymbolMaker] = {}
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {'symbol': entry}
+            symbol_config = build_symbol_config(self.config, entry)
+            self.strategies[entry['symbol']] = PortfolioSymbolMaker(symbol_config, self)
+
+        self.scheduler = None
+        self.balance_refresh_interval = portfolio_config.get('balance_refresh_interval', 10)
+        self.account = None
+        self.exchange = None
+        self.running = False
+
+    def charge_account_refresh(self, snapshot: Any) -> None:
+        """Charge background account refreshes to the shared request budget"""
+        if snapshot.source == 'rest':
+            self.scheduler.spend(2 if self.account.include_positions else 1)
+
+    def setup(self) -> None:
+        """Connect once and prepare every symbol on the shared session"""
+        self.connector.market_symbols = list(self.strategies)
+        self.connector.initialize_exchange()
+        self.connector.start_metrics()
+        self.connector.start_scheduler()
+        self.exchange = self.connector.exchange
+
+        # Symbols share the session's rate limiter; the portfolio's own rate only applies without one
+        portfolio_config = self.config.get('portfolio', {})
+        self.scheduler = FairScheduler(
+            portfolio_config.get('requests_per_second', 10),
+            portfolio_config.get('burst'),
+            limiter=self.connector.scheduler
+        )
+
+        # One account cache (balance, positions, margin) serves every symbol
+        self.account = self.connector.build_account_state(list(self.strategies), self.balance_refresh_interval)
+        self.account.listeners.append(self.charge_account_refresh)
+        self.account.refresh()
+
+        for symbol in list(self.strategies):
+            strategy = self.strategies[symbol]
+            strategy.exchange = self.exchange
+            strategy.metrics = self.connector.metrics
+            strategy.scheduler = self.connector.scheduler
+            try:
+                strategy.setup_symbol()
+                self.scheduler.add(symbol)
+            except Exception as e:
+                logger.error(f"Skipping {symbol}: {e}")
+                del self.strategies[symbol]
+
+        if not self.strategies:
+            raise ValueError("No valid symbols in portfolio")
+
+        self.account.symbols = list(self.strategies)
+        self.account.start()
+
+    def run_symbol(self, symbol: str) -> None:
+        """Run one cycle for a symbol and charge its request cost"""
+        strategy = self.strategies[symbol]
+        calls_before = self.connector.metrics.count('api.')
+        interval = strategy.config['strategy']['update_frequency']
+
+        try:
+            backoff = strategy.run_iteration()
+            if backoff is not None:
+                interval = backoff
+        except Exception as e:
+            logger.error(f"[{symbol}] Error in cycle: {e}")
+            interval = 5
+
+        # Every exchange call the cycle made (book, fills, trades for calibration, orders, ...)
+        cost = self.connector.metrics.count('api.') - calls_before
+        self.scheduler.charge(symbol, cost, interval)
+
+    def run(self) -> None:
+        """Main portfolio loop"""
+        logger.info(f"Starting Portfolio Market Maker ({len(self.strategies)} symbols)")
+        self.setup()
+        self.running = True
+
+        while self.running:
+            try:
+                self.connector.apply_fresh_markets()
+                symbol = self.scheduler.next_symbol()
+                if symbol is None:
+                    time.sleep(self.scheduler.wait_time())
+                    continue
+
+                self.run_symbol(symbol)
+
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                break
+
+        self.account.stop()
+        for strategy in self.strategies.values():
+            strategy.cancel_all_orders()
+            strategy.save_checkpoint()
+            if strategy.recorder:
+                strategy.recorder.close()
+        logger.info(self.connector.metrics.summary_line())
+        self.connector.metrics.close()
+        logger.info("Portfolio stopped")
+
+    def stop(self) -> None:
+        """Stop the runner"""
+        self.running = False
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Portfolio Market Making Bot')
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config.json',
+        help='Path to configuration file (default: config.json)'
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        logger.info("Please copy config.example.json to config.json and update with your settings")
+        sys.exit(1)
+
+    runner = PortfolioRunner(args.config)
+
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Quote Ladder - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Multi-level quoting with per-level diffing and batch order endpoints
+"""
+
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import ccxt
+
+from order_manager import SIDES, QuoteManager
+
+logger = logging.getLogger(__name__)
+
+Level = Tuple[float, float]  # (price, size)
+
+
+def get_lot_size(market: Dict[str, Any]) -> float:
+    """Amount step from ccxt market precision (decimal places or lot size)"""
+    amount_precision = market['precision']['amount']
+    if isinstance(amount_precision, int):
+        return 10 ** -amount_precision
+    return float(amount_precision)
+
+
+def step_decimals(step: float) -> int:
+    """Decimal places of a tick or lot size (0.25 -> 2, 1e-05 -> 5, 10 -> 0)"""
+    return max(0, -Decimal(str(step)).normalize().as_tuple().exponent)
+
+
+def build_ladder(bid_price: float, ask_price: float, base_size: float, levels: int,
+                 step: float, tick_size: float, lot_size: float, min_size: float,
+                 size_decay: float = 1.0, inventory_ratio: float = 0.0,
+                 inventory_skew: float = 0.0) -> Tuple[List[Level], List[Level]]:
+    """Bid and ask ladders from the top-of-book quotes in one vectorized pass
+
+    Level i sits i steps behind the level-0 quote and gets base_size *
+    size_decay**i. inventory_ratio (position value / limit, -1..1) shifts
+    size from the side that would add to the position to the side that
+    reduces it, scaled by inventory_skew. Levels rounding below min_size
+    are dropped. Prices and sizes are rounded to the decimals of the tick
+    and lot so they go out as exact multiples (3 * 0.1 is 0.30000000000000004).
+    """
+    index = np.arange(levels)
+    step_ticks = max(1, int(round(step / tick_size)))
+    offsets = index * step_ticks
+
+    bid_ticks = np.round(bid_price / tick_size) - offsets
+    ask_ticks = np.round(ask_price / tick_size) + offsets
+
+    ratio = min(max(inventory_ratio, -1.0), 1.0)
+    weights = base_size * np.power(size_decay, index)
+    bid_sizes = np.round(weights * max(0.0, 1 - inventory_skew * ratio) / lot_size) * lot_size
+    ask_sizes = np.round(weights * max(0.0, 1 + inventory_skew * ratio) / lot_size) * lot_size
+
+    price_decimals = step_decimals(tick_size)
+    bid_prices = np.round(bid_ticks * tick_size, price_decimals)
+    ask_prices = np.round(ask_ticks * tick_size, price_decimals)
+    size_decimals = step_decimals(lot_size)
+    bid_sizes = np.round(bid_sizes, size_decimals)
+    ask_sizes = np.round(ask_sizes, size_decimals)
+
+    bids = [(price, size) for price, size in zip(bid_prices.tolist(), bid_sizes.tolist())
+            if size >= min_size and price > 0]
+    asks = [(price, size) for price, size in zip(ask_prices.tolist(), ask_sizes.tolist())
+            if size >= min_size]
+    return bids, asks
+
+
+class LadderManager(QuoteManager):
+    """QuoteManager for N levels per side
+
+    Orders are tracked in per-side slots ('bid0', 'bid1', ..., 'ask0', ...)
+    and matched to the target levels by price, so a level that is still
+    wanted keeps its queue position even when the ladder shifts. New orders go out through create_orders and cancels
+    through cancel_orders when the exchange has them, so a full ladder
+    costs one create and one cancel request instead of one per level.
+    When several levels move and batching is available, moved levels are
+    replaced in batch rather than amended one request at a time.
+
+    Fills reach the levels through the inherited on_fill() or reconcile(): a filled level
+    is recreated on the next update and a partly filled one is replaced,
+    so the ladder does not thin out while prices stand still.
+    """
+
+    def __init__(self, exchange: Any, symbol: str, tick_size: float, levels: int = 3,
+                 batch_size: int = 10, **kwargs: Any):
+        """Initialize the manager"""
+        super().__init__(exchange, symbol, tick_size, **kwargs)
+        self.levels = levels
+        self.batch_size = batch_size
+        self.orders = {f"{key}{i}": None for key in SIDES for i in range(levels)}
+        self.stats['batches'] = 0
+
+    @property
+    def requests_avoided(self) -> int:
+        """Requests saved compared with cancel-all plus one create per level every tick"""
+        return self.stats['ticks'] * (1 + 2 * self.levels) - self.stats['requests']
+
+    def _has(self, feature: str) -> bool:
+        has = getattr(self.exchange, 'has', {}) or {}
+        return bool(has.get(feature))
+
+    def _record(self, key: str, order: Optional[Dict[str, Any]], price: float, size: float) -> None:
+        """Store the live order state for one level"""
+        if order is None or order.get('id') is None:
+            self.orders[key] = None
+            return
+        self.orders[key] = {
+            'id': order.get('id'),
+            'price': price,
+            'amount': size,
+            'side': SIDES[key[:3]]
+        }
+
+    def plan_ladder(self, bids: List[Level], asks: List[Level]) -> Dict[str, list]:
+        """Per-level actions: lists of keys to keep, cancel, amend and create
+
+        Live orders are matched to the target levels by price and size, not
+        by index: when the quotes move by a whole step, the orders still in
+        the target set keep resting and only the level that left the set is
+        moved. Unmatched orders are paired with unmatched targets best price
+        first and amended (or replaced); leftover targets go into free slots
+        and leftover orders are cancelled.
+        """
+        desired = {}
+        actions = {'keep': [], 'cancel': [], 'amend': [], 'create': []}
+        for side, ladder in (('bid', bids), ('ask', asks)):
+            keys = [f"{side}{i}" for i in range(self.levels)]
+            live = [key for key in keys if self.orders.get(key) is not None]
+            free = [key for key in keys if self.orders.get(key) is None]
+
+            unmatched = []
+            for target in ladder[:self.levels]:
+                key = next((key for key in live if not self.needs_update(key, *target)), None)
+                if key is None:
+                    unmatched.append(target)
+                    continue
+                live.remove(key)
+                desired[key] = target
+                actions['keep'].append(key)
+
+            live.sort(key=lambda key: self.orders[key]['price'], reverse=(side == 'bid'))
+            for target in unmatched:
+                # At most `levels` targets, so a free slot is left whenever live orders run out
+                key = live.pop(0) if live else free.pop(0)
+                desired[key] = target
+                action = self.plan(key, *target)
+                if action == 'replace':
+                    actions['cancel'].append(key)
+                    actions['create'].append(key)
+                else:
+                    actions[action].append(key)
+            actions['cancel'].extend(live)
+
+        # Amending costs one request per level; a batch cancel + create costs two
+        batch = self._has('createOrders') and self._has('cancelOrders')
+        if batch and len(actions['amend']) > 2:
+            actions['cancel'].extend(actions['amend'])
+            actions['create'].extend(actions['amend'])
+            actions['amend'] = []
+
+        actions['desired'] = desired
+        return actions
+
+    def _chunks(self, items: list) -> List[list]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    def _order_request(self, key: str, level: Level) -> Dict[str, Any]:
+        price, size = level
+        return {'symbol': self.symbol, 'type': 'limit', 'side': SIDES[key[:3]], 'amount': size, 'price': price}
+
+    def _free_levels(self, keys: List[str], desired: Dict[str, Level]) -> List[Tuple[str, Level]]:
+        """Levels to create, skipping slots whose cancel failed and may still be live"""
+        return [(key, desired[key]) for key in keys if self.orders.get(key) is None]
+
+    def update_ladder(self, bids: List[Level], asks: List[Level]) -> None:
+        """Bring live orders in line with the desired ladders"""
+        self.stats['ticks'] += 1
+        actions = self.plan_ladder(bids, asks)
+        desired = actions['desired']
+        self.stats['kept'] += len(actions['keep'])
+
+        self.cancel_levels(actions['cancel'])
+        for key in actions['amend']:
+            self.update_side(key, *desired[key])
+        self.create_levels(self._free_levels(actions['create'], desired))
+
+    def update_quotes(self, bid_price: float, ask_price: float, size: float) -> None:
+        """Single-level update (ladder of one) for callers of the QuoteManager API"""
+        self.update_ladder([(bid_price, size)], [(ask_price, size)])
+
+    def update_sides(self, bid: Optional[Level], ask: Optional[Level]) -> None:
+        """Single-level update with sides given as None cancelled"""
+        self.update_ladder([bid] if bid else [], [ask] if ask else [])
+
+    def update_side(self, key: str, price: float, size: float) -> None:
+        """Amend (or replace) one level"""
+        if self.can_amend and self.orders.get(key) is not None:
+            try:
+                self.stats['requests'] += 1
+                order = self.exchange.edit_order(
+                    self.orders[key]['id'], self.symbol, 'limit', SIDES[key[:3]], size, price
+                )
+                self.stats['amends'] += 1
+                self._record(key, order, price, size)
+                return
+            except Exception as e:
+                logger.warning(f"Amend {key} failed, replacing: {e}")
+                self.stats['errors'] += 1
+        self.cancel_levels([key])
+        self.create_levels(self._free_levels([key], {key: (price, size)}))
+
+    def _tracked(self, keys: List[str]) -> Dict[str, str]:
+        """Order id -> key for the levels with a live order; empty levels are cleared"""
+        tracked = {}
+        for key in keys:
+            order = self.orders.get(key)
+            if order is None or order.get('id') is None:
+                self.orders[key] = None
+            else:
+                tracked[order['id']] = key
+        return tracked
+
+    @staticmethod
+    def _unconfirmed(chunk: List[str], response: Any) -> List[str]:
+        """Ids of a cancel_orders chunk the response does not confirm as cancelled
+
+        Venues that echo the orders may leave some out or mark them
+        rejected; those stay tracked. A response without ids (the venue does
+        not report per order) confirms the whole chunk.
+        """
+        entries = [order for order in response or [] if isinstance(order, dict)]
+        if not any(order.get('id') is not None for order in entries):
+            return []
+        confirmed = {str(order['id']) for order in entries
+                     if order.get('id') is not None and order.get('status') != 'rejected'}
+        return [order_id for order_id in chunk if str(order_id) not in confirmed]
+
+    def cancel_levels(self, keys: List[str]) -> None:
+        """Cancel the live orders of several levels, batched when supported
+
+        A level is cleared only once the exchange confirms its cancel (or
+        reports the order unknown); a failed cancel leaves it tracked and
+        retried on the next update, since the order may still be live.
+        Ids a batch does not confirm are retried one by one.
+        """
+        tracked = self._tracked(keys)
+        ids = list(tracked)
+        if not ids:
+            return
+
+        if self._has('cancelOrders') and len(ids) > 1:
+            retry = []
+            for chunk in self._chunks(ids):
+                try:
+                    self.stats['requests'] += 1
+                    self.stats['batches'] += 1
+                    response = self.exchange.cancel_orders(chunk, self.symbol)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.warning(f"Error batch-cancelling {len(chunk)} orders, still tracking them: {e}")
+                    continue
+                unconfirmed = self._unconfirmed(chunk, response)
+                for order_id in chunk:
+                    if order_id not in unconfirmed:
+                        self.stats['cancels'] += 1
+                        self.orders[tracked[order_id]] = None
+                retry.extend(unconfirmed)
+            ids = retry
+
+        for order_id in ids:
+            try:
+                self.stats['requests'] += 1
+                self.exchange.cancel_order(order_id, self.symbol)
+                self.stats['cancels'] += 1
+            except ccxt.OrderNotFound:
+                pass
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Error cancelling order {order_id}, still tracking it: {e}")
+                continue
+            self.orders[tracked[order_id]] = None
+
+    def create_levels(self, levels: List[Tuple[str, Level]]) -> None:
+        """Place orders for several levels, batched when supported"""
+        if not levels:
+            return
+
+        if self._has('createOrders') and len(levels) > 1:
+            for chunk in self._chunks(levels):
+                try:
+                    self.stats['requests'] += 1
+                    self.stats['batches'] += 1
+                    orders = self.exchange.create_orders([self._order_request(key, level) for key, level in chunk])
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Error batch-placing {len(chunk)} orders: {e}")
+                    continue
+                self._record_batch(chunk, orders)
+            logger.info(f"Ladder placed: {len(levels)} levels")
+            return
+
+        for key, (price, size) in levels:
+            try:
+                self.stats['requests'] += 1
+                order = self.exchange.create_limit_order(self.symbol, SIDES[key[:3]], size, price)
+                self.stats['creates'] += 1
+                self._record(key, order, price, size)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.orders[key] = None
+                logger.error(f"Error placing {key}: {e}")
+
+    def _record_batch(self, chunk: List[Tuple[str, Level]], orders: List[Dict[str, Any]]) -> None:
+        """Record a create_orders response (one entry per request, in order)"""
+        for (key, (price, size)), order in zip(chunk, orders or []):
+            if order and order.get('id') is not None and order.get('status') != 'rejected':
+                self.stats['creates'] += 1
+                self._record(key, order, price, size)
+            else:
+                self.stats['errors'] += 1
+                self.orders[key] = None
+
+    def forget(self) -> None:
+        """Drop tracked orders after an external cancel-all"""
+        for key in self.orders:
+            self.orders[key] = None
+
+    def summary(self) -> str:
+        """One-line counter summary"""
+        live = sum(1 for order in self.orders.values() if order)
+        return (f"Ladder: {live}/{2 * self.levels} live | {self.stats['creates']} new, "
+                f"{self.stats['amends']} amended, {self.stats['cancels']} cancelled, "
+                f"{self.stats['filled']} filled, {self.stats['kept']} kept in {self.stats['batches']} batches | "
+                f"{self.requests_avoided} requests avoided")
+
+
+class AsyncLadderManager(LadderManager):
+    """LadderManager for ccxt.async_support exchanges"""
+
+    async def update_ladder(self, bids: List[Level], asks: List[Level]) -> None:
+        """Bring live orders in line with the desired ladders"""
+        self.stats['ticks'] += 1
+        actions = self.plan_ladder(bids, asks)
+        desired = actions['desired']
+        self.stats['kept'] += len(actions['keep'])
+
+        # Cancels and amends are independent; creates follow so freed margin is available
+        await asyncio.gather(
+            self.cancel_levels(actions['cancel']),
+            *[self.update_side(key, *desired[key]) for key in actions['amend']]
+        )
+        await self.create_levels(self._free_levels(actions['create'], desired))
+
+    async def update_quotes(self, bid_price: float, ask_price: float, size: float) -> None:
+        """Single-level update (ladder of one) for callers of the QuoteManager API"""
+        await self.update_ladder([(bid_price, size)], [(ask_price, size)])
+
+    async def update_sides(self, bid: Optional[Level], ask: Optional[Level]) -> None:
+        """Single-level update with sides given as None cancelled"""
+        await self.update_ladder([bid] if bid else [], [ask] if ask else [])
+
+    async def update_side(self, key: str, price: float, size: float) -> None:
+        """Amend (or replace) one level"""
+        if self.can_amend and self.orders.get(key) is not None:
+            try:
+                self.stats['requests'] += 1
+                order = await self.exchange.edit_order(
+                    self.orders[key]['id'], self.symbol, 'limit', SIDES[key[:3]], size, price
+                )
+                self.stats['amends'] += 1
+                self._record(key, order, price, size)
+                return
+            except Exception as e:
+                logger.warning(f"Amend {key} failed, replacing: {e}")
+                self.stats['errors'] += 1
+        await self.cancel_levels([key])
+        await self.create_levels(self._free_levels([key], {key: (price, size)}))
+
+    async def cancel_levels(self, keys: List[str]) -> None:
+        """Cancel the live orders of several levels, batched when supported
+
+        Levels are cleared only on a confirmed cancel, as in LadderManager.
+        """
+        tracked = self._tracked(keys)
+        ids = list(tracked)
+        if not ids:
+            return
+
+        async def cancel_batch(chunk):
+            try:
+                self.stats['requests'] += 1
+                self.stats['batches'] += 1
+                response = await self.exchange.cancel_orders(chunk, self.symbol)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Error batch-cancelling {len(chunk)} orders, still tracking them: {e}")
+                return []
+            unconfirmed = self._unconfirmed(chunk, response)
+            for order_id in chunk:
+                if order_id not in unconfirmed:
+                    self.stats['cancels'] += 1
+                    self.orders[tracked[order_id]] = None
+            return unconfirmed
+
+        async def cancel_one(order_id):
+            try:
+                self.stats['requests'] += 1
+                await self.exchange.cancel_order(order_id, self.symbol)
+                self.stats['cancels'] += 1
+            except ccxt.OrderNotFound:
+                pass
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Error cancelling order {order_id}, still tracking it: {e}")
+                return
+            self.orders[tracked[order_id]] = None
+
+        if self._has('cancelOrders') and len(ids) > 1:
+            retries = await asyncio.gather(*[cancel_batch(chunk) for chunk in self._chunks(ids)])
+            ids = [order_id for unconfirmed in retries for order_id in unconfirmed]
+        await asyncio.gather(*[cancel_one(order_id) for order_id in ids])
+
+    async def create_levels(self, levels: List[Tuple[str, Level]]) -> None:
+        """Place orders for several levels, batched when supported"""
+        if not levels:
+            return
+
+        async def create_batch(chunk):
+            try:
+                self.stats['requests'] += 1
+                self.stats['batches'] += 1
+                orders = await self.exchange.create_orders([self._order_request(key, level) for key, level in chunk])
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error batch-placing {len(chunk)} orders: {e}")
+                return
+            self._record_batch(chunk, orders)
+
+        async def create_one(key, price, size):
+            try:
+                self.stats['requests'] += 1
+                order = await self.exchange.create_limit_order(self.symbol, SIDES[key[:3]], size, price)
+                self.stats['creates'] += 1
+                self._record(key, order, price, size)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.orders[key] = None
+                logger.error(f"Error placing {key}: {e}")
+
+        if self._has('createOrders') and len(levels) > 1:
+            await asyncio.gather(*[create_batch(chunk) for chunk in self._chunks(levels)])
+        else:
+            await asyncio.gather(*[create_one(key, price, size) for key, (price, size) in levels])
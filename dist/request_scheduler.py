@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Request Scheduler - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Weighted, prioritized rate limiting between the bots and the exchange client
+"""
+
+import asyncio
+import copy
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+CANCEL, QUOTE, MARKET_DATA, ACCOUNT = 0, 1, 2, 3
+PRIORITY_NAMES = {CANCEL: 'cancel', QUOTE: 'quote', MARKET_DATA: 'market_data', ACCOUNT: 'account'}
+
+ENDPOINT_PRIORITY = {
+    'cancel_order': CANCEL,
+    'cancel_orders': CANCEL,
+    'cancel_all_orders': CANCEL,
+    'create_order': QUOTE,
+    'create_limit_order': QUOTE,
+    'create_orders': QUOTE,
+    'edit_order': QUOTE,
+    'fetch_order_book': MARKET_DATA,
+    'fetch_ticker': MARKET_DATA,
+    'fetch_trades': MARKET_DATA,
+    'fetch_my_trades': ACCOUNT,
+    'fetch_balance': ACCOUNT,
+    'fetch_positions': ACCOUNT,
+    'fetch_open_orders': ACCOUNT,
+    'set_leverage': ACCOUNT,
+    'load_markets': ACCOUNT
+}
+
+# Read-only endpoints whose identical pending calls share one request
+COALESCE_ENDPOINTS = {
+    'fetch_order_book', 'fetch_ticker', 'fetch_trades', 'fetch_my_trades',
+    'fetch_balance', 'fetch_positions', 'fetch_open_orders'
+}
+
+# Share of the bucket each class must leave untouched, so cancels and
+# quotes still go out immediately when housekeeping has used the rest
+DEFAULT_RESERVE = {CANCEL: 0.0, QUOTE: 0.0, MARKET_DATA: 0.1, ACCOUNT: 0.3}
+
+
+class RequestScheduler:
+    """Token bucket with per-endpoint weights and priority classes
+
+    Each request costs its endpoint weight in tokens. Waiting requests are
+    served strictly by priority (cancels, quotes, market data, account),
+    and a class may only spend tokens above its reserve. Identical pending
+    reads are coalesced into one request, and every caller that shared it
+    gets its own copy of the response. When the exchange answers with
+    a rate-limit error the bucket is drained and paused for cooldown
+    seconds. headroom, congested and cooldown_remaining() expose the
+    backpressure to the strategy.
+    """
+
+    def __init__(self, requests_per_second: float, burst: Optional[float] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 reserve: Optional[Dict[int, float]] = None,
+                 cooldown: float = 5.0, metrics: Any = None):
+        """Initialize a full bucket"""
+        self.rate = requests_per_second
+        self.capacity = burst if burst is not None else max(1.0, requests_per_second / 4)
+        self.weights = weights or {}
+        reserve_fractions = dict(DEFAULT_RESERVE)
+        reserve_fractions.update(reserve or {})
+        self.reserve = {priority: fraction * self.capacity for priority, fraction in reserve_fractions.items()}
+        self.cooldown = cooldown
+        self.metrics = metrics
+
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        # Coalesced reads: call key -> [future, callers that joined it]
+        self.inflight: Dict[tuple, list] = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'waited': 0, 'throttled': 0}
+
+    # ------------------------------------------------------------------
+    # Bucket
+    # ------------------------------------------------------------------
+
+    def weight(self, endpoint: str) -> float:
+        """Token cost of one call to an endpoint"""
+        return self.weights.get(endpoint, 1.0)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _shortfall(self, entry: list) -> float:
+        """Tokens still missing before entry may go (<= 0 when it can)"""
+        priority, _, weight = entry
+        floor = min(self.reserve.get(priority, 0.0), max(0.0, self.capacity - weight))
+        return weight + floor - self.tokens
+
+    def _try_admit(self, entry: list) -> float:
+        """Take tokens for entry if it is next in line; otherwise seconds to wait"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        head = self.waiters[0]
+        shortfall = self._shortfall(head)
+        if head is entry and shortfall <= 0:
+            heapq.heappop(self.waiters)
+            self.tokens -= entry[2]
+            return 0.0
+        # Behind a more urgent request, check again once the head could have gone
+        return max(shortfall / self.rate if self.rate > 0 else 1.0, 0.001)
+
+    def acquire(self, endpoint: str) -> float:
+        """Block until the endpoint may be called; returns seconds waited"""
+        entry = [ENDPOINT_PRIORITY.get(endpoint, ACCOUNT), next(self.sequence), self.weight(endpoint)]
+        start = time.monotonic()
+        with self.condition:
+            heapq.heappush(self.waiters, entry)
+            while True:
+                delay = self._try_admit(entry)
+                if delay == 0:
+                    self.condition.notify_all()
+                    break
+                self.condition.wait(delay)
+        return self._admitted(entry[0], time.monotonic() - start)
+
+    async def acquire_async(self, endpoint: str) -> float:
+        """acquire() for coroutines on one event loop"""
+        entry = [ENDPOINT_PRIORITY.get(endpoint, ACCOUNT), next(self.sequence), self.weight(endpoint)]
+        start = time.monotonic()
+        heapq.heappush(self.waiters, entry)
+        try:
+            while True:
+                delay = self._try_admit(entry)
+                if delay == 0:
+                    break
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            raise
+        return self._admitted(entry[0], time.monotonic() - start)
+
+    def _admitted(self, priority: int, waited: float) -> float:
+        self.stats['requests'] += 1
+        if waited > 0.001:
+            self.stats['waited'] += 1
+        if self.metrics is not None:
+            self.metrics.record(f"queue.{PRIORITY_NAMES[priority]}", waited)
+        return waited
+
+    def throttled(self) -> None:
+        """The exchange rejected a request for rate limiting - drain and pause"""
+        self.stats['throttled'] += 1
+        self.tokens = 0.0
+        self.paused_until = time.monotonic() + self.cooldown
+        logger.warning(f"Rate limited by exchange, pausing requests for {self.cooldown:.1f}s")
+
+    # ------------------------------------------------------------------
+    # Backpressure
+    # ------------------------------------------------------------------
+
+    @property
+    def headroom(self) -> float:
+        """Available share of the bucket (0..1)"""
+        tokens = min(self.capacity, self.tokens + (time.monotonic() - self.last_refill) * self.rate)
+        return max(0.0, tokens) / self.capacity
+
+    @property
+    def congested(self) -> bool:
+        """True when housekeeping requests would have to wait"""
+        return (self.cooldown_remaining() > 0 or len(self.waiters) > 0
+                or self.headroom * self.capacity < self.reserve[ACCOUNT] + 1)
+
+    def cooldown_remaining(self) -> float:
+        """Seconds left in a rate-limit pause"""
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def summary(self) -> str:
+        """One-line scheduler statistics"""
+        return (f"Requests: {self.stats['requests']} | {self.stats['coalesced']} coalesced | "
+                f"{self.stats['waited']} queued | {self.stats['throttled']} throttled | "
+                f"headroom {self.headroom * 100:.0f}%")
+
+
+class ScheduledExchange:
+    """Transparent ccxt proxy routing every call through a RequestScheduler
+
+    Works for both sync (thread-safe) and ccxt.async_support exchanges;
+    attributes such as markets and has pass straight through.
+    """
+
+    def __init__(self, exchange: Any, scheduler: RequestScheduler):
+        """Wrap an exchange instance"""
+        object.__setattr__(self, '_exchange', exchange)
+        object.__setattr__(self, '_scheduler', scheduler)
+        object.__setattr__(self, '_wrapped', {})
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._exchange, name)
+        if name not in ENDPOINT_PRIORITY or not callable(attribute):
+            return attribute
+
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+
+        scheduler = self._scheduler
+        lock = self._lock
+        coalesce = name in COALESCE_ENDPOINTS
+
+        if asyncio.iscoroutinefunction(attribute):
+            async def call(*args, **kwargs):
+                await scheduler.acquire_async(name)
+                try:
+                    return await attribute(*args, **kwargs)
+                except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+                    scheduler.throttled()
+                    raise
+
+            @functools.wraps(attribute)
+            async def wrapped(*args, **kwargs):
+                if not coalesce:
+                    return await call(*args, **kwargs)
+                key = (name, repr(args), repr(sorted(kwargs.items())))
+                shared = scheduler.inflight.get(key)
+                if shared is not None:
+                    scheduler.stats['coalesced'] += 1
+                    shared[1] += 1
+                    return copy.deepcopy(await asyncio.shield(shared[0]))
+                shared = scheduler.inflight[key] = [asyncio.ensure_future(call(*args, **kwargs)), 0]
+                try:
+                    result = await asyncio.shield(shared[0])
+                finally:
+                    scheduler.inflight.pop(key, None)
+                # The joined callers copy the shared response after we return it
+                return copy.deepcopy(result) if shared[1] else result
+        else:
+            def call(*args, **kwargs):
+                scheduler.acquire(name)
+                try:
+                    return attribute(*args, **kwargs)
+                except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+                    scheduler.throttled()
+                    raise
+
+            @functools.wraps(attribute)
+            def wrapped(*args, **kwargs):
+                if not coalesce:
+                    return call(*args, **kwargs)
+                key = (name, repr(args), repr(sorted(kwargs.items())))
+                with lock:
+                    shared = scheduler.inflight.get(key)
+                    owner = shared is None
+                    if owner:
+                        shared = scheduler.inflight[key] = [Future(), 0]
+                    else:
+                        shared[1] += 1
+                if not owner:
+                    scheduler.stats['coalesced'] += 1
+                    return copy.deepcopy(shared[0].result())
+                try:
+                    result = call(*args, **kwargs)
+                except Exception as e:
+                    shared[0].set_exception(e)
+                    raise
+                finally:
+                    with lock:
+                        scheduler.inflight.pop(key, None)
+                        joined = shared[1]
+                shared[0].set_result(result)
+                # The joined callers copy the shared response, which must stay untouched
+                return copy.deepcopy(result) if joined else result
+
+        self._wrapped[name] = wrapped
+        return wrapped
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._exchange, name, value)
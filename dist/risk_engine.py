@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Pre-Trade Risk Engine - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+In-memory limit checks on every quote, with no exchange round-trips
+"""
+
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Level = Tuple[float, float]  # (price, size)
+
+# Graded responses, least to most severe
+NORMAL = 'normal'
+SHRINK = 'shrink'
+REDUCE_ONLY = 'reduce_only'
+FLATTEN = 'flatten'
+HALTED = 'halted'
+
+
+class RiskEngine:
+    """Enforces the config risk limits from in-memory state
+
+    Position, average entry and realized PnL come from the fill ledger
+    (updated once per fill); mark() updates the mark price and the
+    intraday PnL once per tick and picks a level:
+
+    - normal: quotes pass subject to the size limits below
+    - shrink: daily loss past shrink_at of the limit, sizes scaled down
+    - reduce_only: at max_inventory_usd or daily loss past reduce_only_at,
+      only the side that reduces the position is quoted
+    - flatten: stop loss on the open position or daily loss limit hit,
+      the caller cancels and closes the position; quoting then halts for
+      cooldown seconds (stop loss) or until the next UTC day (daily loss)
+
+    check_quotes() clips every order to max_position_size_usd notional and
+    clips each side so that the position plus all resting orders on that
+    side stays within max_inventory_usd. Both are plain arithmetic on a
+    handful of levels and take microseconds.
+
+    clock, when given, replaces both the wall clock (UTC day) and the
+    monotonic clock (halts) - the backtest passes the replayed time.
+    """
+
+    def __init__(self, ledger: Any, lot_size: float, min_size: float,
+                 max_inventory_usd: float, max_order_usd: Optional[float] = None,
+                 stop_loss_percent: Optional[float] = None,
+                 daily_loss_limit_usd: Optional[float] = None,
+                 shrink_at: float = 0.5, reduce_only_at: float = 0.8,
+                 shrink_factor: float = 0.5, cooldown: float = 60.0,
+                 clock: Optional[Callable[[], float]] = None):
+        """Initialize the engine over a fill ledger"""
+        self.ledger = ledger
+        self.lot_size = lot_size
+        self.min_size = min_size
+        self.max_inventory_usd = max_inventory_usd
+        self.max_order_usd = max_order_usd
+        self.stop_loss_percent = stop_loss_percent
+        self.daily_loss_limit_usd = daily_loss_limit_usd
+        self.shrink_at = shrink_at
+        self.reduce_only_at = reduce_only_at
+        self.shrink_factor = shrink_factor
+        self.cooldown = cooldown
+        self.wall_clock = clock or time.time
+        self.monotonic = clock or time.monotonic
+
+        self.mark_price = None
+        self.level = NORMAL
+        self.reason = ''
+        self.halted_until = 0.0
+        self.day = None
+        self.day_start_pnl = ledger.pnl
+        self.exposure = {'buy': 0.0, 'sell': 0.0}
+        self.stats = {'checks': 0, 'shrunk': 0, 'blocked': 0, 'flattens': 0}
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def daily_pnl(self) -> float:
+        """Realized PnL since the UTC day started plus unrealized PnL at the mark"""
+        unrealized = self.ledger.unrealized_pnl(self.mark_price) if self.mark_price else 0.0
+        return self.ledger.pnl - self.day_start_pnl + unrealized
+
+    def _roll_day(self) -> None:
+        day = int(self.wall_clock() // 86400)
+        if day != self.day:
+            if self.day is not None:
+                logger.info(f"New trading day, daily PnL was ${self.daily_pnl():.2f}")
+            self.day = day
+            self.day_start_pnl = self.ledger.pnl
+
+    def halt(self, seconds: float) -> None:
+        """Stop quoting for seconds"""
+        self.halted_until = self.monotonic() + seconds
+
+    def halt_remaining(self) -> float:
+        """Seconds left in a halt"""
+        return max(0.0, self.halted_until - self.monotonic())
+
+    # ------------------------------------------------------------------
+    # Per tick
+    # ------------------------------------------------------------------
+
+    def evaluate(self) -> Tuple[str, str]:
+        """Risk level and reason for the current position and marks"""
+        if self.halt_remaining() > 0:
+            return HALTED, self.reason
+
+        position = self.ledger.position
+        mark = self.mark_price
+        entry = self.ledger.avg_entry
+        if self.stop_loss_percent and position and entry > 0:
+            move = (mark - entry) / entry * (1 if position > 0 else -1)
+            if move <= -self.stop_loss_percent:
+                return FLATTEN, f"stop loss {move * 100:.2f}% <= -{self.stop_loss_percent * 100:.2f}%"
+
+        loss = -self.daily_pnl()
+        limit = self.daily_loss_limit_usd
+        if limit and loss >= limit:
+            return FLATTEN, f"daily loss ${loss:.2f} >= ${limit:.2f}"
+
+        if abs(position * mark) >= self.max_inventory_usd:
+            return REDUCE_ONLY, f"inventory ${abs(position * mark):.2f} >= ${self.max_inventory_usd:.2f}"
+        if limit and loss >= limit * self.reduce_only_at:
+            return REDUCE_ONLY, f"daily loss ${loss:.2f} near ${limit:.2f} limit"
+        if limit and loss >= limit * self.shrink_at:
+            return SHRINK, f"daily loss ${loss:.2f} past {self.shrink_at * 100:.0f}% of limit"
+        return NORMAL, ''
+
+    def mark(self, price: float) -> str:
+        """Update the mark price and return the risk level for this tick"""
+        self.mark_price = price
+        self._roll_day()
+        level, reason = self.evaluate()
+
+        if level == FLATTEN:
+            self.stats['flattens'] += 1
+            self.exposure = {'buy': 0.0, 'sell': 0.0}
+            if reason.startswith('daily'):
+                # Stay out until the next UTC day
+                self.halt((self.day + 1) * 86400 - self.wall_clock())
+            else:
+                self.halt(self.cooldown)
+            logger.warning(f"Risk: flattening ({reason})")
+        elif level != self.level and level != HALTED:
+            if level == NORMAL:
+                logger.info(f"Risk: back to normal (was {self.level})")
+            else:
+                logger.warning(f"Risk: {level} ({reason})")
+
+        self.level = level
+        self.reason = reason
+        return level
+
+    # ------------------------------------------------------------------
+    # Pre-trade checks
+    # ------------------------------------------------------------------
+
+    def _floor_lot(self, size: float) -> float:
+        if self.lot_size <= 0:
+            return size
+        return round(math.floor(size / self.lot_size + 1e-9) * self.lot_size, 12)
+
+    def _clip_side(self, levels: List[Level], room: float, max_size: float, scale: float) -> List[Level]:
+        """Clip levels in order until the side's room (in base units) is used up"""
+        approved = []
+        for price, size in levels:
+            wanted = size * scale
+            allowed = self._floor_lot(min(wanted, max_size, room))
+            if allowed < self.min_size or allowed <= 0:
+                self.stats['blocked'] += 1
+                break
+            if allowed < size - 1e-12:
+                self.stats['shrunk'] += 1
+            approved.append((price, allowed))
+            room -= allowed
+        return approved
+
+    def check_quotes(self, bids: List[Level], asks: List[Level]) -> Tuple[List[Level], List[Level]]:
+        """Approved (price, size) levels per side; rejected levels are dropped"""
+        self.stats['checks'] += 1
+        mark = self.mark_price
+        if mark is None or self.level in (FLATTEN, HALTED):
+            self.exposure = {'buy': 0.0, 'sell': 0.0}
+            return [], []
+
+        position = self.ledger.position
+        scale = self.shrink_factor if self.level == SHRINK else 1.0
+        max_size = self.max_order_usd / mark if self.max_order_usd else math.inf
+        # Worst case every resting order on a side fills: position + side total <= limit
+        limit = self.max_inventory_usd / mark
+        buy_room = limit - position
+        sell_room = limit + position
+
+        if self.level == REDUCE_ONLY:
+            # Only the side that brings the position back towards zero, at most to flat
+            buy_room = -position if position < 0 else 0.0
+            sell_room = position if position > 0 else 0.0
+
+        bids = self._clip_side(bids, buy_room, max_size, scale)
+        asks = self._clip_side(asks, sell_room, max_size, scale)
+        self.exposure = {
+            'buy': sum(price * size for price, size in bids),
+            'sell': sum(price * size for price, size in asks)
+        }
+        return bids, asks
+
+    # ------------------------------------------------------------------
+    # Reporting and persistence
+    # ------------------------------------------------------------------
+
+    def summary(self) -> str:
+        """One-line risk state"""
+        line = (f"Risk: {self.level} | day PnL ${self.daily_pnl():.2f} | "
+                f"exposure ${self.exposure['buy']:.0f} bid / ${self.exposure['sell']:.0f} ask")
+        if self.reason:
+            line += f" | {self.reason}"
+        return line
+
+    def to_dict(self) -> Dict[str, Any]:
+        """State needed to keep the daily loss across restarts"""
+        return {'day': self.day, 'day_start_pnl': self.day_start_pnl}
+
+    def from_dict(self, state: Dict[str, Any]) -> None:
+        """Restore the day's starting PnL when the checkpoint is from today"""
+        if state.get('day') == int(self.wall_clock() // 86400):
+            self.day = state['day']
+            self.day_start_pnl = state.get('day_start_pnl', self.day_start_pnl)
@@ -53,6 +53,25 @@ cd ~/market-maker-bot
 echo ""
 echo "4. Copying bot files..."
 cp market_maker_bot.py ~/market-maker-bot/
+cp volatility.py ~/market-maker-bot/
+cp async_market_maker.py ~/market-maker-bot/
+cp order_book.py ~/market-maker-bot/
+cp order_manager.py ~/market-maker-bot/
+cp quote_ladder.py ~/market-maker-bot/
+cp request_scheduler.py ~/market-maker-bot/
+cp risk_engine.py ~/market-maker-bot/
+cp fill_ledger.py ~/market-maker-bot/
+cp account_state.py ~/market-maker-bot/
+cp portfolio.py ~/market-maker-bot/
+cp sharded_runner.py ~/market-maker-bot/
+cp calibration.py ~/market-maker-bot/
+cp backtest.py ~/market-maker-bot/
+cp tick_recorder.py ~/market-maker-bot/
+cp sim_exchange.py ~/market-maker-bot/
+cp benchmark.py ~/market-maker-bot/
+cp benchmark_baseline.json ~/market-maker-bot/
+cp metrics.py ~/market-maker-bot/
+cp warm_start.py ~/market-maker-bot/
 cp config_wizard.py ~/market-maker-bot/
 cp requirements.txt ~/market-maker-bot/
 cp config.example.json ~/market-maker-bot/
@@ -0,0 +1,887 @@
+#!/usr/bin/env python3
+"""
+Sharded Market Making Runner - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Quotes many symbols across worker processes behind one order gateway
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.connection import AuthenticationError, Client, Listener, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import ccxt
+
+from account_state import AccountState
+from fill_ledger import FillLedger
+from market_maker_bot import UniversalMarketMaker
+from metrics import Metrics
+from portfolio import build_symbol_config
+
+logger = logging.getLogger(__name__)
+
+# Record kinds published by the gateway
+BOOK, LEDGER, BALANCE, POSITION, ACCOUNT = 1, 2, 3, 4, 5
+
+# Endpoints a worker may send through the gateway
+GATEWAY_ENDPOINTS = {
+    'create_order', 'create_limit_order', 'create_orders', 'edit_order',
+    'cancel_order', 'cancel_orders', 'cancel_all_orders', 'fetch_open_orders',
+    'fetch_trades', 'set_leverage'
+}
+
+
+
+class MarketDataRing:
+    """Single-writer, many-reader ring of fixed 64-byte records in shared memory
+
+    Layout: a 64-byte header holding the last written sequence number,
+    then capacity slots. Each slot starts with a seqlock word (2*seq + 1
+    while being written, 2*seq when complete) followed by the record
+    kind, index (symbol or currency), timestamp, an integer field and four
+    doubles. Readers keep their own cursor, copy a slot and re-check the
+    seqlock word; a reader lapped by the writer skips ahead to the oldest
+    record still in the ring, since only the latest state matters.
+    """
+
+    HEADER = struct.Struct('<QQ')  # last sequence, capacity
+    LOCK = struct.Struct('<Q')
+    BODY = struct.Struct('<IIqq4d')  # kind, index, timestamp ms, aux, values
+    HEADER_SIZE = 64
+    SLOT_SIZE = 64
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """Wrap a shared memory block; use create() or attach()"""
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        self.capacity = self.HEADER.unpack_from(self.buf, 0)[1]
+
+    @classmethod
+    def create(cls, capacity: int) -> 'MarketDataRing':
+        """Allocate a new ring (supervisor)"""
+        shm = shared_memory.SharedMemory(create=True, size=cls.HEADER_SIZE + capacity * cls.SLOT_SIZE)
+        cls.HEADER.pack_into(shm.buf, 0, 0, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'MarketDataRing':
+        """Open an existing ring by name (gateway and workers)"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name passed to child processes"""
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the last complete record"""
+        return self.HEADER.unpack_from(self.buf, 0)[0]
+
+    def publish(self, kind: int, index: int, values: Tuple[float, float, float, float],
+                aux: int = 0, timestamp: Optional[int] = None) -> int:
+        """Append a record; only one process may write"""
+        seq = self.head + 1
+        offset = self.HEADER_SIZE + (seq % self.capacity) * self.SLOT_SIZE
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        self.LOCK.pack_into(self.buf, offset, 2 * seq + 1)
+        self.BODY.pack_into(self.buf, offset + 8, kind, index, timestamp, aux, *values)
+        self.LOCK.pack_into(self.buf, offset, 2 * seq)
+        self.HEADER.pack_into(self.buf, 0, seq, self.capacity)
+        return seq
+
+    def read(self, cursor: int) -> Tuple[List[tuple], int]:
+        """Records written after cursor and the new cursor"""
+        head = self.head
+        if head - cursor > self.capacity:
+            cursor = head - self.capacity
+        records = []
+        buf = self.buf
+        for seq in range(cursor + 1, head + 1):
+            offset = self.HEADER_SIZE + (seq % self.capacity) * self.SLOT_SIZE
+            lock = self.LOCK.unpack_from(buf, offset)[0]
+            record = self.BODY.unpack_from(buf, offset + 8)
+            # Overwritten mid-read by a writer that lapped us: drop it
+            if lock == 2 * seq and self.LOCK.unpack_from(buf, offset)[0] == lock:
+                records.append(record)
+        return records, head
+
+    def close(self) -> None:
+        """Detach; the owner also frees the block"""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedMarketState:
+    """A worker's view of the gateway's ring: latest book, ledger and account"""
+
+    def __init__(self, ring: MarketDataRing, symbols: List[str], currencies: List[str]):
+        """Initialize an empty view over the ring"""
+        self.ring = ring
+        self.symbols = symbols
+        self.currencies = currencies
+        self.cursor = 0
+        self.books: Dict[str, Tuple[int, float, float, float, float]] = {}
+        self.book_seq: Dict[str, int] = {}
+        self.ledgers: Dict[str, FillLedger] = {}
+        self.account: Optional[AccountState] = None
+        self.balance: Dict[str, Dict[str, float]] = {}
+        self.positions: Dict[str, Dict[str, Any]] = {}
+
+    def poll(self) -> int:
+        """Apply new records; returns how many were read"""
+        records, self.cursor = self.ring.read(self.cursor)
+        for kind, index, timestamp, aux, v0, v1, v2, v3 in records:
+            if kind == BOOK:
+                symbol = self.symbols[index]
+                self.books[symbol] = (timestamp, v0, v1, v2, v3)
+                self.book_seq[symbol] = self.book_seq.get(symbol, 0) + 1
+            elif kind == LEDGER:
+                ledger = self.ledgers.get(self.symbols[index])
+                if ledger is not None:
+                    ledger.position, ledger.avg_entry = v0, v1
+                    ledger.realized_pnl, ledger.fees = v2, v3
+                    ledger.trades_count = aux
+            elif kind == BALANCE:
+                self.balance[self.currencies[index]] = {'free': v0, 'used': v1, 'total': v2}
+            elif kind == POSITION:
+                symbol = self.symbols[index]
+                self.positions[symbol] = {
+                    'symbol': symbol, 'contracts': abs(v0), 'side': 'short' if v0 < 0 else 'long',
+                    'entryPrice': v1, 'unrealizedPnl': v2
+                }
+            elif kind == ACCOUNT and self.account is not None:
+                # End of an account batch: swap in one consistent snapshot
+                self.account.apply(dict(self.balance), dict(self.positions), 'gateway')
+        return len(records)
+
+    def order_book(self, symbol: str) -> Dict[str, Any]:
+        """Top of book in ccxt order book shape"""
+        book = self.books.get(symbol)
+        if book is None:
+            return {'bids': [], 'asks': [], 'timestamp': None}
+        timestamp, bid, ask, bid_size, ask_size = book
+        return {'bids': [[bid, bid_size]], 'asks': [[ask, ask_size]], 'timestamp': timestamp}
+
+
+class GatewayClient:
+    """ccxt-shaped exchange used inside a worker
+
+    Market data and account reads come from shared memory; order calls
+    are sent to the gateway over an authenticated local socket and block
+    until its reply arrives. Replies are dispatched by request id, so
+    several strategy threads can wait at once. A lost connection fails the
+    pending calls and is re-opened on the next call (gateway restart).
+    """
+
+    def __init__(self, markets: Dict[str, Any], has: Dict[str, Any], state: SharedMarketState,
+                 address: str, authkey: bytes, timeout: float = 30.0):
+        """Initialize the client for one worker"""
+        self.id = 'gateway'
+        self.markets = markets
+        self.has = has
+        self.state = state
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.pending: Dict[int, Future] = {}
+        self.lock = threading.Lock()
+        self.conn = None
+        self.running = True
+
+    def _connect(self) -> Any:
+        try:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise ccxt.NetworkError(f"gateway unreachable: {e}")
+        threading.Thread(target=self._dispatch, args=(conn,), name='gateway-replies', daemon=True).start()
+        return conn
+
+    def _dispatch(self, conn: Any) -> None:
+        while self.running:
+            try:
+                if not conn.poll(0.5):
+                    continue
+                request_id, ok, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                future = self.pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                error_name, message = payload
+                future.set_exception(getattr(ccxt, error_name, ccxt.ExchangeError)(message))
+
+        with self.lock:
+            if self.conn is conn:
+                self.conn = None
+            pending, self.pending = self.pending, {}
+        conn.close()
+        for future in pending.values():
+            future.set_exception(ccxt.NetworkError("gateway connection lost"))
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """Run an exchange method in the gateway and return its result"""
+        request_id = next(self.ids)
+        future = Future()
+        with self.lock:
+            if self.conn is None:
+                self.conn = self._connect()
+            self.pending[request_id] = future
+            try:
+                self.conn.send((request_id, method, args, kwargs))
+            except (OSError, EOFError) as e:
+                self.pending.pop(request_id, None)
+                raise ccxt.NetworkError(f"gateway connection lost: {e}")
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise ccxt.RequestTimeout(f"gateway did not answer {method} within {self.timeout:.0f}s")
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in GATEWAY_ENDPOINTS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        """Latest top of book published by the gateway"""
+        return self.state.order_book(symbol)
+
+    def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                        limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """Fills are applied by the gateway's ledgers"""
+        return []
+
+    def close(self) -> None:
+        """Stop the reply dispatcher and close the connection"""
+        self.running = False
+        with self.lock:
+            conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+
+class ShardSymbolMaker(UniversalMarketMaker):
+    """Per-symbol strategy in a worker, fed from the gateway's shared state"""
+
+    def __init__(self, config: Dict[str, Any], state: SharedMarketState):
+        """Initialize the per-symbol strategy"""
+        super().__init__(config=config)
+        self.state = state
+        self.reconciled_trades = 0
+
+    def create_fill_ledger(self) -> None:
+        """Mirror of the gateway's ledger; the gateway polls fills and persists them"""
+        self.fill_ledger = FillLedger(self.symbol)
+        # Never restore inventory from the checkpoint - the gateway owns it
+        self.fill_ledger.restored = True
+        self.state.ledgers[self.symbol] = self.fill_ledger
+        self.sync_inventory()
+
+    def create_account_state(self) -> None:
+        """Use the worker's account view published by the gateway"""
+        self.account = self.state.account
+
+    def update_inventory(self) -> None:
+        """Mirror the gateway's ledger and clear quotes that filled
+
+        The ring carries the ledger's totals, not the fill order ids
+        on_fill() needs, so when the fill count moves the open orders are
+        fetched through the gateway and reconciled against the tracked ones.
+        """
+        self.sync_inventory()
+        trades = self.fill_ledger.trades_count
+        if trades == self.reconciled_trades or self.order_manager is None:
+            return
+        try:
+            open_orders = self.exchange.fetch_open_orders(self.symbol)
+        except Exception as e:
+            logger.error(f"[{self.symbol}] Error reconciling orders: {e}")
+            return
+        self.reconciled_trades = trades
+        self.order_manager.reconcile(open_orders)
+
+
+class ShardWorker:
+    """Runs a shard of symbols in one process
+
+    The main thread drains the ring and submits a cycle for each symbol
+    whose book changed and whose update interval has passed; cycles run
+    on a small thread pool so one symbol waiting on the gateway does not
+    hold up the rest of the shard.
+    """
+
+    def __init__(self, index: int, config: Dict[str, Any], entries: List[Dict[str, Any]],
+                 symbols: List[str], currencies: List[str], markets: Dict[str, Any],
+                 has: Dict[str, Any], ring_name: str, address: str, authkey: bytes,
+                 heartbeats: Any, cycles: Any, stop_event: Any):
+        """Initialize the worker (runs in the child process)"""
+        self.index = index
+        self.config = config
+        self.sharding = config.get('sharding', {})
+        self.heartbeats = heartbeats
+        self.cycles = cycles
+        self.stop_event = stop_event
+
+        self.ring = MarketDataRing.attach(ring_name)
+        self.state = SharedMarketState(self.ring, symbols, currencies)
+        self.client = GatewayClient(markets, has, self.state, address, authkey,
+                                    self.sharding.get('request_timeout', 30))
+        account_config = config.get('account', {})
+        self.state.account = AccountState(
+            self.client, [entry['symbol'] for entry in entries],
+            refresh_interval=account_config.get('refresh_interval', 10),
+            max_age=account_config.get('max_age')
+        )
+        # One set of latency histograms for the whole shard
+        self.metrics = Metrics(config.get('metrics', {}).get('summary_interval', 60))
+
+        self.strategies: Dict[str, ShardSymbolMaker] = {}
+        for entry in entries:
+            strategy = ShardSymbolMaker(build_symbol_config(config, entry), self.state)
+            strategy.exchange = self.client
+            strategy.metrics = self.metrics
+            self.strategies[entry['symbol']] = strategy
+
+    def setup(self) -> None:
+        """Prepare every symbol and clear orders left by a crashed predecessor"""
+        for symbol in list(self.strategies):
+            strategy = self.strategies[symbol]
+            self.heartbeats[self.index] = time.time()
+            try:
+                strategy.setup_symbol()
+                strategy.cancel_all_orders()
+            except Exception as e:
+                logger.error(f"[worker {self.index}] Skipping {symbol}: {e}")
+                del self.strategies[symbol]
+
+    def run_symbol(self, symbol: str) -> Optional[float]:
+        """One cycle for a symbol; returns the delay until it is due again"""
+        strategy = self.strategies[symbol]
+        try:
+            backoff = strategy.run_iteration()
+        except Exception as e:
+            logger.error(f"[{symbol}] Error in cycle: {e}")
+            backoff = 5
+        return backoff if backoff is not None else strategy.config['strategy']['update_frequency']
+
+    def run(self) -> None:
+        """Worker loop until the supervisor sets the stop event"""
+        self.setup()
+        logger.info(f"Worker {self.index} quoting {list(self.strategies)}")
+        pool = ThreadPoolExecutor(max_workers=max(1, min(len(self.strategies), self.sharding.get('threads_per_worker', 4))),
+                                  thread_name_prefix=f'worker-{self.index}')
+        next_due = {symbol: 0.0 for symbol in self.strategies}
+        seen = {symbol: 0 for symbol in self.strategies}
+        busy: Dict[str, Future] = {}
+
+        while not self.stop_event.is_set():
+            self.state.poll()
+            now = time.monotonic()
+            for symbol, future in list(busy.items()):
+                if future.done():
+                    del busy[symbol]
+                    next_due[symbol] = now + future.result()
+                    self.cycles[self.index] += 1
+            for symbol in self.strategies:
+                book_seq = self.state.book_seq.get(symbol, 0)
+                if symbol in busy or now < next_due[symbol] or book_seq == seen[symbol]:
+                    continue
+                seen[symbol] = book_seq
+                busy[symbol] = pool.submit(self.run_symbol, symbol)
+            self.heartbeats[self.index] = time.time()
+            time.sleep(0.002)
+
+        pool.shutdown(wait=True)
+        for strategy in self.strategies.values():
+            strategy.cancel_all_orders()
+            strategy.save_checkpoint()
+            if strategy.recorder:
+                strategy.recorder.close()
+        logger.info(f"Worker {self.index}: {self.metrics.summary_line()}")
+        self.metrics.close()
+        self.client.close()
+        self.ring.close()
+
+
+class Gateway:
+    """Owns the exchange session for all workers (runs in its own process)
+
+    Polls every symbol's order book once per interval and fills and the
+    account on their own schedules, publishes the results to the ring, and
+    executes workers' order requests through the request scheduler, so the
+    venue sees one client and one rate limit however many workers quote.
+    """
+
+    def __init__(self, config: Dict[str, Any], entries: List[Dict[str, Any]], symbols: List[str],
+                 currencies: List[str], ring_name: str, address: str, authkey: bytes,
+                 ready: Any, heartbeats: Any, stop_event: Any, sim_config: Optional[Dict[str, Any]] = None):
+        """Initialize the gateway (runs in the child process)"""
+        self.config = config
+        self.entries = entries
+        self.symbols = symbols
+        self.currencies = currencies
+        self.sharding = config.get('sharding', {})
+        self.address = address
+        self.authkey = authkey
+        self.ready = ready
+        self.heartbeats = heartbeats
+        self.stop_event = stop_event
+        self.sim_config = sim_config
+
+        self.ring = MarketDataRing.attach(ring_name)
+        self.publish_lock = threading.Lock()
+        self.connector = UniversalMarketMaker(config=config)
+        self.exchange = None
+        self.account = None
+        self.ledgers: Dict[str, FillLedger] = {}
+        self.listener = None
+        self.connections: Dict[Any, threading.Lock] = {}
+        self.ready_info = None
+        self.pool = None
+        self.running = False
+
+    def publish(self, kind: int, index: int, values: Tuple[float, float, float, float], aux: int = 0) -> None:
+        """Append a record to the ring (the ring allows a single writer at a time)"""
+        with self.publish_lock:
+            self.ring.publish(kind, index, values, aux)
+
+    def publish_ledger(self, symbol: str) -> None:
+        """Publish a symbol's position, entry, PnL and fee totals"""
+        ledger = self.ledgers[symbol]
+        self.publish(LEDGER, self.symbols.index(symbol),
+                     (ledger.position, ledger.avg_entry, ledger.realized_pnl, ledger.fees), ledger.trades_count)
+
+    def publish_account(self, snapshot: Any) -> None:
+        """Publish balances and positions, then the end-of-batch marker"""
+        for index, currency in enumerate(self.currencies):
+            if currency in snapshot.balance:
+                self.publish(BALANCE, index, (snapshot.free(currency), snapshot.used(currency),
+                                              snapshot.total(currency), 0.0))
+        for index, symbol in enumerate(self.symbols):
+            position = snapshot.positions.get(symbol) or {}
+            self.publish(POSITION, index, (snapshot.position(symbol), float(position.get('entryPrice') or 0),
+                                           float(position.get('unrealizedPnl') or 0), 0.0))
+        self.publish(ACCOUNT, 0, (0.0, 0.0, 0.0, 0.0))
+
+    def setup(self) -> None:
+        """Connect, restore ledgers and publish the initial state"""
+        connector = self.connector
+        connector.market_symbols = list(self.symbols)
+        if self.sim_config is not None:
+            from sim_exchange import SimExchange
+            connector.exchange = SimExchange(self.symbols, self.sim_config)
+        else:
+            connector.initialize_exchange()
+        connector.start_metrics()
+        connector.start_scheduler()
+        self.exchange = connector.exchange
+
+        for entry in self.entries:
+            fills_config = build_symbol_config(self.config, entry)['fills']
+            symbol = entry['symbol']
+            ledger = FillLedger(symbol, state_path=fills_config['state_file'],
+                                page_limit=fills_config.get('page_limit', 100),
+                                from_id_param=fills_config.get('from_id_param'))
+            self.ledgers[symbol] = ledger
+            self.publish_ledger(symbol)
+
+        self.account = connector.build_account_state(self.symbols)
+        self.account.listeners.append(self.publish_account)
+        for ledger in self.ledgers.values():
+            ledger.listeners.append(lambda trade: self.account.request_refresh())
+        self.account.refresh()
+        self.account.start()
+
+        markets = {symbol: self.exchange.markets[symbol] for symbol in self.symbols if symbol in self.exchange.markets}
+        has = {key: value for key, value in self.exchange.has.items() if isinstance(value, bool)}
+        self.ready_info = (markets, has)
+
+    def poll_books(self) -> None:
+        """Fetch every book once per interval, concurrently, through the scheduler"""
+        interval = self.sharding.get('book_interval') or self.config['strategy']['update_frequency']
+        scheduler = self.connector.scheduler
+        if scheduler:
+            # Leave the rest of the request budget to orders and account calls
+            share = self.sharding.get('book_share', 0.5)
+            floor = len(self.symbols) * scheduler.weight('fetch_order_book') / (scheduler.rate * share)
+            if floor > interval:
+                logger.warning(f"Polling books every {floor:.2f}s, {interval:.2f}s would exceed "
+                               f"{share * 100:.0f}% of the request budget")
+                interval = floor
+
+        def fetch(index_symbol):
+            index, symbol = index_symbol
+            try:
+                book = self.exchange.fetch_order_book(symbol)
+            except Exception as e:
+                logger.warning(f"[{symbol}] Order book fetch failed: {e}")
+                return
+            if book['bids'] and book['asks']:
+                bid, ask = book['bids'][0], book['asks'][0]
+                self.publish(BOOK, index, (bid[0], ask[0], bid[1], ask[1]))
+
+        with ThreadPoolExecutor(max_workers=min(len(self.symbols), 16), thread_name_prefix='books') as pool:
+            while self.running:
+                start = time.monotonic()
+                list(pool.map(fetch, enumerate(self.symbols)))
+                time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    def poll_fills(self) -> None:
+        """Apply new fills per symbol and publish every ledger
+
+        Unchanged ledgers are republished too, so a restarted worker finds
+        its inventory in the ring even after the books have lapped it.
+        """
+        interval = max(self.config.get('fills', {}).get('poll_interval', 0),
+                       self.sharding.get('fill_poll_interval', 1.0))
+        while self.running:
+            start = time.monotonic()
+            for symbol, ledger in self.ledgers.items():
+                try:
+                    ledger.poll(self.exchange)
+                except Exception as e:
+                    logger.warning(f"[{symbol}] Fill poll failed: {e}")
+                self.publish_ledger(symbol)
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    def accept(self) -> None:
+        """Take connections from (re)started workers and the supervisor"""
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            self.connections[conn] = threading.Lock()
+
+    def execute(self, conn: Any, request_id: Optional[int], method: str, args: tuple, kwargs: dict) -> None:
+        """Run one request and send the reply (none for the supervisor's requests)"""
+        try:
+            reply = (request_id, True, getattr(self.exchange, method)(*args, **kwargs))
+        except Exception as e:
+            reply = (request_id, False, (type(e).__name__, str(e)))
+        if request_id is None:
+            if not reply[1]:
+                logger.warning(f"Supervisor {method}{args} failed: {reply[2][1]}")
+            return
+        try:
+            with self.connections[conn]:
+                conn.send(reply)
+        except (KeyError, OSError):
+            pass  # Worker went away; its replacement cancels its orders on start
+
+    def run(self) -> None:
+        """Serve workers until the stop event is set"""
+        self.setup()
+        self.running = True
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Left behind by a crashed gateway
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        threads = [
+            threading.Thread(target=self.poll_books, name='book-poller', daemon=True),
+            threading.Thread(target=self.poll_fills, name='fill-poller', daemon=True),
+            threading.Thread(target=self.accept, name='gateway-accept', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        self.pool = ThreadPoolExecutor(max_workers=self.sharding.get('gateway_threads', 16),
+                                       thread_name_prefix='gateway')
+        self.ready.put(self.ready_info)
+        logger.info(f"Gateway serving {len(self.symbols)} symbols")
+
+        while not self.stop_event.is_set():
+            self.heartbeats[0] = time.time()
+            self.connector.apply_fresh_markets()
+            connections = list(self.connections)
+            if not connections:
+                time.sleep(0.05)
+                continue
+            for conn in wait(connections, timeout=0.5):
+                try:
+                    request_id, method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    self.connections.pop(conn, None)
+                    conn.close()
+                    continue
+                if method not in GATEWAY_ENDPOINTS:
+                    logger.warning(f"Gateway refusing {method}")
+                    continue
+                self.pool.submit(self.execute, conn, request_id, method, args, kwargs)
+
+        self.running = False
+        self.pool.shutdown(wait=True)
+        self.listener.close()
+        for thread in threads[:2]:
+            thread.join(timeout=5)
+        self.account.stop()
+        for ledger in self.ledgers.values():
+            ledger.save()
+        logger.info(f"Gateway: {self.connector.metrics.summary_line()}")
+        if self.connector.scheduler:
+            logger.info(self.connector.scheduler.summary())
+        self.connector.metrics.close()
+        self.ring.close()
+
+
+def gateway_main(*args) -> None:
+    """Gateway process entry point"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    Gateway(*args).run()
+
+
+def worker_main(*args) -> None:
+    """Worker process entry point"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ShardWorker(*args).run()
+
+
+class ShardedRunner:
+    """Supervisor: starts the gateway and one worker per shard, restarts crashes
+
+    Symbols from the portfolio section are dealt round-robin over the
+    workers (default: one per core left after the gateway). Each child
+    writes a heartbeat into shared memory; a child that exits or stops
+    beating for heartbeat_timeout is killed, its symbols' orders are
+    cancelled through the gateway, and it is restarted after a back-off
+    that doubles on repeated crashes.
+    """
+
+    def __init__(self, config_path: str = 'config.json', sim_config: Optional[Dict[str, Any]] = None):
+        """Initialize the supervisor from a config with portfolio and sharding sections"""
+        self.config = UniversalMarketMaker(config_path).config
+        if sim_config is not None:
+            # Simulated runs must not touch the live bot's ledgers, checkpoints or recordings
+            from sim_exchange import sim_bot_config
+            self.config = sim_bot_config(self.config)
+        self.sharding = self.config.get('sharding', {})
+        self.sim_config = sim_config
+
+        entries = self.config.get('portfolio', {}).get('symbols') or [{'symbol': self.config['trading']['symbol']}]
+        self.entries = [{'symbol': entry} if isinstance(entry, str) else entry for entry in entries]
+        self.symbols = [entry['symbol'] for entry in self.entries]
+        # Quote and settle currencies, by index in the ring
+        self.currencies = sorted({symbol.split('/')[1].split(':')[-1] for symbol in self.symbols} |
+                                 {symbol.split('/')[1].split(':')[0] for symbol in self.symbols})
+
+        workers = self.sharding.get('workers') or max(1, (os.cpu_count() or 2) - 1)
+        workers = min(workers, len(self.entries))
+        self.shards = [self.entries[index::workers] for index in range(workers)]
+
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = None
+        # Gateway socket, private to this run
+        self.socket_dir = tempfile.mkdtemp(prefix='roboquant-')
+        self.address = os.path.join(self.socket_dir, 'gateway.sock')
+        self.authkey = os.urandom(16)
+        self.ready = self.context.Queue()
+        # Heartbeat and cycle slots: 0 is the gateway, 1..n the workers
+        self.heartbeats = self.context.Array('d', len(self.shards) + 1, lock=False)
+        self.cycles = self.context.Array('q', len(self.shards) + 1, lock=False)
+        self.gateway_stop = self.context.Event()
+        self.workers_stop = self.context.Event()
+        self.processes: Dict[int, Any] = {}
+        self.started: Dict[int, float] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.restart_delay: Dict[int, float] = {}
+        self.restarts = 0
+        self.markets = None
+        self.has = None
+        self.running = False
+
+    def start_gateway(self) -> None:
+        """Start the gateway process and wait until it is serving"""
+        process = self.context.Process(
+            target=gateway_main, name='gateway', daemon=True,
+            args=(self.config, self.entries, self.symbols, self.currencies, self.ring.name,
+                  self.address, self.authkey, self.ready, self.heartbeats, self.gateway_stop, self.sim_config)
+        )
+        self.heartbeats[0] = time.time()
+        process.start()
+        self.processes[0] = process
+        self.started[0] = time.monotonic()
+        deadline = time.monotonic() + self.sharding.get('startup_timeout', 120)
+        while process.is_alive() and time.monotonic() < deadline:
+            try:
+                self.markets, self.has = self.ready.get(timeout=1)
+                return
+            except queue.Empty:
+                self.heartbeats[0] = time.time()
+        raise RuntimeError(f"Gateway failed to start (exit code {process.exitcode})")
+
+    def start_worker(self, slot: int) -> None:
+        """Start the worker for shard slot - 1"""
+        entries = self.shards[slot - 1]
+        markets = {entry['symbol']: self.markets[entry['symbol']] for entry in entries if entry['symbol'] in self.markets}
+        process = self.context.Process(
+            target=worker_main, name=f'worker-{slot}', daemon=True,
+            args=(slot, self.config, entries, self.symbols, self.currencies, markets, self.has,
+                  self.ring.name, self.address, self.authkey, self.heartbeats, self.cycles,
+                  self.workers_stop)
+        )
+        self.heartbeats[slot] = time.time()
+        process.start()
+        self.processes[slot] = process
+        self.started[slot] = time.monotonic()
+
+    def cancel_shard(self, slot: int) -> None:
+        """Pull the quotes of a dead worker through the gateway"""
+        try:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            for entry in self.shards[slot - 1]:
+                # No request id: the gateway runs it without replying
+                conn.send((None, 'cancel_all_orders', (entry['symbol'],), {}))
+            conn.close()
+        except (OSError, EOFError, AuthenticationError) as e:
+            logger.error(f"Could not cancel orders of worker {slot}: {e}")
+
+    def check(self) -> None:
+        """Detect dead or hung children and restart them after a back-off"""
+        now = time.monotonic()
+        timeout = self.sharding.get('heartbeat_timeout', 30)
+        for slot, process in list(self.processes.items()):
+            name = 'gateway' if slot == 0 else f"worker {slot}"
+            if process is None:
+                if now >= self.restart_at[slot]:
+                    logger.info(f"Restarting {name}")
+                    if slot == 0:
+                        self.start_gateway()
+                    else:
+                        self.start_worker(slot)
+                continue
+
+            hung = time.time() - self.heartbeats[slot] > timeout
+            if process.is_alive() and not hung:
+                continue
+            if hung and process.is_alive():
+                logger.error(f"{name} missed heartbeats for {timeout}s, killing it")
+                process.kill()
+            process.join(timeout=5)
+            logger.error(f"{name} exited (code {process.exitcode})")
+            if slot > 0:
+                self.cancel_shard(slot)
+
+            # Back off harder when a child keeps dying soon after starting
+            base = self.sharding.get('restart_delay', 1.0)
+            delay = self.restart_delay.get(slot, base)
+            if now - self.started[slot] > 60:
+                delay = base
+            self.restart_delay[slot] = min(delay * 2, self.sharding.get('max_restart_delay', 60))
+            self.restart_at[slot] = now + delay
+            self.processes[slot] = None
+            self.restarts += 1
+
+    def status_line(self, elapsed: float) -> str:
+        """Cycles per second per worker since start"""
+        rates = [self.cycles[slot] / elapsed for slot in range(1, len(self.shards) + 1)]
+        return (f"Shards: {len(self.shards)} workers, {sum(rates):.1f} cycles/s "
+                f"({' / '.join(f'{rate:.1f}' for rate in rates)}) | restarts {self.restarts}")
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """Supervise until interrupted (or for duration seconds)"""
+        logger.info(f"Starting Sharded Market Maker ({len(self.symbols)} symbols, {len(self.shards)} workers)")
+        self.ring = MarketDataRing.create(self.sharding.get('ring_size', 4096))
+        self.running = True
+        start = time.monotonic()
+        status_interval = self.sharding.get('status_interval', 60)
+        last_status = start
+        try:
+            self.start_gateway()
+            for slot in range(1, len(self.shards) + 1):
+                self.start_worker(slot)
+            while self.running:
+                time.sleep(1)
+                self.check()
+                now = time.monotonic()
+                if status_interval and now - last_status >= status_interval:
+                    logger.info(self.status_line(now - start))
+                    last_status = now
+                if duration is not None and now - start >= duration:
+                    break
+        except KeyboardInterrupt:
+            logger.info("Shutting down...")
+        finally:
+            self.shutdown()
+        logger.info(self.status_line(time.monotonic() - start))
+
+    def shutdown(self) -> None:
+        """Stop workers first (they cancel through the gateway), then the gateway"""
+        self.workers_stop.set()
+        for slot, process in self.processes.items():
+            if slot > 0 and process is not None:
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.kill()
+        self.gateway_stop.set()
+        gateway = self.processes.get(0)
+        if gateway is not None:
+            gateway.join(timeout=30)
+            if gateway.is_alive():
+                gateway.kill()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+        logger.info("Sharded runner stopped")
+
+    def stop(self) -> None:
+        """Stop the runner"""
+        self.running = False
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Sharded Multi-Core Market Making Bot')
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config.json',
+        help='Path to configuration file (default: config.json)'
+    )
+    parser.add_argument('--duration', type=float, help='Seconds to run (default: until interrupted)')
+    parser.add_argument('--sim', type=str, help='Run against sim_exchange with these JSON settings, e.g. \'{}\'')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        logger.info("Please copy config.example.json to config.json and update with your settings")
+        sys.exit(1)
+
+    runner = ShardedRunner(args.config, json.loads(args.sim) if args.sim is not None else None)
+
+    try:
+        runner.run(args.duration)
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
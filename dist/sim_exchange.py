@@ -0,0 +1,811 @@
+#!/usr/bin/env python3
+"""
+Simulated Exchange - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+In-process ccxt stand-in with a price-time-priority matching engine
+"""
+
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIM_CONFIG = {
+    'initial_price': 3000.0,
+    'tick_size': 0.01,
+    'lot_size': 0.001,
+    'min_amount': 0.001,
+    'latency_ms': 0.0,          # Base one-way latency per request
+    'jitter_ms': 0.0,           # Uniform extra latency
+    'rate_limit': 0.0,          # Requests per second (0 = unlimited)
+    'burst': 20,                # Token bucket capacity
+    'error_rate': 0.0,          # Probability a request fails with a network error
+    'flow_rate': 50.0,          # Synthetic order-flow events per second
+    'market_order_ratio': 0.2,  # Share of synthetic events that are market orders
+    'cancel_ratio': 0.3,        # Share of synthetic events that cancel a resting order
+    'mean_order_size': 0.05,
+    'volatility': 0.00005,      # Fair-price log move per synthetic event
+    'max_resting': 2000,        # Cap on synthetic resting orders
+    'book_levels': 20,          # Initial depth seeded per side
+    'maker_fee': 0.0002,
+    'taker_fee': 0.0005,
+    'initial_balance': 10000.0,
+    'seed': None
+}
+
+
+class _Order:
+    """Resting or incoming order inside the matching engine"""
+
+    __slots__ = ('id', 'owner', 'symbol', 'side', 'price_ticks', 'amount', 'remaining',
+                 'timestamp', 'status', 'filled_cost')
+
+    def __init__(self, order_id: str, owner: str, symbol: str, side: str,
+                 price_ticks: Optional[int], amount: float, timestamp: int):
+        self.id = order_id
+        self.owner = owner
+        self.symbol = symbol
+        self.side = side
+        self.price_ticks = price_ticks
+        self.amount = amount
+        self.remaining = amount
+        self.timestamp = timestamp
+        self.status = 'open'
+        self.filled_cost = 0.0
+
+
+class MatchingEngine:
+    """Price-time priority limit order book for one symbol
+
+    Prices are held as integer ticks. Each side keeps a sorted array of
+    price keys with the best level at the end (bids keyed by +ticks, asks
+    by -ticks) and a FIFO deque of orders per level.
+    """
+
+    def __init__(self, symbol: str, tick_size: float):
+        """Initialize an empty book"""
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.keys = {'buy': [], 'sell': []}
+        self.levels: Dict[str, Dict[int, deque]] = {'buy': {}, 'sell': {}}
+        self.orders: Dict[str, _Order] = {}
+
+    @staticmethod
+    def _key(side: str, price_ticks: int) -> int:
+        return price_ticks if side == 'buy' else -price_ticks
+
+    def best_ticks(self, side: str) -> Optional[int]:
+        """Best price (ticks) on a side"""
+        keys = self.keys[side]
+        if not keys:
+            return None
+        return keys[-1] if side == 'buy' else -keys[-1]
+
+    def _rest(self, order: _Order) -> None:
+        key = self._key(order.side, order.price_ticks)
+        levels = self.levels[order.side]
+        if key not in levels:
+            keys = self.keys[order.side]
+            keys.insert(bisect_left(keys, key), key)
+            levels[key] = deque()
+        levels[key].append(order)
+        self.orders[order.id] = order
+
+    def _remove_level(self, side: str, key: int) -> None:
+        del self.levels[side][key]
+        keys = self.keys[side]
+        del keys[bisect_left(keys, key)]
+
+    def submit(self, order: _Order) -> List[Tuple[_Order, _Order, int, float]]:
+        """Match an incoming order, resting any limit remainder
+
+        Returns fills as (maker, taker, price_ticks, amount).
+        """
+        fills = []
+        opposite = 'sell' if order.side == 'buy' else 'buy'
+        keys = self.keys[opposite]
+        levels = self.levels[opposite]
+
+        while order.remaining > 1e-12 and keys:
+            key = keys[-1]
+            level_ticks = key if opposite == 'buy' else -key
+            if order.price_ticks is not None:
+                if order.side == 'buy' and level_ticks > order.price_ticks:
+                    break
+                if order.side == 'sell' and level_ticks < order.price_ticks:
+                    break
+
+            queue = levels[key]
+            while queue and order.remaining > 1e-12:
+                maker = queue[0]
+                amount = min(maker.remaining, order.remaining)
+                maker.remaining -= amount
+                order.remaining -= amount
+                fills.append((maker, order, level_ticks, amount))
+                if maker.remaining <= 1e-12:
+                    maker.status = 'closed'
+                    queue.popleft()
+                    del self.orders[maker.id]
+            if not queue:
+                self._remove_level(opposite, key)
+
+        if order.remaining > 1e-12 and order.price_ticks is not None:
+            self._rest(order)
+        elif order.remaining <= 1e-12:
+            order.status = 'closed'
+        else:
+            order.status = 'canceled'  # Unfilled market remainder
+        return fills
+
+    def cancel(self, order_id: str) -> Optional[_Order]:
+        """Remove a resting order"""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        key = self._key(order.side, order.price_ticks)
+        queue = self.levels[order.side][key]
+        queue.remove(order)
+        if not queue:
+            self._remove_level(order.side, key)
+        order.status = 'canceled'
+        return order
+
+    def depth(self, side: str, limit: Optional[int] = None) -> List[List[float]]:
+        """Aggregated [[price, size], ...] best first"""
+        keys = self.keys[side]
+        selected = keys[-limit:] if limit else keys
+        result = []
+        for key in reversed(selected):
+            ticks = key if side == 'buy' else -key
+            size = sum(o.remaining for o in self.levels[side][key])
+            result.append([ticks * self.tick_size, size])
+        return result
+
+
+class SimExchange:
+    """ccxt-compatible in-process exchange for offline load tests
+
+    Implements the calls the bots make (load_markets, fetch_order_book,
+    create_limit_order, edit_order, cancel_order, cancel_all_orders,
+    fetch_open_orders, fetch_my_trades, fetch_trades, fetch_balance,
+    set_leverage) on top of a real matching engine. Synthetic order flow
+    is generated lazily for the wall-clock time elapsed between calls. Latency, jitter,
+    token-bucket rate limits and random network errors are injected per
+    request and raise the same ccxt exception types as a live venue.
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, sim_config: Optional[Dict[str, Any]] = None):
+        """Initialize the simulated venue"""
+        self.sim = dict(DEFAULT_SIM_CONFIG)
+        self.sim.update(sim_config or {})
+        self.random = random.Random(self.sim['seed'])
+        self.id = 'sim'
+        # ccxt-style published limit in ms per request (unlimited sims advertise 1000/s)
+        self.rateLimit = 1000.0 / self.sim['rate_limit'] if self.sim['rate_limit'] > 0 else 1.0
+        self.enableRateLimit = False
+        self.has = {
+            'editOrder': True,
+            'cancelAllOrders': True,
+            'createOrders': True,
+            'cancelOrders': True,
+            'fetchOpenOrders': True,
+            'fetchMyTrades': True,
+            'fetchTrades': True,
+            'fetchPositions': True,
+            'setLeverage': True
+        }
+
+        symbols = symbols or ['ETH/USDT:USDT']
+        self.symbols = list(symbols)
+        tick = self.sim['tick_size']
+        self.markets = {}
+        self.engines: Dict[str, MatchingEngine] = {}
+        self.fair_price: Dict[str, float] = {}
+        for symbol in symbols:
+            base, rest = symbol.split('/')
+            quote = rest.split(':')[0]
+            self.markets[symbol] = {
+                'id': symbol.replace('/', '').replace(':', ''),
+                'symbol': symbol,
+                'base': base,
+                'quote': quote,
+                'type': 'swap',
+                'contract': True,
+                'precision': {'price': tick, 'amount': self.sim['lot_size']},
+                'limits': {'amount': {'min': self.sim['min_amount'], 'max': None}},
+                'contractSize': 1
+            }
+            self.engines[symbol] = MatchingEngine(symbol, tick)
+            self.fair_price[symbol] = self.sim['initial_price']
+
+        self.order_ids = itertools.count(1)
+        self.trade_ids = itertools.count(1)
+        self.user_orders: Dict[str, _Order] = {}
+        self.my_trades: List[Dict[str, Any]] = []
+        # Public tape of every match, for calibration from the trade stream
+        self.public_trades: Dict[str, deque] = {symbol: deque(maxlen=1000) for symbol in symbols}
+        self.synthetic_ids: Dict[str, List[str]] = {symbol: [] for symbol in symbols}
+        self.leverage: Dict[str, int] = {}
+
+        self.cash = self.sim['initial_balance']
+        self.positions: Dict[str, float] = {symbol: 0.0 for symbol in symbols}
+
+        self.tokens = float(self.sim['burst'])
+        self.last_refill = time.monotonic()
+        self.last_advance = time.monotonic()
+        self.request_counts: Dict[str, int] = {}
+        self.total_events = 0
+        # Sync callers may use several threads (e.g. account_state refresh)
+        self.lock = threading.RLock()
+
+        for symbol in symbols:
+            self._seed_book(symbol)
+
+    # ------------------------------------------------------------------
+    # Request plumbing: rate limit, errors, latency, synthetic flow
+    # ------------------------------------------------------------------
+
+    def _latency(self) -> float:
+        """Seconds to delay the current request"""
+        return (self.sim['latency_ms'] + self.random.random() * self.sim['jitter_ms']) / 1000
+
+    def _admit(self, endpoint: str) -> None:
+        """Count the request and apply rate limiting and error injection"""
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+        rate = self.sim['rate_limit']
+        if rate > 0:
+            now = time.monotonic()
+            self.tokens = min(float(self.sim['burst']), self.tokens + (now - self.last_refill) * rate)
+            self.last_refill = now
+            if self.tokens < 1:
+                raise ccxt.RateLimitExceeded(f"sim {endpoint}: rate limit exceeded")
+            self.tokens -= 1
+
+        if self.sim['error_rate'] > 0 and self.random.random() < self.sim['error_rate']:
+            raise ccxt.NetworkError(f"sim {endpoint}: injected network error")
+
+        self._advance()
+
+    @contextmanager
+    def _request(self, endpoint: str):
+        """Delay, admit and run one request atomically with respect to other threads"""
+        delay = self._latency()
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self._admit(endpoint)
+            yield
+
+    def _now_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    def _seed_book(self, symbol: str) -> None:
+        """Give the book initial depth around the fair price"""
+        engine = self.engines[symbol]
+        fair_ticks = round(self.fair_price[symbol] / engine.tick_size)
+        for level in range(1, self.sim['book_levels'] + 1):
+            for side, sign in (('buy', -1), ('sell', 1)):
+                amount = self._synthetic_size()
+                self._submit_synthetic(symbol, side, fair_ticks + sign * level, amount)
+
+    def _synthetic_size(self) -> float:
+        lot = self.sim['lot_size']
+        size = self.random.expovariate(1 / self.sim['mean_order_size'])
+        return max(round(size / lot) * lot, lot)
+
+    def _submit_synthetic(self, symbol: str, side: str, price_ticks: Optional[int], amount: float) -> None:
+        order = _Order(f"s{next(self.order_ids)}", 'flow', symbol, side, price_ticks, amount, self._now_ms())
+        fills = self.engines[symbol].submit(order)
+        self._settle(fills)
+        if order.status == 'open':
+            self.synthetic_ids[symbol].append(order.id)
+
+    def _advance(self) -> None:
+        """Generate synthetic order flow for the time since the last call"""
+        now = time.monotonic()
+        elapsed = now - self.last_advance
+        self.last_advance = now
+        expected = elapsed * self.sim['flow_rate']
+        if expected <= 0:
+            return
+
+        # Poisson event count (normal approximation for large means)
+        if expected < 30:
+            threshold = math.exp(-expected)
+            events, product = 0, self.random.random()
+            while product > threshold:
+                events += 1
+                product *= self.random.random()
+        else:
+            events = max(0, int(self.random.gauss(expected, math.sqrt(expected))))
+        events = min(events, 10000)
+
+        for _ in range(events):
+            symbol = self.random.choice(self.symbols)
+            self._flow_event(symbol)
+        self.total_events += events
+
+        # Liquidity providers step in right away when a side is swept
+        for symbol, engine in self.engines.items():
+            fair_ticks = round(self.fair_price[symbol] / engine.tick_size)
+            best_bid, best_ask = engine.best_ticks('buy'), engine.best_ticks('sell')
+            if best_bid is None:
+                price_ticks = fair_ticks - 1 if best_ask is None else min(fair_ticks, best_ask) - 1
+                self._submit_synthetic(symbol, 'buy', price_ticks, self._synthetic_size())
+            if best_ask is None:
+                price_ticks = fair_ticks + 1 if best_bid is None else max(fair_ticks, best_bid) + 1
+                self._submit_synthetic(symbol, 'sell', price_ticks, self._synthetic_size())
+
+    def _flow_event(self, symbol: str) -> None:
+        """One synthetic event: fair-price move plus a market, limit or cancel"""
+        engine = self.engines[symbol]
+        self.fair_price[symbol] *= math.exp(self.random.gauss(0, self.sim['volatility']))
+        fair_ticks = round(self.fair_price[symbol] / engine.tick_size)
+        draw = self.random.random()
+        side = 'buy' if self.random.random() < 0.5 else 'sell'
+
+        # Cancels only thin the book once it holds more than the seeded depth
+        resting = self.synthetic_ids[symbol]
+        can_cancel = len(resting) > 4 * self.sim['book_levels']
+        if (draw < self.sim['cancel_ratio'] and can_cancel) or len(resting) > self.sim['max_resting']:
+            while resting:
+                index = self.random.randrange(len(resting))
+                resting[index], resting[-1] = resting[-1], resting[index]
+                if engine.cancel(resting.pop()) is not None:
+                    break
+            return
+
+        if self.sim['cancel_ratio'] <= draw < self.sim['cancel_ratio'] + self.sim['market_order_ratio']:
+            self._submit_synthetic(symbol, side, None, self._synthetic_size() / 2)
+            return
+
+        # Limit order a geometric number of ticks away from fair value
+        offset = 1
+        while self.random.random() < 0.7 and offset < 50:
+            offset += 1
+        price_ticks = fair_ticks - offset if side == 'buy' else fair_ticks + offset
+        self._submit_synthetic(symbol, side, price_ticks, self._synthetic_size())
+
+    def _settle(self, fills: List[Tuple[_Order, _Order, int, float]]) -> None:
+        """Book every fill on the public tape and user fills into trades, cash and positions"""
+        for maker, taker, price_ticks, amount in fills:
+            timestamp = self._now_ms()
+            self.public_trades[taker.symbol].append({
+                'id': f"p{next(self.trade_ids)}",
+                'symbol': taker.symbol,
+                'timestamp': timestamp,
+                'side': taker.side,
+                'price': price_ticks * self.engines[taker.symbol].tick_size,
+                'amount': amount
+            })
+            for order, role in ((maker, 'maker'), (taker, 'taker')):
+                if order.owner != 'user':
+                    continue
+                price = price_ticks * self.engines[order.symbol].tick_size
+                fee_rate = self.sim['maker_fee'] if role == 'maker' else self.sim['taker_fee']
+                fee = price * amount * fee_rate
+                order.filled_cost += price * amount
+                signed = amount if order.side == 'buy' else -amount
+                self.positions[order.symbol] += signed
+                self.cash -= signed * price + fee
+                self.my_trades.append({
+                    'id': str(next(self.trade_ids)),
+                    'order': order.id,
+                    'symbol': order.symbol,
+                    'timestamp': timestamp,
+                    'datetime': self._iso(timestamp),
+                    'side': order.side,
+                    'type': 'limit',
+                    'takerOrMaker': role,
+                    'price': price,
+                    'amount': amount,
+                    'cost': price * amount,
+                    'fee': {'cost': fee, 'currency': self.markets[order.symbol]['quote']}
+                })
+                if order.remaining <= 1e-12:
+                    self.user_orders.pop(order.id, None)
+
+    @staticmethod
+    def _iso(timestamp: int) -> str:
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp / 1000)) + f".{timestamp % 1000:03d}Z"
+
+    def _order_dict(self, order: _Order) -> Dict[str, Any]:
+        """ccxt order structure"""
+        tick = self.engines[order.symbol].tick_size
+        filled = order.amount - order.remaining
+        return {
+            'id': order.id,
+            'clientOrderId': None,
+            'timestamp': order.timestamp,
+            'datetime': self._iso(order.timestamp),
+            'symbol': order.symbol,
+            'type': 'limit' if order.price_ticks is not None else 'market',
+            'side': order.side,
+            'price': order.price_ticks * tick if order.price_ticks is not None else None,
+            'average': order.filled_cost / filled if filled > 0 else None,
+            'amount': order.amount,
+            'filled': filled,
+            'remaining': order.remaining,
+            'status': order.status,
+            'info': {}
+        }
+
+    def _check_symbol(self, symbol: str) -> None:
+        if symbol not in self.markets:
+            raise ccxt.BadSymbol(f"sim does not have market symbol {symbol}")
+
+    # ------------------------------------------------------------------
+    # Core implementations shared by the sync and async interfaces
+    # ------------------------------------------------------------------
+
+    def _fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        self._check_symbol(symbol)
+        engine = self.engines[symbol]
+        timestamp = self._now_ms()
+        return {
+            'symbol': symbol,
+            'bids': engine.depth('buy', limit),
+            'asks': engine.depth('sell', limit),
+            'timestamp': timestamp,
+            'datetime': self._iso(timestamp),
+            'nonce': self.total_events
+        }
+
+    def _create_order(self, symbol: str, type: str, side: str, amount: float,
+                      price: Optional[float] = None) -> Dict[str, Any]:
+        self._check_symbol(symbol)
+        if amount < self.sim['min_amount'] - 1e-12:
+            raise ccxt.InvalidOrder(f"sim amount {amount} below minimum {self.sim['min_amount']}")
+        engine = self.engines[symbol]
+        price_ticks = round(price / engine.tick_size) if type == 'limit' else None
+        order = _Order(str(next(self.order_ids)), 'user', symbol, side, price_ticks, amount, self._now_ms())
+        self.user_orders[order.id] = order
+        self._settle(engine.submit(order))
+        if order.status != 'open':
+            self.user_orders.pop(order.id, None)
+        return self._order_dict(order)
+
+    def _cancel_order(self, order_id: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        order = self.user_orders.pop(order_id, None)
+        if order is None or self.engines[order.symbol].cancel(order_id) is None:
+            raise ccxt.OrderNotFound(f"sim order {order_id} not found")
+        return self._order_dict(order)
+
+    def _edit_order(self, order_id: str, symbol: str, type: str, side: str,
+                    amount: Optional[float] = None, price: Optional[float] = None) -> Dict[str, Any]:
+        order = self.user_orders.get(order_id)
+        if order is None:
+            raise ccxt.OrderNotFound(f"sim order {order_id} not found")
+        # Amend keeps the id but, as on most venues, loses queue priority
+        self._cancel_order(order_id, symbol)
+        engine = self.engines[symbol]
+        new_order = _Order(order_id, 'user', symbol, side, round(price / engine.tick_size),
+                           amount if amount is not None else order.remaining, self._now_ms())
+        self.user_orders[order_id] = new_order
+        self._settle(engine.submit(new_order))
+        if new_order.status != 'open':
+            self.user_orders.pop(order_id, None)
+        return self._order_dict(new_order)
+
+    def _create_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Batch semantics: each order succeeds or is rejected on its own
+        results = []
+        for request in orders:
+            try:
+                results.append(self._create_order(request['symbol'], request['type'], request['side'],
+                                                  request['amount'], request.get('price')))
+            except ccxt.InvalidOrder as e:
+                results.append({'id': None, 'status': 'rejected', 'info': str(e)})
+        return results
+
+    def _cancel_orders(self, ids: List[str], symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        cancelled = []
+        for order_id in ids:
+            if order_id in self.user_orders:
+                cancelled.append(self._cancel_order(order_id, symbol))
+        return cancelled
+
+    def _cancel_all_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        cancelled = []
+        for order_id, order in list(self.user_orders.items()):
+            if symbol is None or order.symbol == symbol:
+                cancelled.append(self._cancel_order(order_id, order.symbol))
+        return cancelled
+
+    def _fetch_open_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [self._order_dict(o) for o in self.user_orders.values()
+                if symbol is None or o.symbol == symbol]
+
+    def _fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        trades = [t for t in self.my_trades
+                  if (symbol is None or t['symbol'] == symbol) and (since is None or t['timestamp'] >= since)]
+        return trades[:limit] if limit else trades
+
+    def _fetch_trades(self, symbol: str, since: Optional[int] = None,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        self._check_symbol(symbol)
+        trades = [t for t in self.public_trades[symbol] if since is None or t['timestamp'] >= since]
+        return trades[-limit:] if limit else trades
+
+    def _fetch_balance(self) -> Dict[str, Any]:
+        equity = self.cash
+        used = 0.0
+        for symbol, position in self.positions.items():
+            engine = self.engines[symbol]
+            bid, ask = engine.best_ticks('buy'), engine.best_ticks('sell')
+            mark = (bid + ask) / 2 * engine.tick_size if bid is not None and ask is not None else self.fair_price[symbol]
+            equity += position * mark
+            used += abs(position) * mark / self.leverage.get(symbol, 1)
+        for order in self.user_orders.values():
+            used += order.remaining * order.price_ticks * self.engines[order.symbol].tick_size / self.leverage.get(order.symbol, 1)
+        free = max(equity - used, 0.0)
+        return {
+            'USDT': {'free': free, 'used': used, 'total': equity},
+            'free': {'USDT': free},
+            'used': {'USDT': used},
+            'total': {'USDT': equity}
+        }
+
+    def _fetch_positions(self, symbols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        positions = []
+        for symbol in symbols or self.symbols:
+            amount = self.positions.get(symbol, 0.0)
+            if amount == 0:
+                continue
+            mark = self.fair_price[symbol]
+            leverage = self.leverage.get(symbol, 1)
+            positions.append({
+                'symbol': symbol,
+                'side': 'long' if amount > 0 else 'short',
+                'contracts': abs(amount),
+                'contractSize': 1,
+                'markPrice': mark,
+                'notional': abs(amount) * mark,
+                'leverage': leverage,
+                'initialMargin': abs(amount) * mark / leverage
+            })
+        return positions
+
+    # ------------------------------------------------------------------
+    # ccxt interface
+    # ------------------------------------------------------------------
+
+    def load_markets(self, reload: bool = False) -> Dict[str, Any]:
+        with self._request('load_markets'):
+            return self.markets
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('fetch_order_book'):
+            return self._fetch_order_book(symbol, limit)
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float,
+                     price: Optional[float] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('create_order'):
+            return self._create_order(symbol, type, side, amount, price)
+
+    def create_limit_order(self, symbol: str, side: str, amount: float, price: float,
+                           params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('create_order'):
+            return self._create_order(symbol, 'limit', side, amount, price)
+
+    def create_orders(self, orders: List[Dict[str, Any]], params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('create_orders'):
+            return self._create_orders(orders)
+
+    def cancel_orders(self, ids: List[str], symbol: Optional[str] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('cancel_orders'):
+            return self._cancel_orders(ids, symbol)
+
+    def edit_order(self, id: str, symbol: str, type: str, side: str, amount: Optional[float] = None,
+                   price: Optional[float] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('edit_order'):
+            return self._edit_order(id, symbol, type, side, amount, price)
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('cancel_order'):
+            return self._cancel_order(id, symbol)
+
+    def cancel_all_orders(self, symbol: Optional[str] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('cancel_all_orders'):
+            return self._cancel_all_orders(symbol)
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('fetch_open_orders'):
+            return self._fetch_open_orders(symbol)
+
+    def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                        limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('fetch_my_trades'):
+            return self._fetch_my_trades(symbol, since, limit)
+
+    def fetch_trades(self, symbol: str, since: Optional[int] = None,
+                     limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('fetch_trades'):
+            return self._fetch_trades(symbol, since, limit)
+
+    def fetch_balance(self, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('fetch_balance'):
+            return self._fetch_balance()
+
+    def fetch_positions(self, symbols: Optional[List[str]] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        with self._request('fetch_positions'):
+            return self._fetch_positions(symbols)
+
+    def set_leverage(self, leverage: int, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        with self._request('set_leverage'):
+            self.leverage[symbol] = leverage
+            return {'symbol': symbol, 'leverage': leverage}
+
+
+class AsyncSimExchange(SimExchange):
+    """SimExchange with the ccxt.async_support coroutine interface"""
+
+    async def _arequest(self, endpoint: str) -> None:
+        delay = self._latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._admit(endpoint)
+
+    async def load_markets(self, reload: bool = False) -> Dict[str, Any]:
+        await self._arequest('load_markets')
+        return self.markets
+
+    async def fetch_order_book(self, symbol: str, limit: Optional[int] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('fetch_order_book')
+        return self._fetch_order_book(symbol, limit)
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('create_order')
+        return self._create_order(symbol, type, side, amount, price)
+
+    async def create_limit_order(self, symbol: str, side: str, amount: float, price: float,
+                                 params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('create_order')
+        return self._create_order(symbol, 'limit', side, amount, price)
+
+    async def create_orders(self, orders: List[Dict[str, Any]], params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('create_orders')
+        return self._create_orders(orders)
+
+    async def cancel_orders(self, ids: List[str], symbol: Optional[str] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('cancel_orders')
+        return self._cancel_orders(ids, symbol)
+
+    async def edit_order(self, id: str, symbol: str, type: str, side: str, amount: Optional[float] = None,
+                         price: Optional[float] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('edit_order')
+        return self._edit_order(id, symbol, type, side, amount, price)
+
+    async def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('cancel_order')
+        return self._cancel_order(id, symbol)
+
+    async def cancel_all_orders(self, symbol: Optional[str] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('cancel_all_orders')
+        return self._cancel_all_orders(symbol)
+
+    async def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                                limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('fetch_open_orders')
+        return self._fetch_open_orders(symbol)
+
+    async def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                              limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('fetch_my_trades')
+        return self._fetch_my_trades(symbol, since, limit)
+
+    async def fetch_trades(self, symbol: str, since: Optional[int] = None,
+                           limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('fetch_trades')
+        return self._fetch_trades(symbol, since, limit)
+
+    async def fetch_balance(self, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('fetch_balance')
+        return self._fetch_balance()
+
+    async def fetch_positions(self, symbols: Optional[List[str]] = None, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        await self._arequest('fetch_positions')
+        return self._fetch_positions(symbols)
+
+    async def set_leverage(self, leverage: int, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+        await self._arequest('set_leverage')
+        self.leverage[symbol] = leverage
+        return {'symbol': symbol, 'leverage': leverage}
+
+    async def close(self) -> None:
+        """Nothing to release - present for ccxt.async_support compatibility"""
+
+
+def sim_bot_config(base: Dict[str, Any]) -> Dict[str, Any]:
+    """Bot config for a simulated run: no fill ledger, checkpoint or recording files
+
+    The live config names the production state files; a simulated run must
+    neither restore them nor write simulated fills and inventory over them.
+    """
+    config = copy.deepcopy(base)
+    config['fills'] = dict(config.get('fills', {}), state_file='')
+    config['warm_start'] = dict(config.get('warm_start', {}), enabled=False)
+    config['recording'] = dict(config.get('recording', {}), enabled=False)
+    return config
+
+
+def main():
+    """Load-test UniversalMarketMaker against the simulated exchange"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the market maker against a simulated exchange')
+    parser.add_argument('--config', type=str, default='config.json',
+                        help='Path to configuration file (default: config.json)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--update-frequency', type=float, help='Override strategy.update_frequency')
+    parser.add_argument('--sim', type=str, help='JSON object overriding simulator settings, e.g. \'{"latency_ms": 20}\'')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        print(f"Configuration file not found: {args.config}")
+        sys.exit(1)
+
+    from market_maker_bot import UniversalMarketMaker
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    bot = UniversalMarketMaker(config=sim_bot_config(config))
+    if args.update_frequency is not None:
+        bot.config['strategy']['update_frequency'] = args.update_frequency
+    bot.exchange = SimExchange([bot.config['trading']['symbol']], json.loads(args.sim) if args.sim else None)
+    bot.start_metrics()
+    bot.start_scheduler()
+    bot.setup_symbol()
+
+    update_frequency = bot.config['strategy']['update_frequency']
+    cycle_times = []
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        start = time.monotonic()
+        try:
+            backoff = bot.run_iteration()
+        except ccxt.BaseError as e:
+            logger.warning(f"Cycle failed: {e}")
+            backoff = None
+        cycle_times.append(time.monotonic() - start)
+        time.sleep(backoff if backoff is not None else max(0.0, update_frequency - cycle_times[-1]))
+    bot.cancel_all_orders()
+    bot.account.stop()
+
+    cycle_times.sort()
+    count = len(cycle_times)
+    print(f"\n{'='*60}")
+    print(f"Cycles: {count} in {args.duration:.0f}s ({count / args.duration:.1f}/s)")
+    print(f"Cycle time p50: {cycle_times[count // 2] * 1000:.2f}ms | "
+          f"p99: {cycle_times[min(count - 1, int(count * 0.99))] * 1000:.2f}ms | max: {cycle_times[-1] * 1000:.2f}ms")
+    print(f"Requests: {bot.exchange.request_counts}")
+    print(f"Fills: {bot.fill_ledger.trades_count} | Position: {bot.inventory:.4f} | PnL: ${bot.pnl:.2f}")
+    print(bot.order_manager.summary())
+    if bot.scheduler:
+        print(bot.scheduler.summary())
+    print(bot.metrics.summary_line())
+    bot.metrics.close()
+
+
+if __name__ == "__main__":
+    main()
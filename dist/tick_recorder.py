@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Binary Tick Recorder - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Append-only fixed-width columnar recording with memory-mapped reads
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Table layouts: column name -> array typecode (q = int64, d = float64)
+TABLES = {
+    'book': [('timestamp', 'q'), ('bid', 'd'), ('ask', 'd'), ('bid_size', 'd'), ('ask_size', 'd')],
+    'quote': [('timestamp', 'q'), ('bid', 'd'), ('ask', 'd'), ('size', 'd'), ('mid', 'd'),
+              ('sigma', 'd'), ('reservation', 'd'), ('spread', 'd'), ('inventory', 'd')],
+    'fill': [('timestamp', 'q'), ('price', 'd'), ('amount', 'd'), ('side', 'd'), ('fee', 'd')],
+    'trade': [('timestamp', 'q'), ('price', 'd'), ('amount', 'd'), ('side', 'd')]
+}
+
+NUMPY_DTYPES = {'q': '<i8', 'd': '<f8'}
+
+DAY_MS = 86400000
+
+
+def safe_symbol(symbol: str) -> str:
+    """Filesystem-safe symbol name"""
+    return symbol.replace('/', '_').replace(':', '_')
+
+
+def day_of(timestamp_ms: int) -> str:
+    """UTC day (YYYYMMDD) a millisecond timestamp falls in"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y%m%d')
+
+
+def segment_path(base_dir: str, symbol: str, table: str, day: str) -> str:
+    """Directory holding one table's column files for one day"""
+    return os.path.join(base_dir, safe_symbol(symbol), day, table)
+
+
+class TickRecorder:
+    """Records book tops, own quotes, fills and public trades to per-day column files
+
+    Layout: <base_dir>/<symbol>/<YYYYMMDD>/<table>/<column>.bin, where
+    each column file is a raw little-endian array of int64 or float64.
+    The quoting thread only enqueues a tuple; a background thread batches
+    records and appends them, rolling to a new segment at UTC midnight.
+    """
+
+    def __init__(self, base_dir: str, symbol: str, flush_interval: float = 1.0,
+                 max_queue: int = 100000):
+        """Initialize the recorder and start the writer thread"""
+        self.base_dir = base_dir
+        self.symbol = symbol
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.files: Dict[str, Any] = {}
+        self.current_day: Dict[str, str] = {}
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, name='tick-recorder', daemon=True)
+        self.thread.start()
+
+    def _put(self, table: str, record: tuple) -> None:
+        """Enqueue without ever blocking the caller"""
+        try:
+            self.queue.put_nowait((table, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_book(self, timestamp: int, bid: float, ask: float,
+                    bid_size: float = 0.0, ask_size: float = 0.0) -> None:
+        """Record a top-of-book observation"""
+        self._put('book', (int(timestamp), bid, ask, bid_size or 0.0, ask_size or 0.0))
+
+    def record_quote(self, timestamp: int, bid: float, ask: float, size: float, mid: float,
+                     sigma: float, reservation: float, spread: float, inventory: float) -> None:
+        """Record our own quote and the model values behind it"""
+        self._put('quote', (int(timestamp), bid, ask, size, mid, sigma, reservation, spread, inventory))
+
+    def record_fill(self, trade: Dict[str, Any]) -> None:
+        """Record one of our fills (ccxt trade structure)"""
+        fee = (trade.get('fee') or {}).get('cost') or 0.0
+        side = 1.0 if trade['side'] == 'buy' else -1.0
+        timestamp = trade.get('timestamp') or int(time.time() * 1000)
+        self._put('fill', (int(timestamp), float(trade['price']), float(trade['amount']), side, float(fee)))
+
+    def record_trade(self, trade: Dict[str, Any]) -> None:
+        """Record a public trade print (ccxt trade structure, side 0 when unknown)"""
+        side = {'buy': 1.0, 'sell': -1.0}.get(trade.get('side'), 0.0)
+        timestamp = trade.get('timestamp') or int(time.time() * 1000)
+        self._put('trade', (int(timestamp), float(trade['price']), float(trade['amount']), side))
+
+    def _open(self, table: str, day: str) -> List[Any]:
+        """Open (append) the column files of a table for a day"""
+        for handle in self.files.get(table, []):
+            handle.close()
+        path = segment_path(self.base_dir, self.symbol, table, day)
+        os.makedirs(path, exist_ok=True)
+        handles = [open(os.path.join(path, f"{name}.bin"), 'ab') for name, _ in TABLES[table]]
+        self.files[table] = handles
+        self.current_day[table] = day
+        return handles
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        """Append a batch of records, grouped by table and day"""
+        import numpy as np
+
+        groups: Dict[tuple, List[tuple]] = {}
+        for table, record in batch:
+            groups.setdefault((table, day_of(record[0])), []).append(record)
+
+        for (table, day), records in sorted(groups.items(), key=lambda item: item[0][1]):
+            handles = self.files.get(table)
+            if handles is None or self.current_day.get(table) != day:
+                handles = self._open(table, day)
+            for index, (_, typecode) in enumerate(TABLES[table]):
+                # Explicit little-endian so files read the same on any host
+                np.asarray([record[index] for record in records],
+                           dtype=NUMPY_DTYPES[typecode]).tofile(handles[index])
+            for handle in handles:
+                handle.flush()
+            self.written += len(records)
+
+    def _writer(self) -> None:
+        """Background thread draining the queue"""
+        while self.running or not self.queue.empty():
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < 10000:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"Tick recorder write failed: {e}")
+
+    def close(self) -> None:
+        """Flush pending records and close files"""
+        self.running = False
+        self.thread.join(timeout=10)
+        for handles in self.files.values():
+            for handle in handles:
+                handle.close()
+        self.files = {}
+        if self.dropped:
+            logger.warning(f"Tick recorder dropped {self.dropped} records (queue full)")
+
+
+def list_days(base_dir: str, symbol: str) -> List[str]:
+    """Recorded days for a symbol, oldest first"""
+    path = os.path.join(base_dir, safe_symbol(symbol))
+    if not os.path.isdir(path):
+        return []
+    return sorted(d for d in os.listdir(path) if d.isdigit())
+
+
+def open_segment(base_dir: str, symbol: str, table: str, day: str) -> Dict[str, Any]:
+    """Memory-map one day of a table as {column: numpy array}, zero-copy
+
+    Columns are trimmed to the shortest file so a record that was being
+    appended when the process stopped is ignored.
+    """
+    import numpy as np
+
+    path = segment_path(base_dir, symbol, table, day)
+    columns = {}
+    for name, typecode in TABLES[table]:
+        file_path = os.path.join(path, f"{name}.bin")
+        dtype = np.dtype(NUMPY_DTYPES[typecode])
+        if not os.path.exists(file_path) or os.path.getsize(file_path) < dtype.itemsize:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            # A torn final record leaves a partial item; map whole items only
+            count = os.path.getsize(file_path) // dtype.itemsize
+            columns[name] = np.memmap(file_path, dtype=dtype, mode='r', shape=(count,))
+    length = min(len(column) for column in columns.values())
+    return {name: column[:length] for name, column in columns.items()}
+
+
+def load_market_data(base_dir: str, symbol: str, day: str) -> Any:
+    """Recorded book tops and public trades for a day as a backtest.MarketData
+
+    Public trades are only recorded while calibration is enabled, since the
+    bot fetches the trade stream for it; without them the day loads with
+    no trades.
+    """
+    from backtest import MarketData
+
+    book = open_segment(base_dir, symbol, 'book', day)
+    trades = open_segment(base_dir, symbol, 'trade', day)
+    return MarketData(book['timestamp'], book['bid'], book['ask'], book['bid_size'], book['ask_size'],
+                      trades['timestamp'], trades['price'], trades['amount'], trades['side'])
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Streaming Volatility Estimator - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+O(1) per-tick realized volatility for the market making bots
+"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class VolatilityEstimator:
+    """Incremental realized volatility over a rolling window of log returns
+
+    Two modes are supported:
+    - 'window': sliding-window sample standard deviation maintained with
+      Welford add/remove updates over a ring buffer of returns; the
+      moments are recomputed from the buffer once per window of removals
+      so rounding error cannot accumulate
+    - 'ewma': exponentially weighted variance (RiskMetrics style)
+
+    Every call to update() is O(1) regardless of the window length, so
+    sigma_lookback can be raised into the thousands without slowing the
+    quoting loop.
+
+    When update() is given timestamps, the per-tick variance is divided by
+    the mean tick interval over the same window (or EWMA), so sigma is a
+    rate per time_unit seconds (per hour by default) whatever the update
+    frequency and however uneven the ticks. Without timestamps every tick
+    counts as one second.
+    """
+
+    def __init__(self, lookback: int, mode: str = 'window',
+                 ewma_span: Optional[int] = None, time_unit: float = 3600.0,
+                 floor: float = 0.001, default: float = 0.01):
+        """Initialize the estimator
+
+        lookback is the number of prices (matching the old price_history
+        maxlen), so the window holds lookback - 1 returns.
+        """
+        if mode not in ('window', 'ewma'):
+            raise ValueError(f"Unknown volatility mode: {mode}")
+
+        self.mode = mode
+        self.time_unit = time_unit
+        self.floor = floor
+        self.value = default
+
+        # Sliding window state
+        self.window = max(lookback - 1, 2)
+        self.returns = deque()
+        self.intervals = deque()
+        self.interval_sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.removals = 0
+
+        # EWMA state
+        span = ewma_span or lookback
+        self.decay = 1.0 - 2.0 / (max(span, 1) + 1.0)
+        self.ewma_var = None
+        self.ewma_interval = 1.0
+        self.count = 0
+
+        self.last_price = None
+        self.last_time = None
+
+    def update(self, price: float, timestamp: Optional[float] = None) -> float:
+        """Add a new mid price (observed at timestamp seconds) and return the updated volatility"""
+        if price <= 0:
+            return self.value
+
+        last_price = self.last_price
+        last_time = self.last_time
+        self.last_price = price
+        self.last_time = timestamp
+        if last_price is None:
+            return self.value
+
+        ret = math.log(price / last_price)
+        if timestamp is None or last_time is None:
+            interval = 1.0
+        elif timestamp > last_time:
+            interval = timestamp - last_time
+        else:
+            interval = 0.0
+
+        if self.mode == 'ewma':
+            self._update_ewma(ret, interval)
+        else:
+            self._update_window(ret, interval)
+
+        return self.value
+
+    def _scaled(self, variance: float, interval: float) -> float:
+        """Sigma per time_unit from a per-tick variance and the mean tick interval"""
+        if interval <= 0:
+            return self.value
+        return max(math.sqrt(variance * self.time_unit / interval), self.floor)
+
+    def _update_window(self, ret: float, interval: float) -> None:
+        """Welford add/remove update over the ring buffer of returns"""
+        returns = self.returns
+        if len(returns) == self.window:
+            self.interval_sum -= self.intervals.popleft()
+            old = returns.popleft()
+            n = len(returns)
+            if n == 0:
+                self.mean = 0.0
+                self.m2 = 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / n
+                # Removing a large return leaves cancellation error that can go negative
+                self.m2 = max(0.0, self.m2 - delta * (old - self.mean))
+            self.removals += 1
+
+        returns.append(ret)
+        self.intervals.append(interval)
+        self.interval_sum += interval
+        n = len(returns)
+        delta = ret - self.mean
+        mean = self.mean + delta / n
+        m2 = self.m2 + delta * (ret - mean)
+        self.mean = mean
+        self.m2 = m2
+        if self.removals >= self.window:
+            # O(window) once per window of updates keeps the update amortized O(1)
+            self._recompute()
+
+        if n > 1 and self.interval_sum > 0:
+            # Per-tick variance over the mean tick interval, per time_unit
+            variance = self.m2 / (n - 1)
+            self.value = max(math.sqrt(variance * self.time_unit * n / self.interval_sum), self.floor)
+
+    def _recompute(self) -> None:
+        """Exact moments (and interval sum) from the buffers"""
+        returns = self.returns
+        self.mean = math.fsum(returns) / len(returns) if returns else 0.0
+        self.m2 = math.fsum((r - self.mean) ** 2 for r in returns)
+        self.interval_sum = math.fsum(self.intervals)
+        self.removals = 0
+
+    def _update_ewma(self, ret: float, interval: float) -> None:
+        """Exponentially weighted variance (and tick interval) update"""
+        self.count += 1
+        if self.ewma_var is None:
+            self.ewma_var = ret * ret
+            self.ewma_interval = interval
+        else:
+            self.ewma_var = self.decay * self.ewma_var + (1.0 - self.decay) * ret * ret
+            self.ewma_interval = self.decay * self.ewma_interval + (1.0 - self.decay) * interval
+
+        if self.count > 1:
+            self.value = self._scaled(self.ewma_var, self.ewma_interval)
+
+    def reset(self) -> None:
+        """Clear all state but keep the configuration"""
+        self.returns.clear()
+        self.intervals.clear()
+        self.interval_sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.removals = 0
+        self.ewma_var = None
+        self.ewma_interval = 1.0
+        self.count = 0
+        self.last_price = None
+        self.last_time = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable estimator state (for warm restarts)"""
+        return {
+            'mode': self.mode,
+            'value': self.value,
+            'returns': list(self.returns),
+            'intervals': list(self.intervals),
+            'mean': self.mean,
+            'm2': self.m2,
+            'ewma_var': self.ewma_var,
+            'ewma_interval': self.ewma_interval,
+            'count': self.count
+        }
+
+    def from_dict(self, state: Dict[str, Any]) -> None:
+        """Restore state produced by to_dict() when the mode matches
+
+        The last price is not restored: the first return after a restart
+        would span the downtime.
+        """
+        if state.get('mode') != self.mode:
+            return
+        returns = state.get('returns', [])[-self.window:]
+        # Checkpoints from before timestamped updates counted one second per tick
+        intervals = (state.get('intervals') or [1.0] * len(state.get('returns', [])))[-self.window:]
+        self.returns = deque(returns)
+        self.intervals = deque(intervals)
+        self.interval_sum = sum(intervals)
+        if len(returns) != len(state.get('returns', [])):
+            # Window shrank since the save - recompute the moments
+            self._recompute()
+        else:
+            self.mean = state.get('mean', 0.0)
+            self.m2 = state.get('m2', 0.0)
+        self.ewma_var = state.get('ewma_var')
+        self.ewma_interval = state.get('ewma_interval', 1.0)
+        self.count = state.get('count', 0)
+        self.value = state.get('value', self.value)
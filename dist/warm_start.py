@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Warm Start - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Persisted markets snapshot and strategy checkpoint for fast restarts
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of either file changes; older files are ignored
+SNAPSHOT_VERSION = 2
+CHECKPOINT_VERSION = 1
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    """Write JSON to a temp file and rename it over path"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str, version: int) -> Optional[Dict[str, Any]]:
+    """Load a JSON state file, or None when missing, unreadable or of another version"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {e}")
+        return None
+    if data.get('version') != version:
+        logger.info(f"Ignoring {path}: version {data.get('version')} != {version}")
+        return None
+    return data
+
+
+class MarketsSnapshot:
+    """Market metadata of the venue, kept on disk
+
+    load_markets() downloads every market on the venue, which dominates
+    connect time. The snapshot stores the loaded markets and currencies
+    together with the exchange id and ccxt version, and is injected with
+    exchange.set_markets() on startup, so lookups of any market work before
+    the background reload. A snapshot older than max_age, from another
+    exchange or ccxt release, or missing a traded symbol is ignored and the
+    full load runs as before.
+    """
+
+    def __init__(self, path: str, exchange_id: str, symbols: List[str], max_age: float = 86400.0):
+        """Initialize the snapshot for an exchange; symbols are the ones it must contain"""
+        self.path = path
+        self.exchange_id = exchange_id
+        self.symbols = list(symbols)
+        self.max_age = max_age
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Markets and currencies from disk, or None when unusable"""
+        data = read_json(self.path, SNAPSHOT_VERSION)
+        if data is None:
+            return None
+        if data.get('exchange') != self.exchange_id or data.get('ccxt') != ccxt.__version__:
+            logger.info(f"Markets snapshot {self.path} is for another exchange or ccxt version, ignoring")
+            return None
+        age = time.time() - data.get('saved_at', 0)
+        if age > self.max_age:
+            logger.info(f"Markets snapshot {self.path} is {age:.0f}s old, ignoring")
+            return None
+        markets = data.get('markets', {})
+        missing = [symbol for symbol in self.symbols if symbol not in markets]
+        if missing:
+            logger.info(f"Markets snapshot {self.path} lacks {missing}, ignoring")
+            return None
+        return data
+
+    def apply(self, exchange: Any) -> bool:
+        """Inject the snapshot into an exchange; returns False if a full load is needed"""
+        data = self.load()
+        if data is None:
+            return False
+        exchange.set_markets(data['markets'], data.get('currencies') or None)
+        logger.info(f"Markets restored from {self.path} ({len(data['markets'])} symbols)")
+        return True
+
+    def save(self, exchange: Any) -> None:
+        """Persist the loaded markets and currencies"""
+        try:
+            write_json_atomic(self.path, {
+                'version': SNAPSHOT_VERSION,
+                'exchange': self.exchange_id,
+                'ccxt': ccxt.__version__,
+                'saved_at': time.time(),
+                'markets': exchange.markets,
+                'currencies': getattr(exchange, 'currencies', None) or {}
+            })
+        except Exception as e:
+            logger.error(f"Error saving markets snapshot: {e}")
+
+
+class StrategyCheckpoint:
+    """Compact strategy state written periodically by the quoting loop
+
+    Holds the price history and volatility estimator state (so sigma is
+    warm on the first tick), the fill ledger state (inventory and fill
+    cursor) and the start of the current time horizon. Market state older
+    than max_age is dropped on restore; inventory and the horizon are
+    always kept.
+    """
+
+    def __init__(self, path: str, symbol: str, interval: float = 10.0, max_age: float = 300.0):
+        """Initialize the checkpoint for a symbol"""
+        self.path = path
+        self.symbol = symbol
+        self.interval = interval
+        self.max_age = max_age
+        self.last_save = time.monotonic()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Persisted state for this symbol, with 'fresh' telling whether market state is usable"""
+        state = read_json(self.path, CHECKPOINT_VERSION)
+        if state is None:
+            return None
+        if state.get('symbol') != self.symbol:
+            logger.warning(f"Checkpoint {self.path} is for {state.get('symbol')}, ignoring")
+            return None
+        state['fresh'] = time.time() - state.get('saved_at', 0) <= self.max_age
+        return state
+
+    def save(self, state: Dict[str, Any]) -> None:
+        """Persist state atomically"""
+        state = dict(state, version=CHECKPOINT_VERSION, symbol=self.symbol, saved_at=time.time())
+        try:
+            write_json_atomic(self.path, state)
+        except Exception as e:
+            logger.error(f"Error saving checkpoint: {e}")
+        self.last_save = time.monotonic()
+
+    def due(self) -> bool:
+        """True when interval seconds have passed since the last save"""
+        return self.interval > 0 and time.monotonic() - self.last_save >= self.interval
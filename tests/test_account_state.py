@@ -0,0 +1,116 @@
+"""AccountState refreshes: on demand, coalesced, and from the async task"""
+
+import asyncio
+import time
+
+from account_state import AccountState
+
+SYMBOL = 'ETH/USDT:USDT'
+
+
+class Account:
+    """fetch_balance / fetch_positions returning a growing balance"""
+
+    has = {'fetchPositions': True}
+
+    def __init__(self):
+        self.balance_calls = 0
+        self.fail_positions = False
+
+    def balance(self):
+        self.balance_calls += 1
+        return {'USDT': {'free': 100.0 + self.balance_calls, 'used': 25.0, 'total': 125.0 + self.balance_calls}}
+
+    def positions(self):
+        if self.fail_positions:
+            raise ConnectionError('positions timeout')
+        return [{'symbol': SYMBOL, 'contracts': 2.0, 'side': 'short'}]
+
+    def fetch_balance(self):
+        return self.balance()
+
+    def fetch_positions(self, symbols=None):
+        return self.positions()
+
+
+class AsyncAccount(Account):
+    async def fetch_balance(self):
+        return self.balance()
+
+    async def fetch_positions(self, symbols=None):
+        return self.positions()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_refresh_swaps_snapshot_and_notifies():
+    exchange = Account()
+    account = AccountState(exchange, [SYMBOL])
+    seen = []
+    account.listeners.append(seen.append)
+
+    assert account.stale
+    assert account.refresh()
+    snapshot = account.snapshot
+    assert seen == [snapshot]
+    assert snapshot.free('USDT') == 101.0
+    assert snapshot.margin_ratio('USDT') == 25.0 / 126.0
+    assert snapshot.position(SYMBOL) == -2.0
+    assert snapshot.source == 'rest'
+    assert not account.stale
+
+
+def test_failed_positions_keep_the_last_ones():
+    exchange = Account()
+    account = AccountState(exchange, [SYMBOL])
+    account.refresh()
+    exchange.fail_positions = True
+
+    assert account.refresh()
+    assert account.errors == 1
+    assert account.free('USDT') == 102.0
+    assert account.snapshot.position(SYMBOL) == -2.0
+
+
+def test_request_refresh_wakes_the_thread_once_per_burst():
+    exchange = Account()
+    account = AccountState(exchange, [SYMBOL], refresh_interval=60.0, min_interval=0.2)
+    account.refresh()
+    account.start()
+    try:
+        # Several fills in a row coalesce into one refresh after min_interval
+        for _ in range(5):
+            account.request_refresh()
+        wait_for(lambda: exchange.balance_calls == 2)
+        time.sleep(0.3)
+        assert exchange.balance_calls == 2
+        assert account.refreshes == 2
+    finally:
+        account.stop()
+    assert account.thread is None
+
+
+def test_request_refresh_wakes_the_async_task():
+    exchange = AsyncAccount()
+    account = AccountState(exchange, [SYMBOL], refresh_interval=60.0, min_interval=0.0)
+
+    async def run():
+        await account.refresh_async()
+        task = asyncio.ensure_future(account.run_async())
+        await asyncio.sleep(0.01)
+        account.request_refresh()
+        for _ in range(100):
+            if exchange.balance_calls == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    # Without the wake-up the task would sleep the full refresh_interval
+    assert exchange.balance_calls == 2
+    assert account.free('USDT') == 102.0
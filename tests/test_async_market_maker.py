@@ -0,0 +1,61 @@
+"""AsyncMarketMaker quoting loop against the async simulated exchange"""
+
+import asyncio
+import json
+import os
+
+from async_market_maker import AsyncMarketMaker
+from sim_exchange import AsyncSimExchange, sim_bot_config
+
+SYMBOL = 'ETH/USDT:USDT'
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist', 'config.example.json')
+
+
+class CountingSimExchange(AsyncSimExchange):
+    """AsyncSimExchange that records how many requests were in flight at once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _arequest(self, endpoint):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await super()._arequest(endpoint)
+        finally:
+            self.in_flight -= 1
+
+
+def test_loop_overlaps_requests_and_cleans_up(tmp_path, monkeypatch):
+    with open(CONFIG) as f:
+        config = sim_bot_config(json.load(f))
+    config['trading'].update(symbol=SYMBOL, order_size_type='fixed', order_size=0.01)
+    config['strategy']['update_frequency'] = 0.05
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+
+    bot = AsyncMarketMaker(str(tmp_path / 'config.json'))
+    bot.exchange = CountingSimExchange([SYMBOL], {'flow_rate': 0.0, 'seed': 1, 'latency_ms': 20, 'jitter_ms': 0})
+    quoted = []
+
+    async def run():
+        async def stop():
+            while len(quoted) < 3:
+                await asyncio.sleep(0.01)
+                sides = sorted(order['side'] for order in bot.exchange._fetch_open_orders(SYMBOL))
+                if sides == ['buy', 'sell']:
+                    quoted.append(sides)
+            bot.running = False
+
+        await asyncio.gather(bot.run_async(), stop())
+
+    asyncio.run(asyncio.wait_for(run(), 30))
+
+    # Book, fills and calibration fetches (and bid and ask updates) go out together
+    assert bot.exchange.max_in_flight >= 2
+    assert bot.trades_count == 0
+    # Shutdown cancels our quotes and leaves no state files behind
+    assert bot.exchange._fetch_open_orders(SYMBOL) == []
+    assert sorted(os.listdir(tmp_path)) == ['config.json']
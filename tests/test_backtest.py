@@ -0,0 +1,85 @@
+"""Vectorized backtest against the live bots' quoting rules"""
+
+import numpy as np
+import pytest
+
+from backtest import MarketData, compute_quotes, run_backtest, strategy_params, time_remaining
+from calibration import SpreadModel
+
+START_MS = 1735689600000 + 1234567  # Deliberately not on an hour boundary
+
+
+def test_horizon_starts_at_first_timestamp():
+    timestamp = START_MS + np.array([0, 1800000, 3600000, 5400000])
+    assert np.allclose(time_remaining(timestamp, 1.0), [1.0, 0.5, 1.0, 0.5])
+
+
+def test_horizon_start_override_and_floor():
+    timestamp = np.array([START_MS, START_MS + 1800000])
+    start = START_MS / 1000.0 - 1800.0
+    assert np.allclose(time_remaining(timestamp, 1.0, start), [0.5, 1.0])
+    assert np.allclose(time_remaining(timestamp, 0.25), [0.25, 0.01])
+
+
+def config(**risk):
+    limits = {'max_inventory_usd': 1000, 'max_position_size_usd': None,
+              'stop_loss_percent': None, 'daily_loss_limit_usd': None}
+    limits.update(risk)
+    return {
+        'strategy': {'gamma': 0.1, 'k': 1.5, 'time_horizon': 1.0, 'sigma_lookback': 20,
+                     'min_spread': 0.0001, 'max_spread_percent': 0.01,
+                     'max_quote_distance_percent': 0.0005},
+        'trading': {'order_size_type': 'fixed', 'order_size': 1.0},
+        'risk': limits
+    }
+
+
+def selling_flow(mids):
+    """Book around each mid with a seller sweeping well through the bid every tick"""
+    mids = np.asarray(mids, dtype=float)
+    timestamp = START_MS + np.arange(len(mids)) * 1000
+    return MarketData(timestamp, mids - 0.05, mids + 0.05, np.ones(len(mids)), np.ones(len(mids)),
+                      timestamp + 500, mids * 0.99, np.full(len(mids), 100.0), -np.ones(len(mids), dtype=np.int8))
+
+
+def run(data, **risk):
+    params = strategy_params(config(**risk), {'tick_size': 0.01, 'lot_size': 0.001, 'min_size': 0.001})
+    return run_backtest(data, params)
+
+
+def test_position_and_resting_bid_stay_within_max_inventory():
+    result = run(selling_flow(np.full(40, 100.0)))
+    # The last bid is clipped to the remaining room instead of overshooting
+    assert result['summary']['max_abs_inventory'] * 100.0 <= 1000 * 1.01
+    assert result['summary']['ask_fills'] == 0
+    # Reduce-only at the limit: no more bids once the inventory is full
+    assert np.isnan(result['bid'][-5:]).all()
+    assert np.isfinite(result['ask'][-5:]).all()
+
+
+def test_orders_clipped_to_max_position_size():
+    result = run(selling_flow(np.full(3, 100.0)), max_position_size_usd=50)
+    assert result['inventory'][0] == pytest.approx(0.5, rel=0.02)
+
+
+def test_stop_loss_flattens_and_pauses():
+    mids = np.concatenate([np.full(5, 100.0), np.linspace(100.0, 90.0, 20)])
+    result = run(selling_flow(mids), stop_loss_percent=0.05)
+    assert result['summary']['flattens'] >= 1
+    flat = np.flatnonzero((np.arange(len(mids)) > 5) & (result['inventory'] == 0.0))
+    assert len(flat) > 0
+    # Quoting halts for the cooldown after the flatten
+    assert np.isnan(result['bid'][flat[0]])
+
+
+def test_reservation_and_spread_match_spread_model():
+    mids = 100.0 + np.sin(np.arange(60) / 5.0)
+    params = strategy_params(config(), {'tick_size': 0.01, 'lot_size': 0.001, 'min_size': 0.001})
+    quotes = compute_quotes(selling_flow(mids), params, inventory=3.0)
+
+    model = SpreadModel(params['gamma'], params['k'])
+    for i in (10, 30, 59):
+        sigma, t_rem = quotes['sigma'][i], quotes['time_remaining'][i]
+        assert quotes['reservation'][i] == pytest.approx(mids[i] - model.reservation_offset(3.0, sigma, t_rem))
+        assert quotes['spread'][i] == pytest.approx(
+            min(max(model.spread(sigma, t_rem), params['min_spread']), params['max_spread_percent']) * mids[i])
@@ -0,0 +1,51 @@
+"""benchmark.compare regression thresholds"""
+
+import json
+import os
+
+from benchmark import compare
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist', 'benchmark_baseline.json')
+BASE = {'op': {'cpu_ref': 1.0, 'cpu_us': 10.0, 'peak_kb': 10.0, 'blocks_per_op': 0.0}}
+
+
+def run(cpu_threshold=0.25, alloc_threshold=0.25, **current):
+    result = dict(BASE['op'], **current)
+    return compare({'op': result}, BASE, cpu_threshold, alloc_threshold)
+
+
+def test_cpu_regresses_past_relative_threshold():
+    assert run(cpu_ref=1.2) == []
+    regressions = run(cpu_ref=1.3)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('op: CPU 1.000 -> 1.300') and '(+30%)' in regressions[0]
+    assert run(cpu_threshold=0.5, cpu_ref=1.3) == []
+
+
+def test_cpu_floor_ignores_sub_microsecond_noise():
+    # 1 reference unit is 0.1us here: +100% is only 0.1us of timer noise
+    base = {'op': {'cpu_ref': 1.0, 'cpu_us': 0.1, 'peak_kb': 1.0, 'blocks_per_op': 0.0}}
+    current = {'op': dict(base['op'], cpu_ref=2.0)}
+    assert compare(current, base, 0.25, 0.25) == []
+    assert len(compare(current, base, 0.25, 0.25, cpu_floor_us=0.05)) == 1
+
+
+def test_peak_memory_allows_relative_growth_plus_one_kb():
+    assert run(peak_kb=13.4) == []
+    assert run(peak_kb=13.6) == ['op: peak memory 10.0KB -> 13.6KB']
+
+
+def test_retained_blocks_regress_at_half_a_block_per_op():
+    assert run(blocks_per_op=0.4) == []
+    assert run(blocks_per_op=0.5) == ['op: retained blocks/op 0.00 -> 0.50']
+
+
+def test_ops_missing_from_baseline_are_skipped():
+    assert compare({'new': dict(BASE['op'], cpu_ref=100.0)}, BASE, 0.25, 0.25) == []
+
+
+def test_committed_baseline_matches_itself():
+    with open(BASELINE) as f:
+        baseline = json.load(f)['results']
+    assert baseline
+    assert compare(baseline, baseline, 0.0, 0.0) == []
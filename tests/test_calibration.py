@@ -0,0 +1,65 @@
+"""Fill-intensity calibration and the cached Avellaneda-Stoikov spread terms"""
+
+import math
+
+import pytest
+
+from calibration import FillIntensityEstimator, SpreadModel
+
+MID = 100.0
+START = 1000.0
+
+
+def exponential_profile(estimator, A, k, duration):
+    """Trades whose depths follow lambda(d) = A * exp(-k * d) over duration seconds
+
+    Depths are the quantiles of an exponential with rate k, so the count at
+    depth >= d is A * duration * exp(-k * d) up to rounding.
+    """
+    count = int(A * duration)
+    estimator.mark(START, MID)
+    for i in range(count):
+        depth = -math.log(1.0 - (i + 0.5) / count) / k
+        side = 1 if i % 2 else -1
+        assert estimator.add_trade(START + duration * i / count, MID * (1 + side * depth))
+    return START + duration
+
+
+def test_fit_recovers_exponential_profile():
+    estimator = FillIntensityEstimator(bucket_width=0.0001, buckets=50, half_life=1e9, min_trades=50)
+    now = exponential_profile(estimator, A=5.0, k=2000.0, duration=2000.0)
+
+    A, k = estimator.fit(now)
+    assert k == pytest.approx(2000.0, rel=0.01)
+    assert A == pytest.approx(5.0, rel=0.01)
+
+
+def test_fit_waits_for_min_trades():
+    estimator = FillIntensityEstimator(min_trades=50)
+    now = exponential_profile(estimator, A=0.02, k=2000.0, duration=2000.0)
+    assert estimator.fit(now) is None
+
+
+def test_add_trades_skips_trades_already_seen():
+    estimator = FillIntensityEstimator()
+    estimator.mark(START, MID)
+    trades = [{'id': str(i), 'timestamp': int((START + i) * 1000), 'price': MID + 0.01} for i in range(3)]
+    assert estimator.add_trades(trades) == 3
+    assert estimator.add_trades(trades[1:] + [{'id': '3', 'timestamp': trades[-1]['timestamp'], 'price': MID}]) == 1
+
+
+def test_spread_model_matches_closed_form():
+    gamma, k, sigma, horizon = 0.1, 1.5, 0.02, 0.5
+    model = SpreadModel(gamma, k)
+    liquidity = (2 / gamma) * math.log(1 + gamma / k)
+    assert model.spread(sigma, horizon) == pytest.approx(gamma * sigma ** 2 * horizon + liquidity)
+    assert model.reservation_offset(3.0, sigma, horizon) == pytest.approx(3.0 * gamma * sigma ** 2 * horizon)
+
+
+def test_spread_model_recomputes_only_past_tolerance():
+    model = SpreadModel(0.1, 1.5, tolerance=0.01)
+    assert not model.set_k(1.5 * 1.005)
+    assert model.recomputes == 1
+    assert model.set_k(2.0)
+    assert model.liquidity_term == pytest.approx(20 * math.log(1 + 0.1 / 2.0))
+    assert model.recomputes == 2
@@ -0,0 +1,149 @@
+"""FillLedger pagination and stream recovery"""
+
+import asyncio
+
+from fill_ledger import FillLedger
+
+SYMBOL = 'ETH/USDT:USDT'
+
+
+def fill(trade_id, timestamp, side='buy', amount=1.0, price=100.0):
+    return {'id': str(trade_id), 'order': 'o1', 'symbol': SYMBOL, 'side': side,
+            'amount': amount, 'price': price, 'timestamp': timestamp}
+
+
+class PagedExchange:
+    """fetch_my_trades over a fixed fill list, oldest first like ccxt
+
+    max_limit caps the page size as exchanges do; params={'fromId': id}
+    pages by trade id (ids are the list positions) like Binance.
+    """
+
+    def __init__(self, trades, max_limit=None):
+        self.trades = trades
+        self.max_limit = max_limit
+        self.calls = []
+        self.limits = []
+
+    def fetch_my_trades(self, symbol, since=None, limit=None, params=None):
+        self.calls.append(since)
+        self.limits.append(limit)
+        if self.max_limit:
+            limit = min(limit, self.max_limit)
+        if params and 'fromId' in params:
+            return self.trades[int(params['fromId']):][:limit]
+        return [t for t in self.trades if t['timestamp'] >= since][:limit]
+
+
+class FlakyStream:
+    """watch_my_trades that fails once, then yields queued batches"""
+
+    def __init__(self, batches, missed):
+        self.batches = list(batches)
+        self.missed = missed
+        self.failed = False
+
+    async def watch_my_trades(self, symbol):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError('socket closed')
+        if not self.batches:
+            raise asyncio.CancelledError()
+        return self.batches.pop(0)
+
+    async def fetch_my_trades(self, symbol, since=None, limit=None):
+        return [t for t in self.missed if t['timestamp'] >= since][:limit]
+
+
+def test_poll_pages_past_full_page_on_one_millisecond():
+    # A sweep of more fills than a page at one timestamp, then a later fill
+    trades = [fill(i, 1000) for i in range(5)] + [fill('late', 1001, side='sell')]
+    exchange = PagedExchange(trades)
+    ledger = FillLedger(SYMBOL, page_limit=5)
+    ledger.cursor = 1000
+
+    assert ledger.poll(exchange) == 6
+    assert ledger.position == 4.0
+    assert ledger.cursor == 1001
+
+    # Caught up: the next poll does not refetch the sweep forever
+    exchange.calls = []
+    assert ledger.poll(exchange) == 0
+    assert exchange.calls == [1001]
+
+
+def test_poll_rerequests_millisecond_until_page_is_short():
+    # More fills on one millisecond than a page, nothing after them
+    exchange = PagedExchange([fill(i, 1000) for i in range(7)])
+    ledger = FillLedger(SYMBOL, page_limit=5)
+    ledger.cursor = 1000
+
+    assert ledger.poll(exchange) == 7
+    assert exchange.calls == [1000, 1000, 1001]
+    assert exchange.limits == [5, 10, 5]
+    # Every fill on 1000 is in hand, so the cursor steps past it
+    assert ledger.cursor == 1001
+
+
+def test_poll_pages_by_trade_id_past_exchange_page_cap():
+    trades = [fill(i, 1000) for i in range(12)] + [fill(12, 1001, side='sell')]
+    exchange = PagedExchange(trades, max_limit=5)
+    ledger = FillLedger(SYMBOL, page_limit=5, from_id_param='fromId')
+    ledger.cursor = 1000
+
+    assert ledger.poll(exchange) == 13
+    assert ledger.position == 11.0
+    assert ledger.cursor == 1001
+
+
+def test_poll_warns_when_page_cap_hides_fills(caplog):
+    trades = [fill(i, 1000) for i in range(7)] + [fill('late', 1001, side='sell')]
+    exchange = PagedExchange(trades, max_limit=5)
+    ledger = FillLedger(SYMBOL, page_limit=5)
+    ledger.cursor = 1000
+
+    # Without id paging the capped fills cannot be reached, but later ones still are
+    assert ledger.poll(exchange) == 6
+    assert ledger.cursor == 1001
+    assert 'from_id_param' in caplog.text
+
+
+def test_poll_async_rerequests_millisecond():
+    class AsyncPaged(PagedExchange):
+        async def fetch_my_trades(self, symbol, since=None, limit=None, params=None):
+            return PagedExchange.fetch_my_trades(self, symbol, since, limit, params)
+
+    exchange = AsyncPaged([fill(i, 1000) for i in range(7)] + [fill('late', 1002)])
+    ledger = FillLedger(SYMBOL, page_limit=5)
+    ledger.cursor = 1000
+
+    assert asyncio.run(ledger.poll_async(exchange)) == 8
+    assert ledger.cursor == 1002
+
+
+def test_poll_stops_when_page_is_short():
+    exchange = PagedExchange([fill(i, 1000 + i) for i in range(3)])
+    ledger = FillLedger(SYMBOL, page_limit=5)
+    ledger.cursor = 0
+
+    assert ledger.poll(exchange) == 3
+    assert exchange.calls == [0]
+
+
+def test_watch_survives_stream_error_and_catches_up():
+    missed = [fill('gap', 1000)]
+    stream = FlakyStream([[fill('live', 1001)]], missed)
+    ledger = FillLedger(SYMBOL)
+    ledger.cursor = 0
+    notified = []
+
+    async def run():
+        try:
+            await ledger.watch(stream, on_fill=lambda: notified.append(ledger.position))
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert ledger.trades_count == 2
+    assert ledger.position == 2.0
+    assert notified == [1.0, 2.0]
@@ -0,0 +1,45 @@
+"""Metrics registry under concurrent recording"""
+
+import threading
+
+from metrics import Metrics
+
+THREADS = 8
+SAMPLES = 5000
+
+
+def test_concurrent_records_are_all_counted():
+    metrics = Metrics(summary_interval=0)
+    window_counts = []
+    done = threading.Event()
+
+    def summarize():
+        # Swap the window repeatedly while samples arrive
+        while not done.is_set():
+            window = metrics.window
+            metrics.summary_line()
+            window_counts.append(sum(h.count for h in window.values()))
+
+    def work(index):
+        for i in range(SAMPLES):
+            metrics.record('api.fetch_order_book', 0.001 * (1 + i % 7))
+            metrics.record(f"stage.{index % 3}", 0.0005)
+            metrics.increment('requests')
+
+    summarizer = threading.Thread(target=summarize)
+    summarizer.start()
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(THREADS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    done.set()
+    summarizer.join()
+
+    snapshot = metrics.snapshot()
+    assert snapshot['latency']['api.fetch_order_book']['count'] == THREADS * SAMPLES
+    assert sum(snapshot['latency'][f"stage.{i}"]['count'] for i in range(3)) == THREADS * SAMPLES
+    assert snapshot['counters']['requests'] == THREADS * SAMPLES
+    # Every sample landed in exactly one summary window
+    remaining = sum(h.count for h in metrics.window.values())
+    assert sum(window_counts) + remaining == 2 * THREADS * SAMPLES
@@ -0,0 +1,250 @@
+"""LocalOrderBook and BookSynchronizer driven from a ReplayFeed"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from order_book import BookSynchronizer, LocalOrderBook, ReplayFeed, SequenceGapError
+
+SYMBOL = 'BTC/USDT'
+DIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist')
+
+
+def snapshot(sequence, bids, asks, timestamp=None):
+    return {'type': 'snapshot', 'bids': bids, 'asks': asks, 'sequence': sequence, 'timestamp': timestamp}
+
+
+def delta(sequence, bids=(), asks=(), prev_sequence=None, timestamp=None):
+    message = {'type': 'delta', 'bids': list(bids), 'asks': list(asks), 'sequence': sequence, 'timestamp': timestamp}
+    if prev_sequence is not None:
+        message['prev_sequence'] = prev_sequence
+    return message
+
+
+def replay(messages):
+    book = LocalOrderBook(SYMBOL)
+    sync = BookSynchronizer(book)
+    for message in ReplayFeed(messages):
+        sync.process(message)
+    return book, sync
+
+
+BASE = snapshot(100, [[99.0, 1.0], [98.0, 2.0], [97.0, 3.0]], [[101.0, 1.5], [102.0, 2.5], [103.0, 3.5]])
+
+
+def test_snapshot_then_deltas():
+    book, sync = replay([
+        BASE,
+        delta(101, bids=[[99.5, 0.5]]),
+        delta(102, asks=[[100.5, 0.25], [102.0, 4.0]]),
+        delta(103, bids=[[98.0, 2.5]], timestamp=1234)
+    ])
+
+    assert book.synced
+    assert book.sequence == 103
+    assert book.timestamp == 1234
+    assert book.best_bid() == 99.5
+    assert book.best_ask() == 100.5
+    assert book.depth(5)['bids'] == [[99.5, 0.5], [99.0, 1.0], [98.0, 2.5], [97.0, 3.0]]
+    assert book.depth(5)['asks'] == [[100.5, 0.25], [101.0, 1.5], [102.0, 4.0], [103.0, 3.5]]
+    assert sync.gaps == 0
+
+
+def test_best_mid_and_microprice():
+    book, _ = replay([BASE])
+
+    assert book.best_bid() == 99.0
+    assert book.best_ask() == 101.0
+    assert book.mid() == 100.0
+    # Leans toward the ask, which has more size resting behind the bid's 1.0
+    assert book.microprice() == pytest.approx((99.0 * 1.5 + 101.0 * 1.0) / 2.5)
+
+
+def test_top_n_depth():
+    book, _ = replay([BASE])
+
+    top = book.depth(2)
+    assert top['bids'] == [[99.0, 1.0], [98.0, 2.0]]
+    assert top['asks'] == [[101.0, 1.5], [102.0, 2.5]]
+    assert top['nonce'] == 100
+    assert book.depth(0) == {'bids': [], 'asks': [], 'nonce': 100, 'timestamp': None}
+
+
+def test_zero_size_removes_level():
+    book, _ = replay([
+        BASE,
+        delta(101, bids=[[99.0, 0.0]], asks=[[101.0, 0]]),
+        # Removing a level that does not exist is a no-op
+        delta(102, bids=[[50.0, 0.0]])
+    ])
+
+    assert book.best_bid() == 98.0
+    assert book.best_ask() == 102.0
+    assert len(book.bids) == 2
+    assert len(book.asks) == 2
+
+
+def test_snapshot_drops_zero_size_levels():
+    book, _ = replay([snapshot(1, [[99.0, 0.0], [98.0, 1.0]], [[101.0, 0.0], [102.0, 1.0]])])
+
+    assert book.depth(5)['bids'] == [[98.0, 1.0]]
+    assert book.depth(5)['asks'] == [[102.0, 1.0]]
+
+
+def test_levels_with_extra_fields():
+    book, _ = replay([
+        snapshot(1, [[99.0, 1.0, 3]], [[101.0, 1.0, 2]]),
+        delta(2, bids=[[99.5, 2.0, 1]], asks=[[101.0, 0.0, 0]])
+    ])
+
+    assert book.best_bid() == 99.5
+    assert book.best_ask() is None
+
+
+def test_stale_delta_is_ignored():
+    book, _ = replay([BASE, delta(100, bids=[[99.0, 9.0]]), delta(90, bids=[[99.0, 9.0]])])
+
+    assert book.sequence == 100
+    assert book.bids.best() == (99.0, 1.0)
+
+
+def test_gap_triggers_resync():
+    book, sync = replay([
+        BASE,
+        delta(101, bids=[[99.5, 1.0]]),
+        # 102 is lost
+        delta(103, asks=[[100.5, 1.0]])
+    ])
+
+    assert not book.synced
+    assert sync.needs_snapshot
+    assert sync.gaps == 1
+    # The book keeps the last consistent state until the resync
+    assert book.sequence == 101
+
+    # Deltas arriving while unsynced are buffered, then replayed on top of the snapshot
+    sync.process(delta(104, bids=[[99.75, 1.0]]))
+    sync.process(delta(105, asks=[[100.25, 1.0]]))
+    sync.process(snapshot(103, [[99.5, 1.0], [99.0, 1.0]], [[100.5, 1.0], [101.0, 1.5]]))
+
+    assert book.synced
+    assert sync.resyncs == 2
+    assert book.sequence == 105
+    assert book.best_bid() == 99.75
+    assert book.best_ask() == 100.25
+    assert not sync.buffer
+
+
+def test_prev_sequence_gap():
+    book, sync = replay([BASE, delta(110, prev_sequence=105)])
+
+    assert not book.synced
+    assert sync.gaps == 1
+
+
+def test_prev_sequence_continuation():
+    book, sync = replay([BASE, delta(110, bids=[[99.5, 1.0]], prev_sequence=100)])
+
+    assert book.synced
+    assert book.sequence == 110
+    assert sync.gaps == 0
+
+
+def test_delta_before_snapshot_raises():
+    book = LocalOrderBook(SYMBOL)
+
+    with pytest.raises(SequenceGapError):
+        book.apply_delta([[99.0, 1.0]], [], sequence=1)
+
+
+def test_async_replay():
+    book = LocalOrderBook(SYMBOL)
+    sync = BookSynchronizer(book)
+    feed = ReplayFeed([BASE, delta(101, bids=[[99.5, 1.0]], timestamp=1), delta(102, asks=[[100.5, 1.0]], timestamp=2)],
+                      speed=1000.0)
+
+    async def consume():
+        async for message in feed:
+            sync.process(message)
+
+    asyncio.run(consume())
+    assert book.best_bid() == 99.5
+    assert book.best_ask() == 100.5
+
+
+def test_replay_from_file(tmp_path):
+    path = tmp_path / 'depth.jsonl'
+    path.write_text('\n'.join(json.dumps(m) for m in [BASE, delta(101, bids=[[99.5, 1.0]])]) + '\n')
+
+    book = LocalOrderBook(SYMBOL)
+    sync = BookSynchronizer(book)
+    for message in ReplayFeed.from_file(str(path)):
+        sync.process(message)
+    assert book.best_bid() == 99.5
+
+
+class ProExchange:
+    """watch_order_book scripted like ccxt.pro, with a REST fetch_order_book for resyncs"""
+
+    def __init__(self, script, rest_book, bot):
+        self.script = list(script)
+        self.rest_book = rest_book
+        self.bot = bot
+        self.rest_calls = []
+
+    async def watch_order_book(self, symbol, limit=None):
+        if not self.script:
+            raise asyncio.CancelledError()
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def fetch_order_book(self, symbol, limit=None):
+        # The resync happens while the book is marked unsynced, so nothing quotes from it
+        self.rest_calls.append(self.bot.book.synced)
+        return self.rest_book
+
+
+def pro_book(nonce, bid, ask):
+    return {'bids': [[bid, 1.0]], 'asks': [[ask, 1.0]], 'nonce': nonce, 'timestamp': nonce}
+
+
+def test_live_feed_gap_resyncs_from_rest():
+    import ccxt
+
+    from async_market_maker import AsyncMarketMaker
+    from order_book import CcxtProFeed
+
+    bot = AsyncMarketMaker(os.path.join(DIST, 'config.example.json'))
+    bot.exchange = ProExchange([
+        pro_book(10, 99.0, 101.0),
+        ccxt.InvalidNonce('bybit orderbook nonce gap'),
+        pro_book(20, 99.5, 100.5)
+    ], {'bids': [[98.0, 1.0]], 'asks': [[102.0, 1.0]], 'nonce': 15, 'timestamp': 15}, bot)
+    bot.feed = CcxtProFeed(bot.exchange, SYMBOL, retry_delay=0)
+    bot.book = LocalOrderBook(SYMBOL)
+    bot.book_sync = BookSynchronizer(bot.book)
+    bot.book_event = asyncio.Event()
+    bot.running = True
+
+    books = []
+    original = bot.book_sync.on_snapshot
+
+    def on_snapshot(snapshot):
+        original(snapshot)
+        books.append((bot.book.sequence, bot.book.best_bid()))
+
+    bot.book_sync.on_snapshot = on_snapshot
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(bot.market_data_loop())
+
+    assert bot.book_sync.gaps == 1
+    assert bot.exchange.rest_calls == [False]
+    # Stream snapshot, REST resync after the gap, then the stream again
+    assert books == [(10, 99.0), (15, 98.0), (20, 99.5)]
+    assert bot.book.synced
+    assert bot.book_sync.resyncs == 3
@@ -0,0 +1,174 @@
+"""QuoteManager requotes sides filled on the SimExchange"""
+
+import asyncio
+
+import ccxt
+
+from fill_ledger import FillLedger
+from order_manager import AsyncQuoteManager, QuoteManager
+from sim_exchange import AsyncSimExchange, SimExchange, _Order
+
+SYMBOL = 'ETH/USDT:USDT'
+SIM = {'flow_rate': 0.0, 'seed': 1}
+
+
+def take(exchange, side, amount):
+    """Send a market order from the synthetic flow against the book"""
+    engine = exchange.engines[SYMBOL]
+    order = _Order('taker', 'flow', SYMBOL, side, None, amount, exchange._now_ms())
+    exchange._settle(engine.submit(order))
+
+
+def setup(manager_class=QuoteManager, exchange_class=SimExchange):
+    exchange = exchange_class([SYMBOL], SIM)
+    tick = exchange.sim['tick_size']
+    manager = manager_class(exchange, SYMBOL, tick)
+    ledger = FillLedger(SYMBOL)
+    ledger.cursor = 0
+    ledger.listeners.append(manager.on_fill)
+    # Empty the seeded book so our quotes are the only resting orders
+    for order_id in exchange.synthetic_ids[SYMBOL]:
+        exchange.engines[SYMBOL].cancel(order_id)
+    price = exchange.sim['initial_price']
+    return exchange, manager, ledger, price - 10 * tick, price + 10 * tick
+
+
+def open_sides(exchange):
+    return sorted(order['side'] for order in exchange._fetch_open_orders(SYMBOL))
+
+
+def test_filled_side_is_requoted():
+    exchange, manager, ledger, bid, ask = setup()
+    manager.update_quotes(bid, ask, 0.01)
+    assert open_sides(exchange) == ['buy', 'sell']
+
+    take(exchange, 'sell', 0.01)
+    assert ledger.poll(exchange) == 1
+    assert manager.orders['bid'] is None
+    assert manager.stats['filled'] == 1
+
+    manager.update_quotes(bid, ask, 0.01)
+    assert open_sides(exchange) == ['buy', 'sell']
+    assert manager.stats['kept'] == 1
+    assert manager.stats['creates'] == 3
+
+
+def test_partial_fill_is_topped_up():
+    exchange, manager, ledger, bid, ask = setup()
+    manager.update_quotes(bid, ask, 0.01)
+
+    take(exchange, 'buy', 0.004)
+    ledger.poll(exchange)
+    assert abs(manager.orders['ask']['amount'] - 0.006) < 1e-9
+    assert manager.plan('ask', ask, 0.01) == 'replace'
+
+    manager.update_quotes(bid, ask, 0.01)
+    asks = [order for order in exchange._fetch_open_orders(SYMBOL) if order['side'] == 'sell']
+    assert len(asks) == 1
+    assert abs(asks[0]['remaining'] - 0.01) < 1e-9
+    assert manager.orders['ask']['amount'] == 0.01
+
+
+def test_unrelated_fill_is_ignored():
+    exchange, manager, ledger, bid, ask = setup()
+    manager.update_quotes(bid, ask, 0.01)
+    live = dict(manager.orders['bid'])
+
+    manager.on_fill({'order': 'not-ours', 'amount': 0.01})
+    manager.on_fill({'amount': 0.01})
+    assert manager.orders['bid'] == live
+
+
+def test_async_filled_side_is_requoted():
+    exchange, manager, ledger, bid, ask = setup(AsyncQuoteManager, AsyncSimExchange)
+
+    async def run():
+        await manager.update_quotes(bid, ask, 0.01)
+        take(exchange, 'sell', 0.01)
+        await ledger.poll_async(exchange)
+        await manager.update_quotes(bid, ask, 0.01)
+
+    asyncio.run(run())
+    assert open_sides(exchange) == ['buy', 'sell']
+
+
+def test_reconcile_clears_filled_and_shrinks_partial_sides():
+    # The sharded workers only see open orders, not fill order ids
+    exchange, manager, ledger, bid, ask = setup()
+    manager.update_quotes(bid, ask, 0.01)
+
+    take(exchange, 'sell', 0.01)
+    take(exchange, 'buy', 0.004)
+    assert manager.reconcile(exchange.fetch_open_orders(SYMBOL)) == 2
+    assert manager.orders['bid'] is None
+    assert abs(manager.orders['ask']['amount'] - 0.006) < 1e-9
+    assert manager.stats['filled'] == 1
+
+    manager.update_quotes(bid, ask, 0.01)
+    assert open_sides(exchange) == ['buy', 'sell']
+    assert manager.reconcile(exchange.fetch_open_orders(SYMBOL)) == 0
+
+
+class FailingCancels:
+    """Proxy whose cancel_order raises NetworkError while failing is set"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.failing = True
+
+    def cancel_order(self, order_id, symbol=None, params=None):
+        if self.failing:
+            raise ccxt.NetworkError('connection reset')
+        return self.exchange.cancel_order(order_id, symbol)
+
+    def __getattr__(self, name):
+        return getattr(self.exchange, name)
+
+
+def test_failed_cancel_keeps_order_tracked_and_skips_create():
+    exchange, manager, ledger, bid, ask = setup()
+    manager.use_amend = False
+    manager.update_quotes(bid, ask, 0.01)
+    live = manager.orders['bid']['id']
+
+    manager.exchange = FailingCancels(exchange)
+    tick = exchange.sim['tick_size']
+    manager.update_quotes(bid - tick, ask, 0.01)
+    # Still one bid resting, still the tracked one
+    assert open_sides(exchange) == ['buy', 'sell']
+    assert manager.orders['bid']['id'] == live
+
+    manager.exchange.failing = False
+    manager.update_quotes(bid - tick, ask, 0.01)
+    assert open_sides(exchange) == ['buy', 'sell']
+    assert manager.orders['bid']['id'] != live
+    assert abs(manager.orders['bid']['price'] - (bid - tick)) < 1e-9
+
+
+def test_cancel_of_unknown_order_clears_side():
+    exchange, manager, ledger, bid, ask = setup()
+    manager.update_quotes(bid, ask, 0.01)
+    exchange.cancel_order(manager.orders['bid']['id'], SYMBOL)
+    assert manager.cancel_side('bid') is True
+    assert manager.orders['bid'] is None
+
+
+def test_async_failed_cancel_keeps_order_tracked():
+    exchange, manager, ledger, bid, ask = setup(AsyncQuoteManager, AsyncSimExchange)
+    manager.use_amend = False
+
+    class AsyncFailingCancels(FailingCancels):
+        async def cancel_order(self, order_id, symbol=None, params=None):
+            raise ccxt.NetworkError('connection reset')
+
+    async def run():
+        await manager.update_quotes(bid, ask, 0.01)
+        live = manager.orders['ask']['id']
+        manager.exchange = AsyncFailingCancels(exchange)
+        tick = exchange.sim['tick_size']
+        await manager.update_quotes(bid, ask + tick, 0.01)
+        return live
+
+    live = asyncio.run(run())
+    assert manager.orders['ask']['id'] == live
+    assert open_sides(exchange) == ['buy', 'sell']
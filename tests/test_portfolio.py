@@ -0,0 +1,78 @@
+"""Portfolio request budget: one limiter, charged with the real call count"""
+
+import json
+import os
+
+import pytest
+
+from portfolio import FairScheduler, PortfolioRunner, build_symbol_config
+from request_scheduler import RequestScheduler
+from sim_exchange import SimExchange, sim_bot_config
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist', 'config.example.json')
+
+
+def test_fair_scheduler_admits_against_the_limiter():
+    limiter = RequestScheduler(10, burst=4)
+    scheduler = FairScheduler(100, limiter=limiter)
+    scheduler.add('ETH', expected_cost=3)
+    assert scheduler.capacity == 4
+
+    limiter.tokens = 2
+    assert scheduler.next_symbol() is None
+    limiter.tokens = 4
+    assert scheduler.next_symbol() == 'ETH'
+
+    # The limiter already paid for the calls; charging only updates the estimate
+    scheduler.charge('ETH', 5, interval=0.0)
+    assert limiter.tokens == 4
+    assert scheduler.expected_cost['ETH'] == pytest.approx(3.4)
+
+
+def test_fair_scheduler_keeps_own_bucket_without_limiter():
+    scheduler = FairScheduler(1e-6, burst=5)
+    scheduler.add('ETH', expected_cost=3)
+    assert scheduler.next_symbol() == 'ETH'
+    scheduler.charge('ETH', 4, interval=0.0)
+    assert scheduler.next_symbol() is None
+
+
+def test_run_symbol_charges_every_exchange_call(tmp_path, monkeypatch):
+    with open(CONFIG) as f:
+        config = sim_bot_config(json.load(f))
+    config['trading'].update(order_size_type='fixed', order_size=0.01)
+    config['calibration']['enabled'] = True
+    config['account']['refresh_interval'] = 3600
+    config['portfolio']['symbols'] = [{'symbol': 'ETH/USDT:USDT', 'fills': {'state_file': ''}}]
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config))
+    monkeypatch.chdir(tmp_path)
+
+    runner = PortfolioRunner(str(path))
+    runner.connector.initialize_exchange = lambda: setattr(
+        runner.connector, 'exchange', SimExchange(['ETH/USDT:USDT'], {'seed': 1}))
+    runner.setup()
+    try:
+        assert runner.scheduler.limiter is runner.connector.scheduler
+        sim = runner.exchange._exchange._exchange
+        before = dict(sim.request_counts)
+        charged = []
+        runner.scheduler.charge = lambda symbol, cost, interval: charged.append(cost)
+
+        runner.run_symbol('ETH/USDT:USDT')
+        calls = {name: count - before.get(name, 0) for name, count in sim.request_counts.items()}
+        assert calls['fetch_trades'] == 1
+        assert charged == [sum(calls.values())]
+    finally:
+        runner.account.stop()
+
+
+def test_symbol_configs_keep_persistence_disabled():
+    with open(CONFIG) as f:
+        base = json.load(f)
+    assert build_symbol_config(base, {'symbol': 'ETH/USDT:USDT'})['fills']['state_file'] == 'fill_ledger_ETH_USDT_USDT.json'
+
+    # A simulated run disables the ledger file; per-symbol names must not bring it back
+    config = build_symbol_config(sim_bot_config(base), {'symbol': 'ETH/USDT:USDT'})
+    assert config['fills']['state_file'] == ''
+    assert config['warm_start']['enabled'] is False
@@ -0,0 +1,172 @@
+"""LadderManager keeps every level live through fills on the SimExchange"""
+
+import asyncio
+
+import ccxt
+import pytest
+
+from fill_ledger import FillLedger
+from quote_ladder import AsyncLadderManager, LadderManager, build_ladder
+from sim_exchange import AsyncSimExchange, SimExchange, _Order
+
+SYMBOL = 'ETH/USDT:USDT'
+SIM = {'flow_rate': 0.0, 'seed': 1}
+SIZE = 0.01
+
+
+def take(exchange, side, amount):
+    """Send a market order from the synthetic flow against the book"""
+    order = _Order('taker', 'flow', SYMBOL, side, None, amount, exchange._now_ms())
+    exchange._settle(exchange.engines[SYMBOL].submit(order))
+
+
+def setup(manager_class=LadderManager, exchange_class=SimExchange):
+    exchange = exchange_class([SYMBOL], SIM)
+    tick = exchange.sim['tick_size']
+    manager = manager_class(exchange, SYMBOL, tick, levels=3)
+    ledger = FillLedger(SYMBOL)
+    ledger.cursor = 0
+    ledger.listeners.append(manager.on_fill)
+    # Empty the seeded book so the ladder is the only resting liquidity
+    for order_id in exchange.synthetic_ids[SYMBOL]:
+        exchange.engines[SYMBOL].cancel(order_id)
+    price = exchange.sim['initial_price']
+    bids = [(price - (10 + i) * tick, SIZE) for i in range(3)]
+    asks = [(price + (10 + i) * tick, SIZE) for i in range(3)]
+    return exchange, manager, ledger, bids, asks
+
+
+def open_levels(exchange):
+    orders = exchange._fetch_open_orders(SYMBOL)
+    return (sorted(o['price'] for o in orders if o['side'] == 'buy'),
+            sorted(o['price'] for o in orders if o['side'] == 'sell'))
+
+
+def test_swept_levels_are_requoted():
+    exchange, manager, ledger, bids, asks = setup()
+    manager.update_ladder(bids, asks)
+    assert manager.stats['batches'] == 1
+
+    # Sweep the top two bid levels
+    take(exchange, 'sell', 2 * SIZE)
+    assert ledger.poll(exchange) == 2
+    assert manager.orders['bid0'] is None
+    assert manager.orders['bid1'] is None
+    assert manager.orders['bid2'] is not None
+
+    manager.update_ladder(bids, asks)
+    live_bids, live_asks = open_levels(exchange)
+    assert live_bids == sorted(price for price, _ in bids)
+    assert live_asks == sorted(price for price, _ in asks)
+    assert manager.stats['filled'] == 2
+    # Untouched levels kept their orders and queue position
+    assert manager.stats['kept'] == 4
+
+
+def test_partly_filled_level_is_replaced():
+    exchange, manager, ledger, bids, asks = setup()
+    manager.update_ladder(bids, asks)
+
+    take(exchange, 'buy', SIZE / 2)
+    ledger.poll(exchange)
+    actions = manager.plan_ladder(bids, asks)
+    assert 'ask0' in actions['cancel'] and 'ask0' in actions['create']
+
+    manager.update_ladder(bids, asks)
+    remaining = [o['remaining'] for o in exchange._fetch_open_orders(SYMBOL) if o['side'] == 'sell']
+    assert all(abs(amount - SIZE) < 1e-9 for amount in remaining)
+    assert len(remaining) == 3
+
+
+def test_async_swept_levels_are_requoted():
+    exchange, manager, ledger, bids, asks = setup(AsyncLadderManager, AsyncSimExchange)
+
+    async def run():
+        await manager.update_ladder(bids, asks)
+        take(exchange, 'buy', 3 * SIZE)
+        await ledger.poll_async(exchange)
+        await manager.update_ladder(bids, asks)
+
+    asyncio.run(run())
+    live_bids, live_asks = open_levels(exchange)
+    assert len(live_bids) == 3
+    assert live_asks == sorted(price for price, _ in asks)
+
+
+class FailingBatchCancels:
+    """Proxy whose cancel_orders raises NetworkError"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def cancel_orders(self, ids, symbol=None, params=None):
+        raise ccxt.NetworkError('connection reset')
+
+    def __getattr__(self, name):
+        return getattr(self.exchange, name)
+
+
+def test_failed_batch_cancel_keeps_levels_tracked():
+    exchange, manager, ledger, bids, asks = setup()
+    manager.update_ladder(bids, asks)
+    tracked = {key: order['id'] for key, order in manager.orders.items()}
+
+    manager.exchange = FailingBatchCancels(exchange)
+    manager.update_ladder([], [])
+    assert {key: order['id'] for key, order in manager.orders.items()} == tracked
+    assert len(exchange._fetch_open_orders(SYMBOL)) == 6
+
+    # Moving every level replaces in batch; nothing is created next to a live order
+    tick = exchange.sim['tick_size']
+    manager.update_ladder([(price - 5 * tick, size) for price, size in bids],
+                          [(price + 5 * tick, size) for price, size in asks])
+    assert len(exchange._fetch_open_orders(SYMBOL)) == 6
+
+    manager.exchange = exchange
+    manager.update_ladder([], [])
+    assert all(order is None for order in manager.orders.values())
+    assert exchange._fetch_open_orders(SYMBOL) == []
+
+
+def test_async_failed_batch_cancel_keeps_levels_tracked():
+    exchange, manager, ledger, bids, asks = setup(AsyncLadderManager, AsyncSimExchange)
+
+    async def run():
+        await manager.update_ladder(bids, asks)
+        manager.exchange = FailingBatchCancels(exchange)
+        await manager.update_ladder([], [])
+
+    asyncio.run(run())
+    assert all(order is not None for order in manager.orders.values())
+    assert len(exchange._fetch_open_orders(SYMBOL)) == 6
+
+
+def test_shifted_ladder_keeps_resting_levels():
+    exchange, manager, ledger, bids, asks = setup()
+    manager.update_ladder(bids, asks)
+    resting = {order['price']: order['id'] for order in exchange._fetch_open_orders(SYMBOL)}
+
+    # Quotes move one level up: two bids and two asks are still wanted
+    tick = exchange.sim['tick_size']
+    shifted_bids = [(price + tick, size) for price, size in bids]
+    shifted_asks = [(price + tick, size) for price, size in asks]
+    actions = manager.plan_ladder(shifted_bids, shifted_asks)
+    assert len(actions['keep']) == 4
+
+    manager.update_ladder(shifted_bids, shifted_asks)
+    live_bids, live_asks = open_levels(exchange)
+    assert live_bids == pytest.approx(sorted(price for price, _ in shifted_bids))
+    assert live_asks == pytest.approx(sorted(price for price, _ in shifted_asks))
+    after = {order['price']: order['id'] for order in exchange._fetch_open_orders(SYMBOL)}
+    kept = [price for price, order_id in after.items() if resting.get(price) == order_id]
+    assert len(kept) == 4
+
+
+def test_build_ladder_prices_are_tick_multiples():
+    bids, asks = build_ladder(0.3, 0.4, 0.3, 3, 0.1, 0.1, 0.1, 0.1)
+    assert [price for price, _ in bids] == [0.3, 0.2, 0.1]
+    assert [price for price, _ in asks] == [0.4, 0.5, 0.6]
+    assert all(size == 0.3 for _, size in bids + asks)
+
+    bids, _ = build_ladder(101.25, 101.5, 1.0, 2, 0.25, 0.25, 0.001, 0.001)
+    assert [price for price, _ in bids] == [101.25, 101.0]
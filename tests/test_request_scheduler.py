@@ -0,0 +1,137 @@
+"""RequestScheduler priorities and ScheduledExchange read coalescing"""
+
+import asyncio
+import threading
+import time
+
+import ccxt
+import pytest
+
+from request_scheduler import RequestScheduler, ScheduledExchange
+
+SYMBOL = 'ETH/USDT:USDT'
+
+
+def test_waiting_requests_go_most_urgent_first():
+    scheduler = RequestScheduler(50, burst=1)
+    scheduler.tokens = 0.0
+    admitted = []
+
+    async def request(endpoint):
+        await scheduler.acquire_async(endpoint)
+        admitted.append(endpoint)
+
+    async def run():
+        # Queued least urgent first; served by priority, then arrival
+        await asyncio.gather(*(request(endpoint) for endpoint in
+                               ('fetch_balance', 'fetch_order_book', 'create_order', 'cancel_order', 'fetch_ticker')))
+
+    asyncio.run(run())
+    assert admitted == ['cancel_order', 'create_order', 'fetch_order_book', 'fetch_ticker', 'fetch_balance']
+    assert scheduler.stats['requests'] == 5
+
+
+def test_account_requests_leave_the_reserve_to_quotes():
+    scheduler = RequestScheduler(20, burst=10)
+    scheduler.tokens = 3.5
+
+    # A quote may use the last tokens; an account read must leave 30% of the bucket
+    assert scheduler.acquire('create_order') < 0.01
+    start = time.monotonic()
+    scheduler.acquire('fetch_balance')
+    assert time.monotonic() - start >= 0.04
+    assert scheduler.congested
+
+
+def test_rate_limit_error_drains_and_pauses():
+    class Throttling:
+        def fetch_balance(self):
+            raise ccxt.RateLimitExceeded('429')
+
+    scheduler = RequestScheduler(10, cooldown=5.0)
+    exchange = ScheduledExchange(Throttling(), scheduler)
+    with pytest.raises(ccxt.RateLimitExceeded):
+        exchange.fetch_balance()
+    assert scheduler.stats['throttled'] == 1
+    assert scheduler.tokens == 0.0
+    assert 4.0 < scheduler.cooldown_remaining() <= 5.0
+    assert scheduler.congested
+
+
+class SlowBook:
+    """fetch_order_book that holds the request open until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def fetch_order_book(self, symbol, limit=None):
+        self.calls += 1
+        self.release.wait(5)
+        return {'bids': [[99.0, 1.0]], 'asks': [[101.0, 1.0]], 'nonce': 1}
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_identical_reads_share_one_request_and_get_own_copies():
+    scheduler = RequestScheduler(100)
+    raw = SlowBook()
+    exchange = ScheduledExchange(raw, scheduler)
+    results = []
+
+    def fetch():
+        results.append(exchange.fetch_order_book(SYMBOL))
+
+    threads = [threading.Thread(target=fetch)]
+    threads[0].start()
+    wait_for(lambda: scheduler.inflight)
+    threads += [threading.Thread(target=fetch) for _ in range(2)]
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: next(iter(scheduler.inflight.values()))[1] == 2)
+    raw.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert raw.calls == 1
+    assert scheduler.stats['requests'] == 1
+    assert scheduler.stats['coalesced'] == 2
+    assert not scheduler.inflight
+    assert results[0] == results[1] == results[2]
+    # A caller trimming its book does not change what the others see
+    results[0]['bids'].pop()
+    assert results[1]['bids'] == results[2]['bids'] == [[99.0, 1.0]]
+    assert results[1]['bids'] is not results[2]['bids']
+
+    # Different arguments are separate requests
+    exchange.fetch_order_book(SYMBOL, 5)
+    assert raw.calls == 2
+
+
+def test_identical_async_reads_share_one_request_and_get_own_copies():
+    class AsyncBook:
+        calls = 0
+
+        async def fetch_order_book(self, symbol, limit=None):
+            AsyncBook.calls += 1
+            await asyncio.sleep(0.01)
+            return {'bids': [[99.0, 1.0]], 'asks': [[101.0, 1.0]]}
+
+    scheduler = RequestScheduler(100)
+    exchange = ScheduledExchange(AsyncBook(), scheduler)
+
+    async def run():
+        return await asyncio.gather(*(exchange.fetch_order_book(SYMBOL) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert AsyncBook.calls == 1
+    assert scheduler.stats['coalesced'] == 2
+    assert not scheduler.inflight
+    results[0]['asks'].clear()
+    assert results[1]['asks'] == results[2]['asks'] == [[101.0, 1.0]]
+    assert results[1]['asks'] is not results[2]['asks']
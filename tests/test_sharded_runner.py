@@ -0,0 +1,133 @@
+"""Shared-memory ring reads and worker-side fill reconciliation, in one process"""
+
+import json
+import os
+
+import pytest
+
+from fill_ledger import FillLedger
+from sharded_runner import BOOK, LEDGER, MarketDataRing, SharedMarketState, ShardSymbolMaker
+from sim_exchange import SimExchange, _Order, sim_bot_config
+
+SYMBOL = 'ETH/USDT:USDT'
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist', 'config.example.json')
+
+
+@pytest.fixture
+def ring():
+    ring = MarketDataRing.create(4)
+    yield ring
+    ring.close()
+
+
+def book(price):
+    return (price, price + 1.0, 1.0, 1.0)
+
+
+def test_read_wraps_around_the_ring(ring):
+    cursor = 0
+    for batch in ([1.0, 2.0, 3.0], [4.0, 5.0], [6.0, 7.0, 8.0]):
+        for price in batch:
+            ring.publish(BOOK, 0, book(price), timestamp=int(price))
+        records, cursor = ring.read(cursor)
+        # Slots are reused modulo capacity; every record comes back in order
+        assert [record[4] for record in records] == batch
+    assert cursor == ring.head == 8
+
+
+def test_lapped_reader_skips_to_oldest_record(ring):
+    for price in range(1, 11):
+        ring.publish(BOOK, 0, book(float(price)))
+    records, cursor = ring.read(0)
+    # Only the last capacity records survive
+    assert [record[4] for record in records] == [7.0, 8.0, 9.0, 10.0]
+    assert cursor == 10
+    assert ring.read(cursor) == ([], 10)
+
+
+def test_slot_being_written_is_dropped(ring):
+    for price in (1.0, 2.0, 3.0):
+        ring.publish(BOOK, 0, book(price))
+    # The writer died (or is) between the odd lock word and the body
+    offset = ring.HEADER_SIZE + (2 % ring.capacity) * ring.SLOT_SIZE
+    ring.LOCK.pack_into(ring.buf, offset, 2 * 2 + 1)
+
+    records, cursor = ring.read(0)
+    assert [record[4] for record in records] == [1.0, 3.0]
+    assert cursor == 3
+
+
+def test_slot_overwritten_during_read_is_dropped(ring):
+    for price in (1.0, 2.0):
+        ring.publish(BOOK, 0, book(price))
+
+    class LappingLock:
+        """Lock word reader that lets the writer lap the reader between the two checks"""
+
+        def __init__(self, lock):
+            self.lock = lock
+            self.reads = 0
+
+        def unpack_from(self, buf, offset):
+            value = self.lock.unpack_from(buf, offset)
+            self.reads += 1
+            if self.reads == 1:
+                # The writer laps the reader and refills slot 1 after the reader copied it
+                for price in (3.0, 4.0, 5.0):
+                    MarketDataRing.publish(ring, BOOK, 0, book(price))
+            return value
+
+        def pack_into(self, *args):
+            self.lock.pack_into(*args)
+
+    ring.LOCK = LappingLock(MarketDataRing.LOCK)
+    records, cursor = ring.read(0)
+    ring.LOCK = MarketDataRing.LOCK
+    # Record 1 changed under the reader and is dropped, record 2 is intact
+    assert [record[4] for record in records] == [2.0]
+    assert cursor == 2
+    records, cursor = ring.read(cursor)
+    assert [record[4] for record in records] == [3.0, 4.0, 5.0]
+
+
+def take(exchange, side, amount):
+    engine = exchange.engines[SYMBOL]
+    exchange._settle(engine.submit(_Order('taker', 'flow', SYMBOL, side, None, amount, exchange._now_ms())))
+
+
+def test_worker_reconciles_quotes_when_gateway_fill_count_moves(ring):
+    with open(CONFIG) as f:
+        config = sim_bot_config(json.load(f))
+    exchange = SimExchange([SYMBOL], {'flow_rate': 0.0, 'seed': 1})
+    for order_id in exchange.synthetic_ids[SYMBOL]:
+        exchange.engines[SYMBOL].cancel(order_id)
+    state = SharedMarketState(ring, [SYMBOL], ['USDT'])
+    maker = ShardSymbolMaker(config, state)
+    maker.exchange = exchange
+    maker.symbol = SYMBOL
+    maker.create_order_manager()
+    maker.create_fill_ledger()
+
+    tick = exchange.sim['tick_size']
+    price = exchange.sim['initial_price']
+    maker.order_manager.update_quotes(price - 10 * tick, price + 10 * tick, 0.01)
+    take(exchange, 'sell', 0.01)
+
+    # The gateway polls the fill and publishes its ledger totals
+    gateway_ledger = FillLedger(SYMBOL)
+    gateway_ledger.cursor = 0
+    assert gateway_ledger.poll(exchange) == 1
+    ring.publish(LEDGER, 0, (gateway_ledger.position, gateway_ledger.avg_entry,
+                             gateway_ledger.realized_pnl, gateway_ledger.fees), aux=gateway_ledger.trades_count)
+    state.poll()
+
+    fetches = exchange.request_counts.get('fetch_open_orders', 0)
+    maker.update_inventory()
+    assert maker.inventory == pytest.approx(0.01)
+    assert maker.order_manager.orders['bid'] is None
+    assert maker.order_manager.orders['ask'] is not None
+    assert exchange.request_counts['fetch_open_orders'] == fetches + 1
+
+    # Unchanged fill count: no further round trip through the gateway
+    maker.update_inventory()
+    assert exchange.request_counts['fetch_open_orders'] == fetches + 1
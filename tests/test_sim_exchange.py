@@ -0,0 +1,35 @@
+"""Simulated load-test runs never touch the live bot's state files"""
+
+import json
+import os
+
+from sim_exchange import SimExchange, sim_bot_config
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dist', 'config.example.json')
+
+
+def test_sim_run_leaves_state_files_alone(tmp_path, monkeypatch):
+    from market_maker_bot import UniversalMarketMaker
+
+    with open(CONFIG) as f:
+        base = json.load(f)
+    base['trading'].update(order_size_type='fixed', order_size=0.01)
+    monkeypatch.chdir(tmp_path)
+    live_ledger = '{"position": 1.5}'
+    (tmp_path / 'fill_ledger.json').write_text(live_ledger)
+
+    config = sim_bot_config(base)
+    assert base['fills']['state_file'] == 'fill_ledger.json'
+    assert base['warm_start']['enabled'] is True
+
+    bot = UniversalMarketMaker(config=config)
+    bot.exchange = SimExchange([config['trading']['symbol']], {'seed': 1})
+    bot.start_scheduler()
+    bot.setup_symbol()
+    for _ in range(3):
+        bot.run_iteration()
+    bot.save_checkpoint()
+    bot.account.stop()
+
+    assert sorted(os.listdir(tmp_path)) == ['fill_ledger.json']
+    assert (tmp_path / 'fill_ledger.json').read_text() == live_ledger
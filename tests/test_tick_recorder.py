@@ -0,0 +1,47 @@
+"""TickRecorder round trip through the memory-mapped readers"""
+
+import os
+
+import numpy as np
+
+from tick_recorder import TickRecorder, load_market_data, open_segment, segment_path
+
+SYMBOL = 'ETH/USDT:USDT'
+TIMESTAMP = 1735689600000  # 2025-01-01 UTC
+DAY = '20250101'
+
+
+def record(tmp_path):
+    recorder = TickRecorder(str(tmp_path), SYMBOL, flush_interval=0.05)
+    recorder.record_book(TIMESTAMP, 99.5, 100.5, 2.0, 3.0)
+    recorder.record_book(TIMESTAMP + 100, 99.6, 100.6, 1.0, 1.0)
+    recorder.record_trade({'timestamp': TIMESTAMP + 50, 'price': 100.5, 'amount': 0.3, 'side': 'buy'})
+    recorder.record_trade({'timestamp': TIMESTAMP + 60, 'price': 99.5, 'amount': 0.1, 'side': 'sell'})
+    recorder.close()
+
+
+def test_columns_are_little_endian(tmp_path):
+    record(tmp_path)
+    path = segment_path(str(tmp_path), SYMBOL, 'book', DAY)
+    raw = np.fromfile(os.path.join(path, 'timestamp.bin'), dtype='<i8')
+    assert list(raw) == [TIMESTAMP, TIMESTAMP + 100]
+
+
+def test_load_market_data_includes_public_trades(tmp_path):
+    record(tmp_path)
+    data = load_market_data(str(tmp_path), SYMBOL, DAY)
+    assert len(data) == 2
+    assert list(data.bid) == [99.5, 99.6]
+    assert list(data.trade_price) == [100.5, 99.5]
+    assert list(data.trade_side) == [1, -1]
+
+
+def test_torn_record_is_ignored(tmp_path):
+    record(tmp_path)
+    path = segment_path(str(tmp_path), SYMBOL, 'book', DAY)
+    # A crash mid-append leaves a partial item at the end of one column
+    with open(os.path.join(path, 'bid.bin'), 'ab') as f:
+        f.write(b'\x00\x01\x02')
+    book = open_segment(str(tmp_path), SYMBOL, 'book', DAY)
+    assert len(book['bid']) == 2
+    assert list(book['timestamp']) == [TIMESTAMP, TIMESTAMP + 100]
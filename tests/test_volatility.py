@@ -0,0 +1,77 @@
+"""Streaming volatility against direct computations over the same returns"""
+
+import math
+import random
+import statistics
+
+import pytest
+
+from volatility import VolatilityEstimator
+
+
+def prices(count, seed=7, volatility=0.002):
+    rng = random.Random(seed)
+    series = [100.0]
+    for _ in range(count - 1):
+        series.append(series[-1] * math.exp(rng.gauss(0.0, volatility)))
+    return series
+
+
+def log_returns(series):
+    return [math.log(b / a) for a, b in zip(series, series[1:])]
+
+
+def test_window_matches_pstdev_after_many_removals():
+    series = prices(500)
+    estimator = VolatilityEstimator(lookback=50, floor=0.0)
+    for price in series:
+        estimator.update(price)
+
+    window = log_returns(series)[-49:]
+    assert len(estimator.returns) == 49
+    assert estimator.mean == pytest.approx(statistics.fmean(window), abs=1e-15)
+    assert math.sqrt(estimator.m2 / 49) == pytest.approx(statistics.pstdev(window), rel=1e-9)
+    # Reported sigma is the sample deviation per hour of one-second ticks
+    assert estimator.value == pytest.approx(statistics.stdev(window) * math.sqrt(3600), rel=1e-9)
+
+
+def test_window_scales_by_mean_tick_interval():
+    series = prices(100)
+    estimator = VolatilityEstimator(lookback=20, floor=0.0)
+    for i, price in enumerate(series):
+        estimator.update(price, timestamp=i * 0.25)
+
+    window = log_returns(series)[-19:]
+    assert estimator.value == pytest.approx(statistics.stdev(window) * math.sqrt(3600 / 0.25), rel=1e-9)
+
+
+def test_ewma_matches_closed_form():
+    series = prices(60)
+    span = 10
+    estimator = VolatilityEstimator(lookback=20, mode='ewma', ewma_span=span, floor=0.0)
+    for price in series:
+        estimator.update(price)
+
+    decay = 1 - 2 / (span + 1)
+    returns = log_returns(series)
+    n = len(returns)
+    # The first squared return seeds the average, later ones enter with weight 1 - decay
+    variance = decay ** (n - 1) * returns[0] ** 2 + sum(
+        (1 - decay) * decay ** (n - 1 - i) * r ** 2 for i, r in enumerate(returns) if i > 0
+    )
+    assert estimator.ewma_var == pytest.approx(variance, rel=1e-12)
+    assert estimator.value == pytest.approx(math.sqrt(variance * 3600), rel=1e-12)
+
+
+def test_window_does_not_drift_after_large_returns_leave():
+    estimator = VolatilityEstimator(lookback=5, floor=0.0)
+    rng = random.Random(1)
+    for i in range(20000):
+        # A violent spell, then a near-flat market for much longer
+        ret = rng.choice([5.0, -5.0]) if i < 1000 else 1e-9 * (i % 2)
+        estimator._update_window(ret, 1.0)
+        assert estimator.m2 >= 0.0
+
+    window = list(estimator.returns)
+    assert math.sqrt(estimator.m2 / len(window)) == pytest.approx(statistics.pstdev(window), rel=1e-6)
+    assert estimator.value > 0.0
@@ -0,0 +1,93 @@
+"""Markets snapshot and the background markets refresh"""
+
+import threading
+
+import ccxt
+
+from market_maker_bot import UniversalMarketMaker
+from warm_start import MarketsSnapshot
+
+SYMBOL = 'ETH/USDT:USDT'
+
+
+def market(base, price_precision=0.01):
+    return {'id': f'{base}USDT', 'symbol': f'{base}/USDT:USDT', 'base': base, 'quote': 'USDT', 'settle': 'USDT',
+            'baseId': base, 'quoteId': 'USDT', 'settleId': 'USDT', 'type': 'swap', 'spot': False, 'swap': True,
+            'contract': True, 'linear': True, 'active': True,
+            'precision': {'amount': 0.01, 'price': price_precision}, 'limits': {}, 'info': {}}
+
+
+class OfflineBybit(ccxt.bybit):
+    """bybit with canned markets; load_markets records the calling thread"""
+
+    markets_list = [market('ETH'), market('BTC'), market('SOL')]
+    loads = []
+
+    def fetch_markets(self, params={}):
+        OfflineBybit.loads.append((id(self), threading.current_thread().name))
+        return [dict(m) for m in self.markets_list]
+
+    def fetch_currencies(self, params={}):
+        return {}
+
+
+def bot_with_snapshot(tmp_path):
+    bot = UniversalMarketMaker(config={
+        'exchange': {'name': 'bybit'}, 'trading': {'symbol': SYMBOL},
+        'strategy': {'gamma': 0.1, 'k': 1.5, 'sigma_lookback': 20},
+        'warm_start': {'markets_file': str(tmp_path / 'markets.json')}
+    })
+    source = OfflineBybit()
+    source.load_markets()
+    snapshot = bot.markets_snapshot()
+    snapshot.save(source)
+    return bot, snapshot
+
+
+def test_snapshot_restores_every_market(tmp_path):
+    _, snapshot = bot_with_snapshot(tmp_path)
+
+    exchange = ccxt.bybit()
+    assert snapshot.apply(exchange)
+    # Not only the traded symbol: other lookups work before the reload
+    assert sorted(exchange.markets) == ['BTC/USDT:USDT', 'ETH/USDT:USDT', 'SOL/USDT:USDT']
+    assert exchange.market('BTC/USDT:USDT')['id'] == 'BTCUSDT'
+
+
+def test_snapshot_missing_traded_symbol_is_ignored(tmp_path):
+    _, snapshot = bot_with_snapshot(tmp_path)
+    assert not MarketsSnapshot(snapshot.path, 'bybit', ['DOGE/USDT:USDT']).apply(ccxt.bybit())
+
+
+def test_refresh_loads_on_its_own_instance_and_main_loop_swaps_in(tmp_path, monkeypatch):
+    bot, snapshot = bot_with_snapshot(tmp_path)
+    bot.exchange = ccxt.bybit()
+    snapshot.apply(bot.exchange)
+    monkeypatch.setattr(OfflineBybit, 'markets_list', [market('ETH', 0.001), market('BTC'), market('XRP')])
+    OfflineBybit.loads = []
+
+    thread = threading.Thread(target=bot.refresh_markets, args=(snapshot, OfflineBybit), name='markets-refresh')
+    thread.start()
+    thread.join()
+
+    # The reload ran in the refresh thread on another instance; the trading one is untouched
+    assert [name for _, name in OfflineBybit.loads] == ['markets-refresh']
+    assert OfflineBybit.loads[0][0] != id(bot.exchange)
+    assert 'XRP/USDT:USDT' not in bot.exchange.markets
+
+    bot.apply_fresh_markets()
+    assert bot.fresh_markets is None
+    assert bot.exchange.markets[SYMBOL]['precision']['price'] == 0.001
+    assert 'XRP/USDT:USDT' in bot.exchange.markets
+    assert 'XRP/USDT:USDT' in snapshot.load()['markets']
+
+
+def test_failed_refresh_leaves_markets_alone(tmp_path):
+    class Offline(OfflineBybit):
+        def fetch_markets(self, params={}):
+            raise ccxt.NetworkError('timeout')
+
+    bot, snapshot = bot_with_snapshot(tmp_path)
+    bot.refresh_markets(snapshot, Offline)
+    assert bot.fresh_markets is None
+    bot.apply_fresh_markets()